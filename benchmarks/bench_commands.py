@@ -0,0 +1,101 @@
+"""Benchmarks for creating commands and writing them in Radiance format."""
+import pytest
+
+from honeybee_radiance_command.dcglare import Dcglare
+from honeybee_radiance_command.dctimestep import Dctimestep
+from honeybee_radiance_command.evalglare import Evalglare
+from honeybee_radiance_command.falsecolor import Falsecolor
+from honeybee_radiance_command.gendaylit import Gendaylit
+from honeybee_radiance_command.gendaymtx import Gendaymtx
+from honeybee_radiance_command.gensky import Gensky
+from honeybee_radiance_command.getinfo import Getinfo
+from honeybee_radiance_command.oconv import Oconv
+from honeybee_radiance_command.pcomb import Pcomb
+from honeybee_radiance_command.pcompos import Pcompos
+from honeybee_radiance_command.pcond import Pcond
+from honeybee_radiance_command.pfilt import Pfilt
+from honeybee_radiance_command.pflip import Pflip
+from honeybee_radiance_command.pinterp import Pinterp
+from honeybee_radiance_command.psign import Psign
+from honeybee_radiance_command.ra_gif import Ra_GIF
+from honeybee_radiance_command.ra_xyze import Ra_xyze
+from honeybee_radiance_command.rcalc import Rcalc
+from honeybee_radiance_command.rcollate import Rcollate
+from honeybee_radiance_command.rcontrib import Rcontrib
+from honeybee_radiance_command.rfluxmtx import Rfluxmtx
+from honeybee_radiance_command.rmtxop import Rmtxop
+from honeybee_radiance_command.rpict import Rpict
+from honeybee_radiance_command.rtrace import Rtrace
+
+FACTORIES = {
+    'dcglare': lambda: Dcglare(
+        output='glare.dgp', dc_direct='dc_direct.mtx', dc_total='dc_total.mtx',
+        sky_matrix='sky.smx'
+    ),
+    'dctimestep': lambda: Dctimestep.daylight_coef_calc(
+        output='results.ill', day_coef_matrix='dc.mtx', sky_vector='sky.smx'
+    ),
+    'evalglare': lambda: Evalglare(output='glare.txt', input='view.hdr'),
+    'falsecolor': lambda: Falsecolor(output='falsecolor.hdr', input='view.hdr'),
+    'gendaylit': lambda: Gendaylit(month=1, day=21, time=12.5, output='sky.sky'),
+    'gendaymtx': lambda: Gendaymtx(output='sky.smx', wea='weather.wea'),
+    'gensky': lambda: Gensky(month=1, day=21, time=12.5, output='sky.sky'),
+    'getinfo': lambda: Getinfo(output='info.txt', input='view.hdr'),
+    'oconv': lambda: Oconv(output='scene.oct', inputs=['sky.rad', 'scene.rad']),
+    'pcomb': lambda: Pcomb(output='image.hdr', input='view.hdr'),
+    'pcompos': lambda: Pcompos(output='image.hdr', input=['image1.hdr', 'image2.hdr']),
+    'pcond': lambda: Pcond(output='image.hdr', input='view.hdr'),
+    'pfilt': lambda: Pfilt(output='image.hdr', input='view.hdr'),
+    'pflip': lambda: Pflip(output='image.hdr', input='view.hdr'),
+    'pinterp': lambda: Pinterp(
+        output='image.hdr', view='view.vf', image='view.hdr', zspec='view.zbf'
+    ),
+    'psign': lambda: Psign(output='sign.hdr', text='21 Jun 12:00'),
+    'ra_gif': lambda: Ra_GIF(output='image.gif', input='view.hdr'),
+    'ra_xyze': lambda: Ra_xyze(output='image.hdr', input='view.hdr'),
+    'rcalc': lambda: Rcalc(output='results.ill', inputs='results.dat'),
+    'rcollate': lambda: Rcollate(output='results.mtx', input='results.dat'),
+    'rcontrib': lambda: Rcontrib(output='dc.mtx', octree='scene.oct', sensors='grid.pts'),
+    'rfluxmtx': lambda: Rfluxmtx(
+        output='dc.mtx', sensors='grid.pts', receivers='sky.rad', octree='scene.oct'
+    ),
+    'rmtxop': lambda: Rmtxop(output='results.ill', matrices=['dc.mtx', 'sky.smx']),
+    'rpict': lambda: Rpict(output='view.hdr', octree='scene.oct', view='view.vf'),
+    'rtrace': lambda: Rtrace(
+        output='results.dat', octree='scene.oct', sensors='grid.pts'
+    ),
+}
+
+
+
+def _radiance_options(command):
+    """Set typical options for the ray-tracing commands."""
+    if command.command in ('rtrace', 'rcontrib', 'rpict'):
+        command.options.update_from_string('-ab 3 -ad 5000 -lw 2e-05 -dj 0.7')
+    if command.command == 'rcontrib':
+        command.options.M = 'suns.mod'
+    return command
+
+
+@pytest.mark.parametrize('name', sorted(FACTORIES))
+def bench_command_init(benchmark, name):
+    benchmark(FACTORIES[name])
+
+
+@pytest.mark.parametrize('name', sorted(FACTORIES))
+def bench_command_to_radiance(benchmark, name):
+    command = _radiance_options(FACTORIES[name]())
+    assert benchmark(command.to_radiance)
+
+
+@pytest.mark.parametrize('name', sorted(FACTORIES))
+def bench_command_to_argv(benchmark, name):
+    command = _radiance_options(FACTORIES[name]())
+    assert benchmark(command.to_argv)
+
+
+def bench_rtrace_pipe_to_rcalc_to_radiance(benchmark):
+    rtrace = _radiance_options(FACTORIES['rtrace']())
+    rtrace.output = None
+    rtrace.pipe_to = Rcalc(output='results.ill')
+    assert benchmark(rtrace.to_radiance)
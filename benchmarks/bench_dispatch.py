@@ -0,0 +1,51 @@
+"""Benchmarks for the overhead of running commands.
+
+The Radiance binaries are replaced with stub executables so the timings only include
+parsing the command, starting the processes and collecting the outputs.
+"""
+from honeybee_radiance_command._command_util import run_command, run_pipeline
+from honeybee_radiance_command.rtrace import Rtrace
+from honeybee_radiance_command.rcalc import Rcalc
+from honeybee_radiance_command.sink import DiscardSink
+
+from conftest import BINARY_SIZE
+
+
+def bench_run_command_echo(benchmark, stub_env):
+    env, folder = stub_env
+    result = benchmark(run_command, 'rtrace scene.oct < grid.pts', env, folder)
+    assert result == 0
+
+
+def bench_run_command_to_sink(benchmark, stub_env):
+    env, folder = stub_env
+    sink = DiscardSink()
+    result = benchmark(
+        run_command, 'rtrace scene.oct < grid.pts', env, folder, sink=sink
+    )
+    assert result == 0
+
+
+def bench_run_command_capture_binary(benchmark, stub_env):
+    env, folder = stub_env
+    result = benchmark(
+        run_command, 'rcontrib scene.oct < grid.pts', env, folder, capture='bytes'
+    )
+    assert len(result.output) == BINARY_SIZE
+
+
+def bench_run_pipeline_two_stages(benchmark, stub_env):
+    env, folder = stub_env
+    result = benchmark(
+        run_pipeline, 'rtrace scene.oct < grid.pts | rcalc', env, folder,
+        capture='bytes'
+    )
+    assert result.output.strip() == b'0 0 0'
+
+
+def bench_command_run(benchmark, stub_env):
+    env, folder = stub_env
+    rtrace = Rtrace(octree='scene.oct', sensors='grid.pts')
+    rtrace.pipe_to = Rcalc()
+    result = benchmark(rtrace.run, env, folder, shell=False, capture='bytes')
+    assert result.output.strip() == b'0 0 0'
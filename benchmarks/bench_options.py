@@ -0,0 +1,60 @@
+"""Benchmarks for creating and serializing option collections."""
+from honeybee_radiance_command.options.rtrace import RtraceOptions
+from honeybee_radiance_command.options.rcontrib import RcontribOptions
+from honeybee_radiance_command.options.rpict import RpictOptions
+from honeybee_radiance_command.cutil import parse_radiance_options_batch
+
+OPTIONS_STRING = '-ab 3 -ad 5000 -as 128 -aa 0 -lw 2e-05 -dj 0.7 -I -h -faf'
+
+
+def _rtrace_options():
+    options = RtraceOptions()
+    options.update_from_string(OPTIONS_STRING)
+    return options
+
+
+def bench_rtrace_options_init(benchmark):
+    benchmark(RtraceOptions)
+
+
+def bench_rcontrib_options_init(benchmark):
+    benchmark(RcontribOptions)
+
+
+def bench_rpict_options_init(benchmark):
+    benchmark(RpictOptions)
+
+
+def bench_rtrace_options_to_radiance_default(benchmark):
+    options = RtraceOptions()
+    benchmark(options.to_radiance)
+
+
+def bench_rtrace_options_to_radiance(benchmark):
+    options = _rtrace_options()
+    assert benchmark(options.to_radiance)
+
+
+def bench_rcontrib_options_to_radiance(benchmark):
+    options = RcontribOptions()
+    options.update_from_string(OPTIONS_STRING)
+    options.M = 'suns.mod'
+    assert benchmark(options.to_radiance)
+
+
+def bench_rtrace_options_update_from_string(benchmark):
+    def _update():
+        options = RtraceOptions()
+        options.update_from_string(OPTIONS_STRING)
+        return options
+
+    benchmark(_update)
+
+
+def bench_rtrace_options_update_and_to_radiance(benchmark):
+    benchmark(lambda: _rtrace_options().to_radiance())
+
+
+def bench_parse_radiance_options_batch(benchmark):
+    strings = [OPTIONS_STRING, '-ab 2 -ad 1024 -lw 1e-3 -I+'] * 500
+    benchmark(parse_radiance_options_batch, strings)
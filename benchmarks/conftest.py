@@ -0,0 +1,111 @@
+"""Shared fixtures for the benchmarks.
+
+The benchmarks are not collected by the test suite. Run them from the root of the
+repository with:
+
+    python -m pytest benchmarks
+
+If pytest-benchmark is installed its benchmark fixture is used and all of its options
+(e.g. --benchmark-compare) are available. Otherwise a minimal fallback fixture times
+the functions and prints a summary at the end of the session.
+"""
+import os
+import stat
+import time
+
+import pytest
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    pytest_benchmark = None
+
+try:
+    timer = time.perf_counter
+except AttributeError:  # python 2
+    timer = time.time
+
+# payload for the stub that writes binary data - 1000 rows of 3 floats
+BINARY_SIZE = 1000 * 3 * 4
+
+_RESULTS = []
+
+
+class _Benchmark(object):
+    """Fallback for the pytest-benchmark fixture."""
+
+    def __init__(self, name, min_rounds=5, max_time=0.2):
+        self.name = name
+        self.min_rounds = min_rounds
+        self.max_time = max_time
+
+    def __call__(self, func, *args, **kwargs):
+        times = []
+        start = timer()
+        while len(times) < self.min_rounds or timer() - start < self.max_time:
+            t0 = timer()
+            result = func(*args, **kwargs)
+            times.append(timer() - t0)
+            if len(times) >= 100000:
+                break
+        _RESULTS.append((self.name, min(times), sum(times) / len(times), len(times)))
+        return result
+
+    def pedantic(self, func, args=(), kwargs=None, rounds=1, iterations=1, **_):
+        kwargs = kwargs or {}
+        times = []
+        for _ in range(rounds):
+            t0 = timer()
+            for _ in range(iterations):
+                result = func(*args, **kwargs)
+            times.append((timer() - t0) / iterations)
+        _RESULTS.append((self.name, min(times), sum(times) / len(times), len(times)))
+        return result
+
+
+if pytest_benchmark is None:
+    @pytest.fixture
+    def benchmark(request):
+        return _Benchmark(request.node.name)
+
+    def pytest_terminal_summary(terminalreporter):
+        if not _RESULTS:
+            return
+        terminalreporter.write_sep('-', 'benchmarks (fallback timer)')
+        terminalreporter.write_line(
+            '%-60s %12s %12s %8s' % ('name', 'min (us)', 'mean (us)', 'rounds')
+        )
+        for name, minimum, mean, rounds in _RESULTS:
+            terminalreporter.write_line(
+                '%-60s %12.1f %12.1f %8d' % (name, minimum * 1e6, mean * 1e6, rounds)
+            )
+
+
+def _write_stub(folder, name, content):
+    path = os.path.join(folder, name)
+    with open(path, 'w') as f:
+        f.write(content)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return path
+
+
+@pytest.fixture(scope='session')
+def stub_env(tmp_path_factory):
+    """Environment with stub executables that replace the Radiance binaries.
+
+    * rtrace echoes a fixed line and ignores its inputs.
+    * rcontrib writes a fixed binary payload of BINARY_SIZE bytes.
+    * rcalc copies stdin to stdout.
+    """
+    if os.name != 'posix':
+        pytest.skip('stub executables require a posix shell')
+    folder = str(tmp_path_factory.mktemp('stubs'))
+    _write_stub(folder, 'rtrace', '#!/bin/sh\necho "0 0 0"\n')
+    _write_stub(
+        folder, 'rcontrib', '#!/bin/sh\nhead -c %d /dev/zero\n' % BINARY_SIZE
+    )
+    _write_stub(folder, 'rcalc', '#!/bin/sh\ncat\n')
+    for name in ('scene.oct', 'grid.pts'):
+        with open(os.path.join(folder, name), 'w') as f:
+            f.write('0 0 0 0 0 1\n')
+    return {'PATH': folder}, folder
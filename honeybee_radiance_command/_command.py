@@ -66,7 +66,9 @@ import warnings
 import os
 
 from .options import OptionCollection
-from ._command_util import run_command
+from ._command_util import run_command, run_pipeline, _process_command, \
+    _check_capture, _remove_redirect, _input_argv
+from .compression import compression
 import honeybee_radiance_command._typing as typing
 
 
@@ -160,6 +162,60 @@ class Command(object):
         else:
             return command.replace('\\', '/')
 
+    def to_argv(self, stdin_input=False):
+        """Command as a list of arguments for each command in the pipeline.
+
+        The output of this method can be executed without a shell. The arguments are
+        built from the inputs and the options of each command instead of parsing the
+        output of to_radiance. Quotes that are added to the inputs for the shell are
+        removed and each quoted value is returned as a single argument.
+
+        Args:
+            stdin_input: A boolean that indicates if the input for this command
+                comes from stdin. This is for instance the case when you pipe the input
+                from another command (default: False).
+
+        Returns:
+            A list of dictionaries - one for each command in the pipeline. Each
+            dictionary has the following keys:
+
+            * argv: List of command arguments starting with the executable name.
+            * stdin: Path to a file for stdin or None. The stdin for all the commands
+              except for the first one is the stdout of the command before it.
+            * stdout: Path to a file for stdout or None. The stdout for all the commands
+              except for the last one is piped to the next command.
+            * mode: File mode for writing stdout to file. It is either 'w' or 'a'.
+        """
+        parts = self._argv(stdin_input)
+        if parts is None:
+            # the command is only available as a string
+            return _process_command(self.to_radiance(stdin_input))
+        argv, stdin = parts
+        stage = {'argv': argv, 'stdin': stdin, 'stdout': None, 'mode': 'w'}
+        if self.pipe_to:
+            return [stage] + self.pipe_to.to_argv(stdin_input=True)
+        if self.output:
+            stage['stdout'] = _input_argv(self.output)[0]
+        return [stage]
+
+    def _argv(self, stdin_input=False):
+        """Get the arguments and the stdin file of this command for to_argv.
+
+        Overwrite this method to build the arguments directly from the inputs and the
+        options of the command. The pipe and the output are added in to_argv. By
+        default None is returned and to_argv parses the output of to_radiance.
+
+        Args:
+            stdin_input: A boolean that indicates if the input for this command
+                comes from stdin (default: False).
+
+        Returns:
+            A tuple with two items. The first item is the list of arguments starting
+            with the executable name and the second item is the path to a file for
+            stdin or None.
+        """
+        return None
+
     def validate(self):
         """Overwrite this method to add extra specific checks for the command.
         For instance for rcontrib you want to make sure there is at least one
@@ -174,21 +230,125 @@ class Command(object):
                 % self.__class__.__name__.lower()
             )
 
-    def run(self, env=None, cwd=None):
+    def run(self, env=None, cwd=None, shell=True, sink=None, capture=None,
+            timeout=None, cancel=None, cache=None, nested=None, max_repeats=None):
         """Run command as a subprocess.
 
+        If the output of the command ends with .gz, .bz2, .xz or .zst the output is
+        compressed while the command is running. See the compression module.
+
         Args:
-            env: Environmental variables (default: None).
+            env: Environmental variables (default: None). It can also be a
+                RadianceEnvironment from the environment module which keeps the merged
+                environment and the full paths to the executables between the runs.
             cwd: Working directory (Default: '.').
+            shell: Set to False to run the command without a shell. In this case each
+                command in the pipeline will be executed directly as a subprocess and
+                the commands will be connected stdout-to-stdin in Python. This avoids
+                the overhead of starting a shell and the quote replacements that are
+                needed to pass the command to the shell (Default: True).
+            sink: A Sink from the sink module for the command output (e.g. DiscardSink,
+                LoggerSink, FileSink or RingBufferSink). A function that receives each
+                line as a string or a logging.Logger can also be used. By default the
+                output is printed.
+            capture: Set to bytes to capture the stdout of the command in memory and
+                return it in the output of the result. Set to numpy to load the stdout
+                as a Radiance matrix in a NumPy array with (rows, columns, components)
+                shape. This is useful for binary outputs (e.g. -ffd) which are not
+                printed correctly as text. If the output has no header the format and
+                the number of components are found from the options of the last
+                command (e.g. -h -ffd). The output of the command should not be
+                redirected to a file (Default: None).
+            timeout: Maximum time in seconds for the command to run. The command and
+                all the processes that it starts are killed and a CommandTimeoutError
+                is raised if the command takes longer (Default: None).
+            cancel: An optional CancelToken from the cancel module. Calling the cancel
+                method of the token from another thread kills the command and all the
+                processes that it starts. A CommandCancelledError is raised if the
+                command is cancelled.
+            cache: An optional ResultCache from the cache module. If the command and
+                its input files have not changed since the last run the output file is
+                restored from the cache instead of running the command. The cache
+                cannot be used with capture.
+            nested: Set to pipe or buffer to start the nested commands in the inputs
+                of this command (e.g. Rmtxop matrices that are set to other commands)
+                at the same time and feed their outputs to this command through
+                anonymous pipes. By default the command runs each nested command
+                through its own shell one after the other. In pipe mode a nested
+                command waits for this command to read its output. In buffer mode the
+                outputs are kept in memory so all the nested commands can run to the
+                end. This option can only be used with shell set to False
+                (Default: None).
+            max_repeats: Maximum number of times that the same warning or error
+                message is sent to the sink. Radiance can repeat some warnings for
+                every ray. The messages that are repeated more are summarized with
+                their count when the command is finished. By default all the messages
+                are sent to the sink (Default: None).
 
         Returns:
-            - int: Command return code.
+            A CommandResult with the return code, the captured stderr, the parsed
+            stderr diagnostics, the wall time and the CPU time and peak memory for each
+            command in the pipeline. The result compares equal to the return code of
+            the command.
         """
-        cmd = self.to_radiance().replace('\\', '/')
-        rc = run_command(cmd, env, cwd)
+        if nested and shell:
+            raise ValueError('Nested commands can only be wired with shell=False.')
+        if cache is not None:
+            if capture:
+                raise ValueError('The outputs cannot be captured from a cached run.')
+            return cache.run(
+                self, env, cwd, shell=shell, sink=sink, timeout=timeout, cancel=cancel,
+                nested=nested, max_repeats=max_repeats
+            )
+        # find the last command in the pipeline to check the output
+        last_command = self
+        while last_command.pipe_to:
+            last_command = last_command.pipe_to
+        if capture:
+            _check_capture(capture, last_command.output)
+        if shell:
+            output = last_command.output
+            if compression(output):
+                # the output is compressed in Python and not redirected by the shell
+                cmd = _remove_redirect(self.to_radiance())
+            else:
+                cmd, output = self.to_radiance(), None
+            rc = run_command(
+                cmd.replace('\\', '/'), env, cwd, sink=sink, capture=capture,
+                timeout=timeout, cancel=cancel, output=output, max_repeats=max_repeats
+            )
+        else:
+            rc = run_pipeline(
+                self.to_argv(), env, cwd, sink=sink, capture=capture, timeout=timeout,
+                cancel=cancel, nested=nested, max_repeats=max_repeats
+            )
         self.after_run()
         return rc
 
+    def run_async(self, env=None, cwd=None):
+        """Run command as a subprocess from an asyncio event loop.
+
+        The command is executed without a shell. Await the returned coroutine to start
+        the command and get an AsyncRun object which streams stdout and stderr through
+        async iterators. This method is only available in Python 3.
+
+        .. code-block:: python
+
+            run = await rtrace.run_async()
+            async for line in run.stdout:
+                print(line.decode('utf-8'), end='')
+            await run.wait()
+
+        Args:
+            env: Environmental variables (default: None).
+            cwd: Working directory (Default: '.').
+
+        Returns:
+            A coroutine that starts the command and returns an AsyncRun object.
+        """
+        from ._command_async import run_async
+        return run_async(self.to_argv(), env, cwd, self.after_run)
+
     def after_run(self):
         """After run script.
 
@@ -0,0 +1,248 @@
+"""Run Radiance commands from an asyncio event loop.
+
+This module uses Python 3 only syntax and is imported by Command.run_async when it is
+called for the first time.
+"""
+import asyncio
+import os
+
+from ._exception import ReturnCodeError
+from ._command_util import _process_command, _update_env, _find_executable, \
+    _file_path, _group_kwargs, _kill_processes
+
+
+class _LineIterator(object):
+    """Async iterator over the lines of an asyncio StreamReader."""
+
+    __slots__ = ('_reader',)
+
+    def __init__(self, reader):
+        self._reader = reader
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._reader is None:
+            raise StopAsyncIteration
+        line = await self._reader.readline()
+        if not line:
+            raise StopAsyncIteration
+        return line
+
+
+class _QueueIterator(object):
+    """Async iterator over the lines that are collected in an asyncio Queue."""
+
+    __slots__ = ('_queue', '_done')
+
+    def __init__(self, queue):
+        self._queue = queue
+        self._done = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._done:
+            raise StopAsyncIteration
+        line = await self._queue.get()
+        if line is None:
+            self._done = True
+            raise StopAsyncIteration
+        return line
+
+
+class AsyncRun(object):
+    """A running command that is started by Command.run_async.
+
+    Use stdout and stderr to stream the outputs as bytes lines and await the wait
+    method to get the return code.
+
+    .. code-block:: python
+
+        run = await rtrace.run_async()
+        async for line in run.stdout:
+            print(line.decode('utf-8'), end='')
+        await run.wait()
+
+    stderr is read in the background from the moment the command starts so a command
+    that writes many warnings never blocks. stdout is read from the command only when
+    it is consumed. Lines that are not consumed are discarded when wait is called.
+
+    Properties:
+        * processes
+        * stdout
+        * stderr
+        * return_code
+    """
+
+    __slots__ = ('_processes', '_stdout', '_stderr', '_stderr_task', '_after_run',
+                 '_return_code')
+
+    def __init__(self, processes, stdout_reader, stderr_queue, stderr_task,
+                 after_run=None):
+        self._processes = processes
+        self._stdout = _LineIterator(stdout_reader)
+        self._stderr = _QueueIterator(stderr_queue)
+        self._stderr_task = stderr_task
+        self._after_run = after_run
+        self._return_code = None
+
+    @property
+    def processes(self):
+        """List of asyncio subprocesses - one for each command in the pipeline."""
+        return self._processes
+
+    @property
+    def stdout(self):
+        """Async iterator over the stdout lines of the last command in the pipeline.
+
+        It will be empty if the output is redirected to a file.
+        """
+        return self._stdout
+
+    @property
+    def stderr(self):
+        """Async iterator over the stderr lines of all the commands in the pipeline."""
+        return self._stderr
+
+    @property
+    def return_code(self):
+        """Return code of the command or None if it is still running."""
+        return self._return_code
+
+    async def wait(self):
+        """Wait for the command to finish.
+
+        Returns:
+            - int: Command return code.
+        """
+        # drain stdout if it is not consumed so the process doesn't block on a full pipe
+        async for _ in self._stdout:
+            pass
+        await self._stderr_task
+
+        # similar to pipefail the return code is the code from the last command that
+        # failed
+        rc = 0
+        for process in self._processes:
+            await process.wait()
+            if process.returncode != 0:
+                rc = process.returncode
+        self._return_code = rc
+
+        if rc != 0:
+            raise ReturnCodeError(rc)
+
+        if self._after_run:
+            self._after_run()
+        return 0
+
+    def kill(self):
+        """Kill all the commands in the pipeline and the processes that they start."""
+        _kill_processes(self._processes)
+
+
+async def _pump(reader, queue):
+    """Read all the lines from a stream into a queue."""
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            await queue.put(line)
+    finally:
+        await queue.put(None)
+
+
+async def _pipe_reader(read_fd):
+    """Create an asyncio StreamReader for the read end of an os pipe."""
+    loop = asyncio.get_event_loop()
+    reader = asyncio.StreamReader()
+    protocol = asyncio.StreamReaderProtocol(reader)
+    await loop.connect_read_pipe(lambda: protocol, os.fdopen(read_fd, 'rb', 0))
+    return reader
+
+
+async def run_async(input_command, env=None, cwd=None, after_run=None):
+    """Start a command from an asyncio event loop without using the shell.
+
+    Args:
+        input_command: Input command. It can be a command string or a list of pipeline
+            stages as returned by Command.to_argv.
+        env: Additional environmental variable that will be added to global environment.
+        cwd: Current working directory. If provided command will be executed from this
+            folder.
+        after_run: An optional function that will be called after the command finishes
+            successfully.
+
+    Returns:
+        An AsyncRun object.
+    """
+    if isinstance(input_command, (list, tuple)):
+        stages = input_command
+    else:
+        stages = _process_command(input_command)
+    g_env = _update_env(env)
+
+    # stderr from all the commands is collected in the same pipe
+    stderr_read, stderr_write = os.pipe()
+    stderr_reader = await _pipe_reader(stderr_read)
+
+    processes = []
+    previous_stdout = next_stdout = None
+    last_index = len(stages) - 1
+    try:
+        for count, stage in enumerate(stages):
+            files = []
+            next_stdout = None
+            if stage['stdin'] is not None:
+                stdin = open(_file_path(stage['stdin'], cwd), 'rb')
+                files.append(stdin)
+            elif previous_stdout is not None:
+                stdin = previous_stdout
+            else:
+                stdin = asyncio.subprocess.DEVNULL
+
+            if count != last_index:
+                next_stdout, stdout = os.pipe()
+            elif stage['stdout'] is not None:
+                stdout = open(_file_path(stage['stdout'], cwd), stage['mode'] + 'b')
+                files.append(stdout)
+            else:
+                stdout = asyncio.subprocess.PIPE
+
+            argv = list(stage['argv'])
+            argv[0] = _find_executable(argv[0], g_env)
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *argv, stdin=stdin, stdout=stdout, stderr=stderr_write, env=g_env,
+                    cwd=cwd, **_group_kwargs()
+                )
+            finally:
+                for f in files:
+                    f.close()
+                if previous_stdout is not None:
+                    os.close(previous_stdout)
+                    previous_stdout = None
+                if next_stdout is not None:
+                    os.close(stdout)
+            processes.append(process)
+            previous_stdout = next_stdout
+    except Exception:
+        for fd in (previous_stdout, next_stdout):
+            if fd is not None:
+                os.close(fd)
+        for process in processes:
+            process.kill()
+            await process.wait()
+        raise
+    finally:
+        os.close(stderr_write)
+
+    stderr_queue = asyncio.Queue()
+    stderr_task = asyncio.ensure_future(_pump(stderr_reader, stderr_queue))
+    return AsyncRun(
+        processes, processes[-1].stdout, stderr_queue, stderr_task, after_run
+    )
@@ -2,11 +2,25 @@
 from __future__ import print_function  # hello Python 2 - let's say bye soon.
 
 import subprocess
-import re
-import shlex
 import platform
 import os
 import sys
+import threading
+import time
+import signal
+
+try:
+    import queue
+except ImportError:  # python 2
+    import Queue as queue
+
+from ._exception import ReturnCodeError, CommandTimeoutError, CommandCancelledError
+from .result import CommandResult, StageResult
+from .matrix import to_numpy, output_format
+from .sink import to_sink, RingBufferSink
+from .diagnostics import Diagnostics, DiagnosticSink
+from .environment import RadianceEnvironment
+from .compression import compression, open_file
 
 
 if sys.version_info[0] < 3:
@@ -14,183 +28,886 @@ if sys.version_info[0] < 3:
 else:
     STDOUT_CHECK = b''
 
+# size of the chunks for reading the outputs of the commands
+CHUNK_SIZE = 65536
+# maximum size of an incomplete line before it is sent to the sink
+MAX_PENDING = 1048576
+# maximum size of the stderr that is kept in the CommandResult. The full record of the
+# messages is in the diagnostics of the result.
+MAX_STDERR = 65536
+# valid modes for connecting the nested '!command' inputs to a pipeline
+NESTED_MODES = ('pipe', 'buffer')
+
+
+def _send(sink, data):
+    """Send complete lines of output to a sink."""
+    if sink.lines:
+        for line in data.splitlines(True):
+            sink.write(line)
+    else:
+        sink.write(data)
+
+
+def _read_chunks(stream, sink, chunks=None):
+    """Read a stream in large chunks and send the complete lines to the sink.
+
+    Args:
+        stream: A file-like object in binary mode.
+        sink: A Sink object.
+        chunks: An optional Sink to collect the raw chunks (e.g. a RingBufferSink).
+    """
+    pending = STDOUT_CHECK
+    # read1 returns the available data without waiting for a full chunk
+    read = getattr(stream, 'read1', stream.read)
+    try:
+        for chunk in iter(lambda: read(CHUNK_SIZE), STDOUT_CHECK):
+            if chunks is not None:
+                chunks.write(chunk)
+            # only send complete lines so the outputs from stdout and stderr are not
+            # mixed in the middle of a line
+            index = chunk.rfind(b'\n') + 1
+            if index == 0 and len(pending) < MAX_PENDING:
+                pending += chunk
+                continue
+            if index == 0:
+                index = len(chunk)
+            data, pending = pending + chunk[:index], chunk[index:]
+            _send(sink, data)
+        if pending:
+            _send(sink, pending)
+    except Exception:
+        # keep reading so the process doesn't get blocked on a full pipe
+        while stream.read(CHUNK_SIZE):
+            pass
+    finally:
+        stream.close()
+
+
+def _read_bytes(stream):
+    """Read all the data from a stream as bytes."""
+    chunks = []
+    try:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), STDOUT_CHECK):
+            chunks.append(chunk)
+    finally:
+        stream.close()
+    return STDOUT_CHECK.join(chunks)
+
+
+def _copy_stream(stream, output_file):
+    """Copy all the data from a stream to a file object."""
+    try:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), STDOUT_CHECK):
+            output_file.write(chunk)
+    finally:
+        stream.close()
+
+
+def _open_output(path, mode='w', cwd=None):
+    """Open a file for the stdout of a command.
+
+    Compressed files are opened based on their extensions.
+    """
+    path = _file_path(path, cwd)
+    folder = os.path.dirname(path)
+    if folder and not os.path.isdir(folder):
+        raise ValueError('Folder for the output file does not exist: %s' % folder)
+    return open_file(path, mode + 'b')
+
+
+def _group_kwargs():
+    """Get Popen keyword arguments to start a process in a new process group.
+
+    Killing the process group kills the process and all the child processes that it
+    starts.
+    """
+    if os.name == 'nt':
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    if sys.version_info >= (3, 11):
+        return {'process_group': 0}
+    if sys.version_info[0] >= 3:
+        return {'start_new_session': True}
+    return {'preexec_fn': os.setpgrp}
+
+
+def _kill_processes(processes):
+    """Kill the process groups for a list of processes that are started by Popen."""
+    for process in processes:
+        if process.returncode is not None:
+            continue
+        try:
+            if os.name == 'nt':
+                with open(os.devnull, 'wb') as devnull:
+                    subprocess.call(
+                        ['taskkill', '/F', '/T', '/PID', str(process.pid)],
+                        stdout=devnull, stderr=devnull
+                    )
+            else:
+                os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            # the process is already finished
+            pass
+
+
+def _exit_code(status):
+    """Convert a status from os.wait4 to a return code similar to Popen.returncode."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _wait(process, command, start_time):
+    """Wait for a process to finish and collect its resource usage.
+
+    Args:
+        process: A subprocess.Popen object.
+        command: The command for this process as a string.
+        start_time: Start time of the process from time.time().
+
+    Returns:
+        A StageResult.
+    """
+    usage = None
+    if hasattr(os, 'wait4') and process.returncode is None:
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+        except OSError:
+            # the process is already collected
+            process.wait()
+        else:
+            process.returncode = _exit_code(status)
+    else:
+        process.wait()
+    wall_time = time.time() - start_time
+
+    if usage is None:
+        return StageResult(command, process.returncode, wall_time)
+
+    max_rss = usage.ru_maxrss
+    if sys.platform == 'darwin':
+        # Mac reports the value in bytes
+        max_rss = max_rss // 1024
+    return StageResult(
+        command, process.returncode, wall_time, usage.ru_utime, usage.ru_stime, max_rss
+    )
+
+
+def _collect(command, processes, names, start_time, stdout, stderr, sink=None,
+             capture=None, timeout=None, cancel=None, output_file=None,
+             max_repeats=None, argv=None):
+    """Read the outputs from a running command and wait for it to finish.
 
-def run_command(input_command, env=None, cwd=None, mute=True):
+    Args:
+        command: The command as a string.
+        processes: A list of subprocess.Popen objects for the running command.
+        names: A list of names for each process.
+        start_time: Start time of the command from time.time().
+        stdout: Binary stream for the stdout of the command or None.
+        stderr: Binary stream for the stderr of the command or None.
+        sink: A Sink, a function that receives each line of the outputs or None to
+            print the outputs.
+        capture: Set to bytes or numpy to capture the stdout in the output of the
+            CommandResult instead of sending it to the sink (Default: None).
+        timeout: Maximum time in seconds for the command to run (Default: None).
+        cancel: An optional CancelToken to kill the command.
+        output_file: An optional binary file object to write the stdout of the command
+            instead of sending it to the sink (e.g. a compressed file).
+        max_repeats: Maximum number of times that the same stderr message is sent to
+            the sink (Default: None).
+        argv: Arguments of the last command in the pipeline. They are used to find
+            the format of the stdout if it is loaded in a NumPy array and it has no
+            header (Default: None).
+
+    Returns:
+        A CommandResult. A ReturnCodeError will be raised if the command fails.
+    """
+    killed = []
+    timer = None
+    if timeout is not None:
+        def _timeout():
+            killed.append('timeout')
+            _kill_processes(processes)
+        timer = threading.Timer(timeout, _timeout)
+        timer.daemon = True
+        timer.start()
+    if cancel is not None:
+        cancel.register(processes)
+
+    try:
+        sink = to_sink(sink)
+        diagnostics = Diagnostics()
+        stderr_sink = DiagnosticSink(sink, diagnostics, max_repeats)
+        # only keep the last part of stderr in memory
+        stderr_tail = RingBufferSink(MAX_STDERR)
+        stderr_thread = None
+        if stderr is not None:
+            stderr_thread = threading.Thread(
+                target=_read_chunks, args=(stderr, stderr_sink, stderr_tail)
+            )
+            stderr_thread.daemon = True
+            stderr_thread.start()
+
+        output = None
+        if stdout is not None:
+            if capture:
+                output = _read_bytes(stdout)
+            elif output_file is not None:
+                _copy_stream(stdout, output_file)
+            else:
+                _read_chunks(stdout, sink)
+        if stderr_thread is not None:
+            stderr_thread.join()
+        stderr_sink.flush()
+
+        stages = [
+            _wait(process, name, start_time) for process, name in zip(processes, names)
+        ]
+    except BaseException:
+        # do not leave the commands running after an exception or a KeyboardInterrupt
+        _kill_processes(processes)
+        raise
+    finally:
+        if timer is not None:
+            timer.cancel()
+        if cancel is not None:
+            cancel.unregister(processes)
+
+    result = CommandResult(
+        command, stages, time.time() - start_time, stderr_tail.text, output,
+        diagnostics=diagnostics
+    )
+    if killed:
+        raise CommandTimeoutError(timeout, result)
+    if cancel is not None and cancel.cancelled and result.return_code != 0:
+        raise CommandCancelledError(result)
+    if result.return_code != 0:
+        raise ReturnCodeError(result.return_code, result)
+    if capture == 'numpy':
+        fmt, ncomp = output_format(argv)
+        result.output = to_numpy(output or STDOUT_CHECK, fmt, ncomp)
+    return result
+
+
+def _check_capture(capture, stdout):
+    """Check the capture input for running a command."""
+    if not capture:
+        return
+    if capture not in ('bytes', 'numpy'):
+        raise ValueError(
+            'Invalid capture input: %s. Valid inputs are bytes and numpy.' % capture
+        )
+    if stdout is not None:
+        raise ValueError(
+            'The output of the command is redirected to a file (%s) and it cannot be '
+            'captured.' % stdout
+        )
+
+
+def run_command(input_command, env=None, cwd=None, mute=True, sink=None, capture=None,
+                timeout=None, cancel=None, output=None, max_repeats=None):
     """Run a shell command.
-    This function prints both STDOUT and STDERR to the same PIPE. Use shell piping
-    to pipe the stdout from the commands to a file.
+    This function prints both STDOUT and STDERR. Use shell piping to pipe the stdout
+    from the commands to a file.
     Args:
         input_command: Input command.
         env: Additional environmental variable that will be added to global environment.
+            It can also be a RadianceEnvironment.
         cwd: Current working directory. If provided command will be executed from this
-            folder.
+            folder. The working directory is only set for the subprocess and the
+            working directory of the current process doesn't change. This makes it safe
+            to run several commands with different working directories from different
+            threads at the same time.
+        mute: Set to False to print the command before running it.
+        sink: A Sink from the sink module for the STDOUT and STDERR (e.g. DiscardSink,
+            LoggerSink, FileSink or RingBufferSink). A function that receives each line
+            as a string or a logging.Logger can also be used. By default the outputs
+            are printed.
+        capture: Set to bytes to capture the STDOUT in the output of the result as
+            bytes. Set to numpy to load the STDOUT as a Radiance matrix in a NumPy
+            array. The format of an output without a header is found from the
+            options of the last command (e.g. -ffd). By default STDOUT is sent to the
+            sink (Default: None).
+        timeout: Maximum time in seconds for the command to run. The command and all
+            its child processes are killed and a CommandTimeoutError is raised if the
+            command takes longer (Default: None).
+        cancel: An optional CancelToken from the cancel module to kill the command
+            from another thread. A CommandCancelledError is raised if the command is
+            cancelled.
+        output: Optional path to a file for the STDOUT of the command. If the path
+            ends with .gz, .bz2, .xz or .zst the output is compressed while the
+            command is running. See the compression module (Default: None).
+        max_repeats: Maximum number of times that the same message in STDERR is sent
+            to the sink. The messages that are repeated more are summarized with
+            their count at the end. By default all the messages are sent to the sink.
+            See the diagnostics module (Default: None).
+
+    Returns:
+        A CommandResult with the return code, the captured STDERR, the parsed STDERR
+        diagnostics and the resource usage for the command. A ReturnCodeError will be
+        raised if the return code is not zero.
     """
+    _check_capture(capture, output)
     if platform.system() == 'Windows':
         command = input_command.replace('\'', '"')
     else:
         command = input_command.replace('"', '\'')
 
-    # change cwd - Popen cwd input simply doesn't work.
-    cur_dir = os.getcwd()
-    if cwd:
-        os.chdir(cwd)
-
     # update environmental variable
-    g_env = os.environ.copy()
-    if env:
-        for k, v in env.items():
-            if k.strip().upper() == 'PATH':
-                g_env['PATH'] = os.pathsep.join((v, g_env['PATH']))
-            else:
-                g_env[k] = v
-
-    g_env['PYTHONUNBUFFERED'] = '1'  # ensure stdout will not be buffered
+    g_env = _update_env(env)
 
     command = command.replace('\\', '/')
     if not mute:
         print('running %s' % command)
 
+    output_file = _open_output(output, 'w', cwd) if output else None
+    start_time = time.time()
     try:
-        process = subprocess.Popen(
-            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT, shell=True, env=g_env
-        )
-    except Exception as e:
-        # this is an edge case that is happening for certain commands on Mac when
-        # the command is executed from inside IronPython 2.7
-        # see: https://discourse.ladybug.tools/t/hdr-adjust-false-color-not-working-on-mac/16941/3
-        if 'Cannot redirect stderr to stdout yet' in str(e):
+        try:
             process = subprocess.Popen(
                 command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE, shell=True, env=g_env
+                stderr=subprocess.PIPE, shell=True, env=g_env, cwd=cwd,
+                **_group_kwargs()
             )
-        else:
+        except Exception as e:
             raise ValueError(e)
+        # nothing will be written to stdin
+        process.stdin.close()
+
+        argv = _process_command(command)[-1]['argv'] if capture == 'numpy' else None
+        return _collect(
+            command, [process], [command], start_time, process.stdout,
+            process.stderr, sink, capture, timeout, cancel, output_file, max_repeats,
+            argv
+        )
+    finally:
+        if output_file is not None:
+            output_file.close()
 
-    try:
-        for line in iter(process.stdout.readline, STDOUT_CHECK):
-            try:
-                # Python 3 - almost all the time that we use this library
-                print(line.decode('utf-8'), end='')
-            except AttributeError:
-                # python 2 - line is already a string
-                print(line, end='')
-    except Exception:  # nothing in stdout
-        pass
 
-    _, stderr = process.communicate()
-    rc = process.returncode
+def _tokenize_command(input_command):
+    """Split a command string into arguments and unquoted shell operators.
+
+    Quotes are removed from the arguments the same way a POSIX shell does so paths with
+    spaces and quoted expressions (e.g. rcalc -e '$1=$1*179') are passed as a single
+    argument. Pipe and redirection operators (|, <, >, >>) that are not inside quotes
+    are returned as ``(operator, True)`` tuples. Arguments are returned as
+    ``(argument, False)``.
+    """
+    tokens = []
+    current = []
+    in_token = False
+    quote = None
+    index = 0
+    length = len(input_command)
+    while index < length:
+        char = input_command[index]
+        if quote:
+            if char == quote:
+                quote = None
+            else:
+                current.append(char)
+        elif char in ('"', "'"):
+            quote = char
+            in_token = True
+        elif char.isspace():
+            if in_token:
+                tokens.append((''.join(current), False))
+                current = []
+                in_token = False
+        elif char in ('|', '<', '>'):
+            if in_token:
+                tokens.append((''.join(current), False))
+                current = []
+                in_token = False
+            if char == '>' and input_command[index + 1:index + 2] == '>':
+                char = '>>'
+                index += 1
+            tokens.append((char, True))
+        else:
+            current.append(char)
+            in_token = True
+        index += 1
+
+    if quote:
+        raise ValueError('Unbalanced quotes in command:\n\t%s' % input_command)
+    if in_token:
+        tokens.append((''.join(current), False))
+    return tokens
 
-    if cwd:
-        os.chdir(cur_dir)
 
-    try:
-        for line in iter(stderr.readline, STDOUT_CHECK):
-            try:
-                # Python 3 - almost all the time that we use this library
-                print(line.decode('utf-8'), end='')
-            except AttributeError:
-                # python 2 - line is already a string
-                print(line, end='')
-    except Exception:  # nothing in stderr
-        pass
+def _input_argv(value):
+    """Split an input of a command into arguments.
+
+    The inputs of the commands are kept in the format of the command string. Paths
+    with spaces are in quotes and some inputs include several paths. The quotes are
+    removed from the arguments.
+    """
+    if value is None:
+        return []
+    return [token for token, _ in _tokenize_command(str(value))]
 
-    if rc != 0:
-        raise RuntimeError('None zero return code: %d' % rc)
 
-    # only gets here is successful
-    return 0
+def _remove_redirect(input_command):
+    """Remove the redirection of stdout to a file from the end of a command string.
+
+    Quotes are respected the same way as _tokenize_command and a redirection that is
+    followed by a pipe is not the final redirection of the command.
+    """
+    quote = None
+    index = None
+    for count, char in enumerate(input_command):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ('"', "'"):
+            quote = char
+        elif char == '|':
+            index = None
+        elif char == '>' and (count == 0 or input_command[count - 1] != '>'):
+            index = count
+    if index is None:
+        return input_command
+    return input_command[:index].rstrip()
 
 
 def _process_command(input_command):
     """Process input command before execution.
 
     This method:
-        1. separates output file if the output is redirected to a file using >
-        2. breaks-down the command into several commands if piping is happening |
+        1. separates output file if the output is redirected to a file using > or >>
+        2. separates input file if the input is redirected from a file using <
+        3. breaks-down the command into several commands if piping is happening |
+
+    Returns:
+        A list of dictionaries - one for each command in the pipeline. Each dictionary
+        has the following keys:
+
+        * argv: List of command arguments starting with the executable name.
+        * stdin: Path to a file for stdin or None. The stdin for all the commands
+          except for the first one is the stdout of the command before it.
+        * stdout: Path to a file for stdout or None. The stdout for all the commands
+          except for the last one is piped to the next command.
+        * mode: File mode for writing stdout to file. It is either 'w' or 'a'.
     """
-    def _raw(text):
-        """Raw string representation.
+    stages = []
+    stage = {'argv': [], 'stdin': None, 'stdout': None, 'mode': 'w'}
+    tokens = _tokenize_command(input_command)
+    count = len(tokens)
+    index = 0
+    while index < count:
+        token, is_operator = tokens[index]
+        if not is_operator:
+            stage['argv'].append(token)
+            index += 1
+            continue
+        if token == '|':
+            stages.append(stage)
+            stage = {'argv': [], 'stdin': None, 'stdout': None, 'mode': 'w'}
+            index += 1
+            continue
+        # redirection to or from a file
+        try:
+            target, target_is_operator = tokens[index + 1]
+        except IndexError:
+            target_is_operator = True
+        if target_is_operator:
+            raise ValueError(
+                'Missing file path after %s in command:\n\t%s' % (token, input_command)
+            )
+        if token == '<':
+            stage['stdin'] = target
+        else:
+            stage['stdout'] = target
+            stage['mode'] = 'a' if token == '>>' else 'w'
+        index += 2
+    stages.append(stage)
+
+    for count, stage in enumerate(stages):
+        if not stage['argv']:
+            raise ValueError('Empty command in pipeline:\n\t%s' % input_command)
+        if count != 0 and stage['stdin'] is not None:
+            raise ValueError(
+                'You cannot use < for stdin and pipe data to command '
+                'at the same time:\n\t%s' % ' '.join(stage['argv'])
+            )
+        if count != len(stages) - 1 and stage['stdout'] is not None:
+            raise ValueError(
+                'You cannot redirect stdout with > and pipe the'
+                ' outputs at the same time:\n\t%s' % ' '.join(stage['argv'])
+            )
+    return stages
 
-        This is useful to handle edge cases in Windows.
-        """
 
-        escape_dict = {
-            '\a': r'\a', '\b': r'\b', '\c': r'\c', '\f': r'\f', '\n': r'\n',
-            '\r': r'\r', '\t': r'\t', '\v': r'\v', '\'': r'\'', '\"': r'\"',
-            '\0': r'\0', '\1': r'\1', '\2': r'\2', '\3': r'\3', '\4': r'\4',
-            '\5': r'\5', '\6': r'\6', '\7': r'\7', '\8': r'\8', '\9': r'\9'
-        }
+def _update_env(env=None):
+    """Get a copy of global environment updated with the input environmental variables.
 
-        new_string = ''
-        for char in text:
-            try:
-                new_string += escape_dict[char]
-            except KeyError:
-                new_string += char
-        return new_string.replace('\\', '/')
-
-    output_cmd = []
-    commands = ' '.join(input_command.split()).split('|')
-    STDOUT = (-1, '')  # -1 is PIPE
-
-    for count, command in enumerate(commands[:-1]):
-
-        assert '>' not in command.split('&')[-1], \
-            'You cannot redirect stdout with > and pipe the' \
-            ' outputs at the same time:\n\t%s' % command
-
-        # check for stdin
-        # -1 means use of stdout from the command before this command
-        stdin = -1 if count != 0 else ''
-        if '<' in command:
-            if count == 0:
-                stdin = _raw(shlex.split(command.split('<')[-1])[0])
-                # replace stdin from the original command
-                command = re.sub(r"\s<+\s\S+", '', command)
+    For a RadianceEnvironment the merged environment is returned without a copy.
+    """
+    if isinstance(env, RadianceEnvironment):
+        return env.env
+    g_env = os.environ.copy()
+    if env:
+        for k, v in env.items():
+            if k.strip().upper() == 'PATH':
+                g_env['PATH'] = os.pathsep.join((v, g_env['PATH']))
+            else:
+                g_env[k] = v
+
+    g_env['PYTHONUNBUFFERED'] = '1'  # ensure stdout will not be buffered
+    return g_env
+
+
+def _find_executable(name, env):
+    """Find full path to an executable using the PATH from the input environment.
+
+    On Windows Popen searches the PATH of the current process and not the PATH of the
+    environment that is passed to the subprocess.
+    """
+    if os.name != 'nt' or os.path.dirname(name):
+        return name
+    try:
+        from shutil import which
+    except ImportError:  # python 2
+        return name
+    return which(name, path=env.get('PATH')) or name
+
+
+def _file_path(path, cwd=None):
+    """Get the path to a stdin or stdout file relative to the working directory."""
+    if cwd and not os.path.isabs(path):
+        return os.path.join(cwd, path)
+    return path
+
+
+def _start_pipeline(stages, env, cwd=None, stderr=None):
+    """Start all the commands in a pipeline and connect them stdout-to-stdin.
+
+    The stdout of the last command is a PIPE if it is not redirected to a file.
+
+    Args:
+        stages: A list of commands as returned by _process_command.
+        env: Full environment for the subprocesses.
+        cwd: Working directory for the subprocesses.
+        stderr: A file descriptor that receives the stderr of all the commands.
+
+    Returns:
+        A list of subprocess.Popen objects - one for each command in the pipeline.
+    """
+    processes = []
+    files = []
+    previous_stdout = None
+    last_index = len(stages) - 1
+    try:
+        for count, stage in enumerate(stages):
+            if stage['stdin'] is not None:
+                stdin = open(_file_path(stage['stdin'], cwd), 'rb')
+                files.append(stdin)
+            elif previous_stdout is not None:
+                stdin = previous_stdout
+            else:
+                stdin = open(os.devnull, 'rb')
+                files.append(stdin)
+
+            if count != last_index:
+                stdout = subprocess.PIPE
+            elif stage['stdout'] is not None:
+                stdout = open(_file_path(stage['stdout'], cwd), stage['mode'] + 'b')
+                files.append(stdout)
             else:
-                raise ValueError(
-                    'You cannot use < for stdin and pipe data to command '
-                    'at the same time:\n\t%s' % command
-                )
-
-        output_cmd.append(
-            {
-                'cmd': command.strip().replace('\\', '/'),
-                'stdin': stdin.strip() if stdin != -1 else stdin,
-                'stdout': STDOUT
-            }
+                stdout = subprocess.PIPE
+
+            argv = list(stage['argv'])
+            argv[0] = _find_executable(argv[0], env)
+            kwargs = _group_kwargs()
+            if stage.get('pass_fds'):
+                kwargs['pass_fds'] = stage['pass_fds']
+            process = subprocess.Popen(
+                argv, stdin=stdin, stdout=stdout, stderr=stderr, env=env, cwd=cwd,
+                **kwargs
+            )
+            processes.append(process)
+            if previous_stdout is not None:
+                # close the parent copy so the command before gets SIGPIPE if the
+                # next command exits early
+                previous_stdout.close()
+            previous_stdout = process.stdout if count != last_index else None
+    except Exception:
+        for process in processes:
+            process.kill()
+            process.wait()
+        raise
+    finally:
+        for f in files:
+            f.close()
+    return processes
+
+
+def _relay(stream, fd):
+    """Copy a stream to a file descriptor through an in-memory buffer.
+
+    The stream is read as fast as the command that writes to it produces the data and
+    the data is written to the file descriptor as fast as the command that reads from
+    it consumes the data. The writer never waits for the reader.
+
+    Args:
+        stream: A file-like object in binary mode. It will be closed at the end.
+        fd: A file descriptor for the write end of a pipe. It will be closed at the end.
+    """
+    chunks = queue.Queue()
+    state = {'closed': False}
+
+    def _write():
+        with os.fdopen(fd, 'wb') as output:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    break
+                try:
+                    output.write(chunk)
+                except (IOError, OSError):
+                    # the reader is closed
+                    state['closed'] = True
+                    break
+            try:
+                output.flush()
+            except (IOError, OSError):
+                state['closed'] = True
+
+    writer = threading.Thread(target=_write)
+    writer.daemon = True
+    writer.start()
+    try:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), STDOUT_CHECK):
+            if not state['closed']:
+                chunks.put(chunk)
+    finally:
+        stream.close()
+        chunks.put(None)
+
+
+def _start_nested(stages, env, cwd=None, stderr=None, mode='pipe'):
+    """Start the nested commands in the arguments of a pipeline.
+
+    Radiance commands such as rmtxop and dctimestep accept '!command' in place of a
+    file and run the nested command through a shell one after the other. This function
+    starts all the nested commands at the same time and replaces each '!command'
+    argument with a /dev/fd/N path for an anonymous pipe that is connected to the
+    output of the nested command.
+
+    Args:
+        stages: A list of commands as returned by _process_command.
+        env: Full environment for the subprocesses.
+        cwd: Working directory for the subprocesses.
+        stderr: A file descriptor that receives the stderr of the nested commands.
+        mode: Set to pipe to connect the output of the nested commands directly to the
+            pipe. A nested command waits when the pipe is full until the main command
+            reads its input. Set to buffer to read the output of the nested commands
+            into memory so they can all run to the end without waiting.
+
+    Returns:
+        A tuple with three items. A new list of stages with the nested commands
+        replaced with /dev/fd paths, the list of subprocess.Popen objects for the
+        nested commands and the list of names for these processes. The file
+        descriptors for each stage are in the pass_fds key of the stage and they
+        should be closed after the stage is started.
+    """
+    assert mode in NESTED_MODES, \
+        'Invalid mode: %s. Valid modes are %s.' % (mode, ', '.join(NESTED_MODES))
+    processes = []
+    names = []
+    new_stages = []
+    try:
+        for stage in stages:
+            stage = dict(stage)
+            stage['argv'] = list(stage['argv'])
+            stage['pass_fds'] = []
+            for index, arg in enumerate(stage['argv']):
+                if index == 0 or not arg.startswith('!'):
+                    continue
+                nested = _process_command(arg[1:])
+                if nested[-1]['stdout'] is not None:
+                    raise ValueError(
+                        'The output of a nested command cannot be redirected to a '
+                        'file:\n\t%s' % arg[1:]
+                    )
+                nested, nested_processes, nested_names = \
+                    _start_nested(nested, env, cwd, stderr, mode)
+                processes.extend(nested_processes)
+                names.extend(nested_names)
+                try:
+                    nested_processes = _start_pipeline(nested, env, cwd, stderr)
+                finally:
+                    _close_fds(nested)
+                processes.extend(nested_processes)
+                names.extend(' '.join(s['argv']) for s in nested)
+                output = nested_processes[-1].stdout
+                if mode == 'buffer':
+                    fd, write_fd = os.pipe()
+                    thread = threading.Thread(target=_relay, args=(output, write_fd))
+                    thread.daemon = True
+                    thread.start()
+                else:
+                    fd = os.dup(output.fileno())
+                    output.close()
+                stage['pass_fds'].append(fd)
+                stage['argv'][index] = '/dev/fd/%d' % fd
+            new_stages.append(stage)
+    except Exception:
+        _kill_processes(processes)
+        _close_fds(new_stages)
+        raise
+    return new_stages, processes, names
+
+
+def _close_fds(stages):
+    """Close the parent copies of the file descriptors that are passed to the stages."""
+    for stage in stages:
+        for fd in stage.get('pass_fds', ()):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        stage['pass_fds'] = []
+
+
+def _stages_to_string(stages):
+    """Get a readable command string from a list of pipeline stages."""
+    commands = []
+    for stage in stages:
+        command = ' '.join(
+            arg if arg and ' ' not in arg else '"%s"' % arg for arg in stage['argv']
         )
+        if stage['stdin'] is not None:
+            command = '%s < %s' % (command, stage['stdin'])
+        if stage['stdout'] is not None:
+            command = '%s %s %s' % (
+                command, '>>' if stage['mode'] == 'a' else '>', stage['stdout']
+            )
+        commands.append(command)
+    return ' | '.join(commands)
 
-    # set-up stdout for the last command
-    last_command = commands[-1]
-    mode = None
-    if '>>' in last_command:
-        mode = 'a'
-        stdout = _raw(shlex.split(last_command.split('>>')[-1])[0])
-    elif '>' in last_command:
-        mode = 'w'
-        stdout = _raw(shlex.split(last_command.split('>')[-1])[0])
+
+def run_pipeline(input_command, env=None, cwd=None, mute=True, sink=None,
+                 capture=None, timeout=None, cancel=None, nested=None, output=None,
+                 max_repeats=None):
+    """Run a command without using the shell.
+
+    Each command in the pipeline is started as its own subprocess from a list of
+    arguments and the stdout of each command is connected directly to the stdin of the
+    next command. Redirections to and from files with <, > and >> are handled in
+    Python. This function prints both STDOUT and STDERR similar to run_command.
+
+    Args:
+        input_command: Input command. It can be a command string or a list of pipeline
+            stages as returned by Command.to_argv.
+        env: Additional environmental variable that will be added to global environment.
+            It can also be a RadianceEnvironment. In this case the commands are started
+            from the full path to their executables.
+        cwd: Current working directory. If provided command will be executed from this
+            folder.
+        mute: Set to False to print the command before running it.
+        sink: A Sink from the sink module for the STDOUT and STDERR (e.g. DiscardSink,
+            LoggerSink, FileSink or RingBufferSink). A function that receives each line
+            as a string or a logging.Logger can also be used. By default the outputs
+            are printed.
+        capture: Set to bytes to capture the STDOUT in the output of the result as
+            bytes. Set to numpy to load the STDOUT as a Radiance matrix in a NumPy
+            array. The format of an output without a header is found from the
+            options of the last command (e.g. -ffd). By default STDOUT is sent to the
+            sink (Default: None).
+        timeout: Maximum time in seconds for the command to run. The command and all
+            its child processes are killed and a CommandTimeoutError is raised if the
+            command takes longer (Default: None).
+        cancel: An optional CancelToken from the cancel module to kill the command
+            from another thread. A CommandCancelledError is raised if the command is
+            cancelled.
+        nested: Set to pipe or buffer to run the nested '!command' inputs (e.g. the
+            matrices of rmtxop) in parallel and connect their outputs to the command
+            through anonymous pipes instead of letting the command run them one after
+            the other through a shell. In pipe mode a nested command waits when the
+            pipe is full until its output is read. In buffer mode the outputs of the
+            nested commands are kept in memory until they are read. This option is
+            only used on posix systems with Python 3 and the '!command' inputs are
+            left to the command itself otherwise (Default: None).
+        output: Optional path to a file for the STDOUT of the last command. If the
+            path ends with .gz, .bz2, .xz or .zst the output is compressed while the
+            command is running. A compressed file that is set with > or >> in the
+            command is compressed the same way (Default: None).
+        max_repeats: Maximum number of times that the same message in STDERR is sent
+            to the sink. The messages that are repeated more are summarized with
+            their count at the end. By default all the messages are sent to the sink.
+            See the diagnostics module (Default: None).
+
+    Returns:
+        A CommandResult with the return code, the captured STDERR, the parsed STDERR
+        diagnostics and the resource usage for each command in the pipeline including
+        the nested commands. A ReturnCodeError will be raised if any of the commands
+        fails.
+    """
+    if isinstance(input_command, (list, tuple)):
+        stages = input_command
     else:
-        stdout = subprocess.PIPE
-
-    command = re.sub(r"\s>+\s\S+", '', last_command)
-
-    stdin = None if len(commands) == 1 else -1
-    if '<' in command:
-        # now check for stdin
-        stdin = _raw(shlex.split(command.split('<')[-1])[0])
-        # replace stdin from the original command
-        command = re.sub(r"\s<+\s\S+", '', command)
-
-    output_cmd.append(
-        {
-            'cmd': command.strip().replace('\\', '/'),
-            'stdin': stdin,
-            'stdout': (stdout, mode)
-        }
-    )
-    return output_cmd
+        stages = _process_command(input_command)
+    _check_capture(capture, output or stages[-1]['stdout'])
+    g_env = _update_env(env)
+
+    command = _stages_to_string(stages)
+    if not mute:
+        print('running %s' % command)
+
+    mode = 'w'
+    if output is None and compression(stages[-1]['stdout']):
+        # compress the output in Python instead of writing it directly to the file
+        output, mode = stages[-1]['stdout'], stages[-1]['mode']
+    if output is not None:
+        stages = list(stages)
+        stages[-1] = dict(stages[-1], stdout=None)
+    run_stages = stages
+    if isinstance(env, RadianceEnvironment):
+        # start the commands from their full path
+        run_stages = env.resolve(stages)
+    output_file = _open_output(output, mode, cwd) if output else None
+
+    if nested is not None:
+        assert nested in NESTED_MODES, 'Invalid input for nested: %s. Valid inputs ' \
+            'are %s.' % (nested, ', '.join(NESTED_MODES))
+        if os.name != 'posix' or sys.version_info[0] < 3:
+            nested = None
+
+    start_time = time.time()
+    read_fd, write_fd = os.pipe()
+    nested_processes, names = [], []
+    nested_stages = None
+    try:
+        if nested:
+            nested_stages, nested_processes, names = \
+                _start_nested(run_stages, g_env, cwd, write_fd, nested)
+            run_stages = nested_stages
+        processes = _start_pipeline(run_stages, g_env, cwd, write_fd)
+    except Exception as e:
+        _kill_processes(nested_processes)
+        for process in nested_processes:
+            process.wait()
+        os.close(read_fd)
+        if output_file is not None:
+            output_file.close()
+        raise ValueError(e)
+    finally:
+        os.close(write_fd)
+        if nested_stages is not None:
+            _close_fds(nested_stages)
+
+    names += [' '.join(stage['argv']) for stage in stages]
+    processes = nested_processes + processes
+    try:
+        return _collect(
+            command, processes, names, start_time, processes[-1].stdout,
+            os.fdopen(read_fd, 'rb'), sink, capture, timeout, cancel, output_file,
+            max_repeats, stages[-1]['argv']
+        )
+    finally:
+        if output_file is not None:
+            output_file.close()
 
 
 def _stream_file_content(file_object):
@@ -59,3 +59,41 @@ class NoDirectValueError(Exception):
     def __init__(self, name):
         message = 'Direct values are not available for {} simulation.'.format(name)
         super(NoDirectValueError, self).__init__(message)
+
+
+class ReturnCodeError(RuntimeError):
+    """Exception for a command that finished with a non-zero return code.
+
+    The CommandResult for the failed command is available from the result attribute.
+    """
+
+    def __init__(self, return_code, result=None):
+        self.return_code = return_code
+        self.result = result
+        message = 'None zero return code: %d' % return_code
+        diagnostics = getattr(result, 'diagnostics', None)
+        if diagnostics is not None:
+            # add the errors from stderr to the message
+            errors = [repr(error) for error in diagnostics.errors]
+            if errors:
+                message = '\n'.join([message] + errors)
+        super(ReturnCodeError, self).__init__(message)
+
+
+class CommandTimeoutError(ReturnCodeError):
+    """Exception for a command that is killed because it did not finish in time."""
+
+    def __init__(self, timeout, result=None):
+        self.timeout = timeout
+        return_code = result.return_code if result is not None else -1
+        super(CommandTimeoutError, self).__init__(return_code, result)
+        self.args = ('Command did not finish in %s seconds.' % timeout,)
+
+
+class CommandCancelledError(ReturnCodeError):
+    """Exception for a command that is killed by a CancelToken."""
+
+    def __init__(self, result=None):
+        return_code = result.return_code if result is not None else -1
+        super(CommandCancelledError, self).__init__(return_code, result)
+        self.args = ('Command is cancelled.',)
@@ -0,0 +1,246 @@
+"""Run several Radiance commands in parallel.
+
+Example:
+
+```
+batch = CommandBatch(workers=8)
+for grid in grids:
+    output = grid.replace('.pts', '.res')
+    rtrace = Rtrace(octree='scene.oct', sensors=grid, output=output)
+    batch.add(rtrace)
+
+results = batch.run(cwd='./model')
+failed = [result for result in results if not result.success]
+```
+"""
+import threading
+import multiprocessing
+
+from ._command import Command
+from ._exception import ReturnCodeError
+from .environment import RadianceEnvironment
+from .sink import DiscardSink, to_sink
+
+
+class BatchResult(object):
+    """Result of running one command in a CommandBatch.
+
+    Properties:
+        * command
+        * status
+        * return_code
+        * output
+        * error
+        * callback_error
+        * result
+        * success
+    """
+
+    __slots__ = (
+        '_command', 'status', 'return_code', 'output', 'error', 'callback_error',
+        'result'
+    )
+
+    def __init__(self, command):
+        self._command = command
+        self.status = 'skipped'
+        self.return_code = None
+        self.output = ''
+        self.error = None
+        self.callback_error = None
+        self.result = None
+
+    @property
+    def command(self):
+        """The command for this result."""
+        return self._command
+
+    @property
+    def success(self):
+        """True if the command finished successfully."""
+        return self.status == 'success'
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return '%s: %s (return code: %s)' % (
+            self.command.command, self.status, self.return_code
+        )
+
+
+class CommandBatch(object):
+    """Run a collection of commands with a limited number of workers.
+
+    Each command runs in its own subprocess and the workers are threads that wait for
+    the subprocesses. The outputs of the commands are not printed. Instead they are
+    collected in the output of each result or sent to the sink that is passed to the
+    run method.
+
+    Args:
+        commands: An optional list of commands.
+        workers: Maximum number of commands that can run at the same time. By default
+            it is set to the number of CPUs.
+        fail_fast: Set to True to stop starting new commands as soon as one command
+            fails. The commands that are not started will be marked as skipped. By
+            default all the commands will run even if some of them fail
+            (Default: False).
+
+    Properties:
+        * commands
+        * workers
+        * fail_fast
+    """
+
+    __slots__ = ('_items', '_workers', 'fail_fast')
+
+    def __init__(self, commands=None, workers=None, fail_fast=False):
+        self._items = []
+        self.workers = workers
+        self.fail_fast = fail_fast
+        for command in commands or []:
+            self.add(command)
+
+    @property
+    def commands(self):
+        """List of commands in this batch."""
+        return [item[0] for item in self._items]
+
+    @property
+    def workers(self):
+        """Maximum number of commands that can run at the same time."""
+        return self._workers
+
+    @workers.setter
+    def workers(self, value):
+        if value is None:
+            value = multiprocessing.cpu_count()
+        value = int(value)
+        assert value > 0, 'Number of workers must be larger than 0. Got %d.' % value
+        self._workers = value
+
+    def add(self, command, env=None, cwd=None):
+        """Add a command to the batch.
+
+        Args:
+            command: A Radiance command.
+            env: Environmental variables for this command. These values are added to
+                the environmental variables that are passed to the run method.
+            cwd: Working directory for this command. If provided it will overwrite the
+                working directory that is passed to the run method.
+        """
+        if not isinstance(command, Command):
+            raise ValueError(
+                'Expected a Radiance Command not {}'.format(type(command))
+            )
+        self._items.append((command, env, cwd))
+
+    def run(self, env=None, cwd=None, shell=True, timeout=None, cancel=None,
+            callback=None, sink=None):
+        """Run all the commands in the batch.
+
+        Args:
+            env: Environmental variables for all the commands. It can also be a
+                RadianceEnvironment (default: None).
+            cwd: Working directory for all the commands (Default: '.').
+            shell: Set to False to run the commands without a shell (Default: True).
+            timeout: Maximum time in seconds for each command to run. The commands
+                that take longer are killed and marked as failed (Default: None).
+            cancel: An optional CancelToken to kill the running commands. The commands
+                that are not started yet will be marked as skipped.
+            callback: An optional function that is called with the index of the
+                command and its BatchResult as soon as each command finishes. The
+                function is called from the worker threads. An exception from the
+                callback is stored in the callback_error of the result and the worker
+                continues with the next command.
+            sink: An optional Sink from the sink module for the outputs of all the
+                commands (e.g. LoggerSink or FileSink). The sink is shared between the
+                worker threads. By default the outputs of the commands that write to
+                a file are discarded and the outputs of the other commands are
+                collected in the output of each result. The stderr of a command is
+                also kept in its CommandResult (Default: None).
+
+        Returns:
+            A list of BatchResult objects in the same order as the commands. If env is
+            a RadianceEnvironment a ValueError is raised before any command starts if
+            the executable for a command is not found.
+        """
+        if isinstance(env, RadianceEnvironment):
+            env.validate(self.commands)
+        results = [BatchResult(item[0]) for item in self._items]
+        count = len(results)
+        lock = threading.Lock()
+        stop = threading.Event()
+        next_index = [0]
+        if sink is not None:
+            sink = to_sink(sink)
+
+        def _run_next():
+            while True:
+                with lock:
+                    if stop.is_set() or next_index[0] >= count or \
+                            (cancel is not None and cancel.cancelled):
+                        return
+                    index = next_index[0]
+                    next_index[0] += 1
+                command, cmd_env, cmd_cwd = self._items[index]
+                result = results[index]
+                if isinstance(env, RadianceEnvironment) and cmd_env:
+                    run_env = env.extend(cmd_env)
+                elif env and cmd_env:
+                    run_env = dict(env)
+                    run_env.update(cmd_env)
+                else:
+                    run_env = cmd_env or env
+                output = []
+                last_command = command
+                while last_command.pipe_to:
+                    last_command = last_command.pipe_to
+                if sink is not None:
+                    cmd_sink = sink
+                elif last_command.output:
+                    # only the messages are sent to the sink and they are also in stderr
+                    cmd_sink = DiscardSink()
+                else:
+                    cmd_sink = output.append
+                try:
+                    result.result = command.run(
+                        run_env, cmd_cwd or cwd, shell=shell, sink=cmd_sink,
+                        timeout=timeout, cancel=cancel
+                    )
+                except Exception as e:
+                    result.status = 'failed'
+                    result.error = e
+                    if isinstance(e, ReturnCodeError):
+                        result.return_code = e.return_code
+                        result.result = e.result
+                    if self.fail_fast:
+                        stop.set()
+                else:
+                    result.status = 'success'
+                    result.return_code = result.result.return_code
+                result.output = ''.join(output)
+                if callback is not None:
+                    try:
+                        callback(index, result)
+                    except Exception as e:
+                        result.callback_error = e
+
+        threads = [
+            threading.Thread(target=_run_next) for _ in range(min(self.workers, count))
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def __len__(self):
+        return len(self._items)
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return 'CommandBatch: %d commands - %d workers' % (len(self), self.workers)
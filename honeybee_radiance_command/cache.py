@@ -0,0 +1,266 @@
+"""A content-addressed cache for the outputs of Radiance commands.
+
+The cache key for each run is created from the command string, the environmental
+variables, the output paths and the content of every input file. When the key is
+already in the cache the output files are restored from the cache instead of running
+the command again.
+
+Example:
+
+```
+cache = ResultCache('./.radiance_cache')
+rcontrib = Rcontrib(octree='scene.oct', sensors='grid.pts', output='dc.mtx')
+rcontrib.run(cwd='./model', cache=cache)  # runs rcontrib
+rcontrib.run(cwd='./model', cache=cache)  # restores dc.mtx from the cache
+```
+"""
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+
+from ._command_util import _process_command, _file_path
+from .result import CommandResult
+from .environment import RadianceEnvironment
+
+# the files are hashed in chunks to keep the memory usage low for large octrees
+_CHUNK_SIZE = 1048576
+
+
+class ResultCache(object):
+    """Cache the output files of Radiance commands.
+
+    The input files are found from the arguments of the command. Every argument that
+    is an existing file is considered an input including the files for options
+    (e.g. -f rcalc.cal), the @ option files, the stdin files and the files in the
+    nested '!cmd' commands. The stdout file of the command is considered the output.
+    Commands that write their outputs to other files (e.g. rcontrib -o) should pass the
+    path to those files to the run method.
+
+    Args:
+        folder: Path to a folder for the cache. It will be created if it doesn't exist.
+        check: A string to set how the input files are compared. Use hash to compare
+            the content of the files and mtime to compare the modification time and the
+            size of the files which is faster but less reliable. The hashes are
+            calculated once for each file as long as the file doesn't change
+            (Default: hash).
+
+    Properties:
+        * folder
+        * check
+    """
+
+    __slots__ = ('_folder', '_check', '_hashes', '_lock')
+
+    def __init__(self, folder, check='hash'):
+        assert check in ('hash', 'mtime'), \
+            'Invalid input for check: %s. Valid inputs are hash and mtime.' % check
+        self._folder = os.path.abspath(folder)
+        self._check = check
+        self._hashes = {}
+        self._lock = threading.Lock()
+        if not os.path.isdir(self._folder):
+            os.makedirs(self._folder)
+
+    @property
+    def folder(self):
+        """Path to the cache folder."""
+        return self._folder
+
+    @property
+    def check(self):
+        """Method for comparing the input files."""
+        return self._check
+
+    def key(self, command, env=None, cwd=None, outputs=None):
+        """Get the cache key for running a command.
+
+        Args:
+            command: A Radiance command.
+            env: Environmental variables for running the command (Default: None).
+            cwd: Working directory for running the command (Default: None).
+            outputs: An optional list of additional output files for the command.
+
+        Returns:
+            A hexadecimal string.
+        """
+        stages = command.to_argv()
+        outputs = self._outputs(stages, outputs)
+        excluded = set(os.path.normcase(_full_path(output, cwd)) for output in outputs)
+        inputs = []
+        for path in _input_files(stages, cwd):
+            full_path = _full_path(path, cwd)
+            if os.path.normcase(full_path) in excluded:
+                continue
+            inputs.append([path, self._file_signature(full_path)])
+        if isinstance(env, RadianceEnvironment):
+            env = env.variables
+        data = {
+            'command': command.to_radiance(),
+            'env': sorted((env or {}).items()),
+            'inputs': inputs,
+            'outputs': outputs
+        }
+        return hashlib.sha256(
+            json.dumps(data, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+
+    def run(self, command, env=None, cwd=None, outputs=None, **kwargs):
+        """Run a command or restore its outputs from the cache.
+
+        Args:
+            command: A Radiance command.
+            env: Environmental variables for running the command (Default: None).
+            cwd: Working directory for running the command (Default: None).
+            outputs: An optional list of additional output files for the command
+                (e.g. the output files of rcontrib -o). The paths are relative to the
+                working directory.
+            kwargs: Additional keyword arguments for Command.run.
+
+        Returns:
+            A CommandResult. If the outputs are restored from the cache the cached
+            property of the result will be True. Commands without output files are
+            never cached since their outputs can't be restored.
+        """
+        key = self.key(command, env, cwd, outputs)
+        outputs = self._outputs(command.to_argv(), outputs)
+        result = self._restore(key, outputs, cwd)
+        if result is not None:
+            command.after_run()
+            return result
+        result = command.run(env, cwd, **kwargs)
+        self._store(key, outputs, cwd, result)
+        return result
+
+    def clear(self):
+        """Remove all the entries from the cache."""
+        for name in os.listdir(self._folder):
+            path = os.path.join(self._folder, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+        with self._lock:
+            self._hashes = {}
+
+    def _entry(self, key):
+        """Get the path to the folder for a cache entry."""
+        return os.path.join(self._folder, key[:2], key)
+
+    @staticmethod
+    def _outputs(stages, outputs=None):
+        """Get the list of output files for a command."""
+        files = list(outputs or [])
+        if stages[-1]['stdout'] is not None:
+            files.insert(0, stages[-1]['stdout'])
+        return files
+
+    def _restore(self, key, outputs, cwd):
+        """Restore the outputs for a key from the cache.
+
+        Returns:
+            A CommandResult or None if the key is not in the cache.
+        """
+        if not outputs:
+            # commands that only write to stdout can't be restored
+            return None
+        entry = self._entry(key)
+        result_file = os.path.join(entry, 'result.json')
+        if not os.path.isfile(result_file):
+            return None
+        cached_files = [
+            os.path.join(entry, 'output_%d' % i) for i in range(len(outputs))
+        ]
+        if not all(os.path.isfile(f) for f in cached_files):
+            return None
+        for cached_file, output in zip(cached_files, outputs):
+            output = _full_path(output, cwd)
+            folder = os.path.dirname(output)
+            if folder and not os.path.isdir(folder):
+                os.makedirs(folder)
+            shutil.copyfile(cached_file, output)
+        with open(result_file) as f:
+            result = CommandResult.from_dict(json.load(f))
+        result.cached = True
+        return result
+
+    def _store(self, key, outputs, cwd, result):
+        """Store the outputs for a command in the cache."""
+        output_files = [_full_path(output, cwd) for output in outputs]
+        if not output_files or not all(os.path.isfile(f) for f in output_files):
+            return
+        entry = self._entry(key)
+        parent = os.path.dirname(entry)
+        if not os.path.isdir(parent):
+            try:
+                os.makedirs(parent)
+            except OSError:
+                # created by another thread
+                pass
+        # write to a temporary folder first so a partial entry is never used
+        temp_folder = tempfile.mkdtemp(dir=parent)
+        for count, output_file in enumerate(output_files):
+            shutil.copyfile(output_file, os.path.join(temp_folder, 'output_%d' % count))
+        with open(os.path.join(temp_folder, 'result.json'), 'w') as f:
+            json.dump(result.to_dict(), f)
+        try:
+            os.rename(temp_folder, entry)
+        except OSError:
+            # the same entry is already stored
+            shutil.rmtree(temp_folder)
+
+    def _file_signature(self, path):
+        """Get the hash or the modification time for an input file."""
+        stat = os.stat(path)
+        if self._check == 'mtime':
+            return '%r-%d' % (stat.st_mtime, stat.st_size)
+        state = (stat.st_mtime, stat.st_size)
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached is not None and cached[0] == state:
+            return cached[1]
+        digest = _file_hash(path)
+        with self._lock:
+            self._hashes[path] = (state, digest)
+        return digest
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return 'ResultCache: %s' % self._folder
+
+
+def _file_hash(path):
+    """Get the sha256 hash for the content of a file."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _full_path(path, cwd=None):
+    """Get the absolute path to a file that is relative to the working directory."""
+    return os.path.abspath(_file_path(path, cwd))
+
+
+def _input_files(stages, cwd=None):
+    """Get the list of input files for a command from its pipeline stages."""
+    files = []
+    for stage in stages:
+        if stage['stdin'] is not None:
+            files.append(stage['stdin'])
+        for arg in stage['argv'][1:]:
+            if arg.startswith('!'):
+                # nested command
+                try:
+                    files.extend(_input_files(_process_command(arg[1:]), cwd))
+                except ValueError:
+                    pass
+                continue
+            if arg.startswith('@'):
+                arg = arg[1:]
+            if arg and os.path.isfile(_file_path(arg, cwd)):
+                files.append(arg)
+    return files
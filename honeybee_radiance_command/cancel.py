@@ -0,0 +1,78 @@
+"""Cancel running Radiance commands.
+
+Example:
+
+```
+token = CancelToken()
+thread = threading.Thread(target=rcontrib.run, kwargs={'cancel': token})
+thread.start()
+...
+# kill rcontrib and all of its child processes
+token.cancel()
+```
+"""
+import threading
+
+from ._command_util import _kill_processes
+
+
+class CancelToken(object):
+    """A handle to cancel one or several running commands.
+
+    Pass the token to Command.run or CommandBatch.run. Calling the cancel method kills
+    the process group for all the commands in the pipeline including the child
+    processes that they start (e.g. rcontrib -n workers or the '!cmd' subshells in an
+    rmtxop command). The commands that are started after the token is cancelled are
+    killed right away.
+
+    Properties:
+        * cancelled
+    """
+
+    __slots__ = ('_lock', '_cancelled', '_running')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._running = []
+
+    @property
+    def cancelled(self):
+        """True if the token is cancelled."""
+        return self._cancelled
+
+    def cancel(self):
+        """Kill all the commands that are running with this token."""
+        with self._lock:
+            self._cancelled = True
+            running = list(self._running)
+        for processes in running:
+            _kill_processes(processes)
+
+    def register(self, processes):
+        """Register the processes for a running command.
+
+        The processes will be killed right away if the token is already cancelled.
+
+        Args:
+            processes: A list of subprocess.Popen objects.
+        """
+        with self._lock:
+            self._running.append(processes)
+            cancelled = self._cancelled
+        if cancelled:
+            _kill_processes(processes)
+
+    def unregister(self, processes):
+        """Remove the processes for a command that is finished."""
+        with self._lock:
+            try:
+                self._running.remove(processes)
+            except ValueError:
+                pass
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return 'CancelToken: %s' % ('cancelled' if self._cancelled else 'active')
@@ -0,0 +1,143 @@
+"""Write and read compressed outputs.
+
+Large ASCII matrices (e.g. sensors x 8760 x 3 illuminance values) compress very well.
+If the output of a command ends with one of the extensions below the output is
+compressed while the command is running and it is never written to disk uncompressed.
+
+* .gz - gzip
+* .bz2 - bzip2
+* .xz - xz (Python 3 only)
+* .zst - Zstandard (requires the zstandard package)
+
+Example:
+
+```
+rtrace = Rtrace(octree='scene.oct', sensors='grid.pts', output='results.dat.gz')
+rtrace.run()
+
+# read the compressed results
+with open_file('results.dat.gz', 'rt') as f:
+    for line in f:
+        ...
+```
+"""
+import io
+import os
+
+# extension, compression format
+COMPRESSION = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.zst': 'zstd'}
+
+# default compression level for each format. The defaults are chosen for speed over
+# size because the outputs are compressed while the command is running.
+LEVEL = {'gzip': 1, 'bz2': 1, 'xz': 1, 'zstd': 3}
+
+# magic bytes at the start of the compressed files
+_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd')
+)
+
+
+def compression(path):
+    """Get the compression format for a file from its extension.
+
+    Args:
+        path: Path to a file.
+
+    Returns:
+        The compression format (gzip, bz2, xz or zstd) or None if the file is not
+        compressed.
+    """
+    if not path:
+        return None
+    return COMPRESSION.get(os.path.splitext(path)[1].lower())
+
+
+def detect_compression(path):
+    """Get the compression format for a file from its first bytes.
+
+    Args:
+        path: Path to an existing file.
+
+    Returns:
+        The compression format (gzip, bz2, xz or zstd) or None if the file is not
+        compressed.
+    """
+    with open(path, 'rb') as f:
+        start = f.read(6)
+    for magic, fmt in _MAGIC:
+        if start.startswith(magic):
+            return fmt
+    return None
+
+
+def open_file(path, mode='rb', level=None):
+    """Open a file that can be compressed.
+
+    For writing, the compression format is selected from the file extension. For
+    reading, the format is detected from the first bytes of the file so compressed
+    files are decompressed even if they don't have the right extension.
+
+    Args:
+        path: Path to a file.
+        mode: File mode. Valid modes are rb, wb and ab for binary data and rt, wt and
+            at for text. The data for the text modes is encoded as utf-8. Appending to
+            a compressed file adds a new compressed stream to the end of the file which
+            is supported by all the formats (Default: rb).
+        level: Compression level. By default it is set to a fast level for each
+            format (1 for gzip, bz2 and xz and 3 for zstd). See LEVEL.
+
+    Returns:
+        A file object.
+    """
+    valid_modes = ('rb', 'wb', 'ab', 'rt', 'wt', 'at', 'r', 'w', 'a')
+    assert mode in valid_modes, \
+        'Invalid mode: %s. Valid modes are %s.' % (mode, ', '.join(valid_modes))
+    binary_mode = mode[0] + 'b'
+    if binary_mode == 'rb':
+        fmt = detect_compression(path) if os.path.isfile(path) else compression(path)
+    else:
+        fmt = compression(path)
+
+    if fmt is None:
+        f = open(path, binary_mode)
+    else:
+        f = _open_compressed(path, binary_mode, fmt, level or LEVEL[fmt])
+
+    if 'b' in mode:
+        return f
+    return io.TextIOWrapper(f, encoding='utf-8')
+
+
+def _open_compressed(path, mode, fmt, level):
+    """Open a compressed file in binary mode."""
+    if fmt == 'gzip':
+        import gzip
+        if mode == 'rb':
+            return gzip.open(path, mode)
+        return gzip.open(path, mode, compresslevel=level)
+    if fmt == 'bz2':
+        import bz2
+        if mode == 'rb':
+            return bz2.BZ2File(path, mode)
+        return bz2.BZ2File(path, mode, compresslevel=level)
+    if fmt == 'xz':
+        try:
+            import lzma
+        except ImportError:  # python 2
+            raise ImportError('xz compression is only supported in Python 3.')
+        if mode == 'rb':
+            return lzma.open(path, mode)
+        return lzma.open(path, mode, preset=level)
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            'zstandard package is required for .zst files. Install it with '
+            '"pip install zstandard".'
+        )
+    if mode == 'rb':
+        return zstandard.open(path, mode)
+    return zstandard.open(path, mode, cctx=zstandard.ZstdCompressor(level=level))
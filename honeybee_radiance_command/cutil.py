@@ -17,36 +17,180 @@ else:
 _rad_opt_pattern = r'-[a-zA-Z]+'
 _rad_opt_compiled_pattern = re.compile(_rad_opt_pattern)
 
+# a whitespace separated token. Quoted parts can include whitespace.
+_rad_token_pattern = re.compile(r'''(?:"[^"]*"|'[^']*'|[^\s"'])+''')
+# an option token (e.g. -ab, -I+, -ld-, +I or -faf). Negative numbers are values.
+_rad_option_pattern = re.compile(r'[-+]([a-zA-Z]+)(.*)$')
+_quotes_pattern = re.compile(r'"([^"]*)"' r"|'([^']*)'")
+# numbers in the values of the options
+_int_pattern = re.compile(r'[-+]?\d+$')
+_float_pattern = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?$')
 
-def parse_radiance_options(string):
-    """Parse a radiance options string (e.g. '-ab 4 -ad 256').
 
-    The string should start with a '-' otherwise it will be trimmed to the first '-' in
-    string.
+def _unquote(token):
+    """Remove the quotes from a token the same way a shell does."""
+    if '"' not in token and "'" not in token:
+        return token
+    return _quotes_pattern.sub(lambda m: m.group(1) or m.group(2) or '', token)
+
+
+def _typed_value(token):
+    """Get the value of an unquoted token as an int, a float or a string."""
+    if _int_pattern.match(token):
+        return int(token)
+    if _float_pattern.match(token):
+        return float(token)
+    return token
+
+
+def _split_options(string, folder, includes):
+    """Split an options string into tokens and expand the @file includes."""
+    if '"' in string or "'" in string:
+        tokens = _rad_token_pattern.findall(string)
+    else:
+        tokens = string.split()
+    if '@' not in string:
+        return tokens
+    expanded = []
+    for token in tokens:
+        if not token.startswith('@') or len(token) == 1:
+            expanded.append(token)
+            continue
+        path = os.path.join(folder or '', _unquote(token[1:]))
+        key = os.path.normcase(os.path.abspath(path))
+        if key in includes:
+            raise ValueError('Recursive Radiance options file: %s' % path)
+        try:
+            with open(path) as inf:
+                content = inf.read()
+        except (IOError, OSError):
+            raise ValueError('Failed to read Radiance options file: %s' % path)
+        expanded.extend(
+            _split_options(content, os.path.dirname(path), includes + (key,))
+        )
+    return expanded
+
+
+def tokenize_radiance_options(string, folder=None, typed=True):
+    """Split a radiance options string into a list of (option, value) pairs.
+
+    The string is read in a single pass. Tokens before the first option (e.g. the
+    command name) are ignored.
+
+    * Options without a value get an empty string (e.g. -I -> ('I', '')).
+    * Boolean switches get True or False as value (e.g. -I+ -> ('I', True),
+      +I -> ('I', True) and -ld- -> ('ld', False)).
+    * Numbers are converted to int or float and the other values are strings (e.g.
+      -ab 4 -> ('ab', 4) and -aa 0.1 -> ('aa', 0.1)). Options with several values get
+      a list of values.
+    * Quotes are removed from the values similar to a shell. Quoted values are always
+      strings and they are never considered as options (e.g. -e "-1" -> ('e', '-1')).
+    * Joined options are returned with the full name (e.g. -faf -> ('faf', '')).
+      OptionCollection.update_from_string splits them based on the options of the
+      collection.
+    * @file tokens are replaced with the options in the file.
+
+    Args:
+        string: Radiance options string (e.g. '-ab 4 -ad 256 -I+').
+        folder: Optional folder for the relative paths of the @file includes. By
+            default the paths are relative to the current working directory.
+        typed: Set to False to get all the values as strings. In this case the
+            boolean switches get + or - as value (e.g. -I+ -> ('I', '+'))
+            (Default: True).
+
+    Returns:
+        A list of (option, value) tuples in the same order as the input string.
     """
-    try:
-        index = string.index('-')
-    except ValueError:
-        if not ' '.join(string.split()).replace('"', '').replace("'", '').strip():
-            return {}
+    options = []
+    name = None
+    values = []
+    has_value = False
+    for token in _split_options(string, folder, ()):
+        first = token[0]
+        match = _rad_option_pattern.match(token) \
+            if first in '-+' and token[1:2].isalpha() else None
+        if match is None:
+            # a value for the current option
+            value = _unquote(token)
+            has_value = has_value or bool(value.strip())
+            values.append(_typed_value(value) if typed and value == token else value)
+            continue
+        if name is not None:
+            options.append((name, _option_value(values)))
+        name, rest = match.groups()
+        values = []
+        if first == '+':
+            values.append(True if typed else '+')
+        if rest:
+            if typed and rest in ('+', '-'):
+                values.append(rest == '+')
+            else:
+                value = _unquote(rest)
+                values.append(_typed_value(value) if typed and value == rest else value)
+    if name is not None:
+        options.append((name, _option_value(values)))
+    elif has_value and '-' not in string:
         raise ValueError(
             'Invalid Radiance options string input. Failed to find - in input string.'
         )
+    return options
+
 
-    sub_string = ' '.join(string[index:].split())
-    value = re.split(_rad_opt_compiled_pattern, sub_string)[1:]
-    key = re.findall(_rad_opt_pattern, sub_string)
+def _option_value(values):
+    """Get the value of an option from the list of its values."""
+    count = len(values)
+    if count == 0:
+        return ''
+    elif count == 1:
+        return values[0]
+    return values
 
-    options = collections.OrderedDict()
-    for k, v in zip(key, value):
-        values = v.split()
-        count = len(values)
-        if count == 0:
-            values = ''
-        elif count == 1:
-            values = values[0]
-        options[k[1:]] = values
 
+def parse_radiance_options(string, folder=None):
+    """Parse a radiance options string (e.g. '-ab 4 -ad 256').
+
+    The string should start with a '-' otherwise it will be trimmed to the first '-' in
+    string. See tokenize_radiance_options for more information about the values.
+
+    Args:
+        string: Radiance options string (e.g. '-ab 4 -ad 256').
+        folder: Optional folder for the relative paths of the @file includes.
+
+    Returns:
+        An OrderedDict of the options and their values as strings. If an option is
+        repeated the last value is used.
+    """
+    return collections.OrderedDict(
+        tokenize_radiance_options(string, folder, typed=False)
+    )
+
+
+def parse_radiance_options_batch(strings, folder=None, typed=True):
+    """Parse a list of radiance options strings.
+
+    Each unique string is only parsed once which makes this function faster than
+    calling parse_radiance_options for each string if the strings are repeated.
+
+    Args:
+        strings: A list of Radiance options strings.
+        folder: Optional folder for the relative paths of the @file includes.
+        typed: Set to False to get the values as strings similar to
+            parse_radiance_options. By default the values are typed. See
+            tokenize_radiance_options (Default: True).
+
+    Returns:
+        A list of OrderedDicts - one for each input string.
+    """
+    parsed = {}
+    options = []
+    for string in strings:
+        try:
+            pairs = parsed[string]
+        except KeyError:
+            pairs = parsed[string] = tokenize_radiance_options(string, folder, typed)
+        options.append(collections.OrderedDict(
+            (k, list(v) if isinstance(v, list) else v) for k, v in pairs
+        ))
     return options
 
 
@@ -2,6 +2,7 @@
 
 from .options.dcglare import DcglareOptions
 from ._command import Command
+from ._command_util import _input_argv
 import honeybee_radiance_command._exception as exceptions
 import honeybee_radiance_command._typing as typing
 
@@ -176,6 +177,18 @@ class Dcglare(Command):
 
         return ' '.join(cmd.split())
 
+    def _argv(self, stdin_input=False):
+        self.validate(stdin_input)
+        argv = [self.command] + self.options.to_argv() + _input_argv(self.dc_direct)
+        if not self.tmtx:
+            argv.extend(_input_argv(self.dc_total))
+        else:
+            for matrix in (self.vmtx, self.tmtx, self.dmtx):
+                argv.extend(_input_argv(matrix))
+        if not stdin_input:
+            argv.extend(_input_argv(self.sky_matrix))
+        return argv, None
+
     def validate(self, stdin_input=False):
         Command.validate(self)
         if not self.dc_direct:
@@ -2,6 +2,7 @@
 
 from honeybee_radiance_command.options.dctimestep import DctimestepOptions
 from honeybee_radiance_command._command import Command
+from honeybee_radiance_command._command_util import _input_argv
 import honeybee_radiance_command._typing as typing
 
 
@@ -274,3 +275,22 @@ class Dctimestep(Command):
             cmd = ' > '.join((cmd, self.output))
 
         return ' '.join(cmd.split())
+
+    def _argv(self, stdin_input=False):
+        self.validate()
+        argv = [self.command] + self.options.to_argv()
+        if self._study_type == 'daylight_coef':
+            matrices = (self.day_coef_matrix, self.sky_vector)
+        elif self._study_type == 'direct_sun':
+            matrices = (self.sun_coef_matrix, self.sun_vector)
+        elif self._study_type == 'three_phase':
+            matrices = (self.view_matrix, self.t_matrix, self.daylight_matrix,
+                        self.sky_vector)
+        elif self._study_type == 'four_phase':
+            matrices = (self.view_matrix, self.t_matrix, self.facade_matrix,
+                        self.daylight_matrix, self.sky_vector)
+        else:
+            matrices = ()
+        for matrix in matrices:
+            argv.extend(_input_argv(matrix))
+        return argv, None
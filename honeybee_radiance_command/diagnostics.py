@@ -0,0 +1,275 @@
+"""Structured warnings and errors from the stderr of Radiance commands.
+
+Radiance commands write their messages to stderr in this format:
+
+```
+rtrace: warning - no light sources found
+rcontrib: fatal - cannot open octree file "scene.oct"
+```
+
+The stderr of every command is parsed into Diagnostic records with the name of the
+tool, the severity and the message. Repeated messages are aggregated into a single
+record with a count and the records are available from the diagnostics property of
+the CommandResult.
+
+Some warnings are repeated for every ray and can flood the logs for large runs. Use
+the max_repeats input of Command.run to only pass the first few copies of each message
+to the sink. A summary line with the total count is written for the messages that are
+repeated more.
+
+Example:
+
+```
+result = rtrace.run(max_repeats=1)
+for diagnostic in result.diagnostics.warnings:
+    print(diagnostic.tool, diagnostic.message, diagnostic.count)
+```
+"""
+import re
+
+from .sink import Sink, _decode
+
+# Radiance error types from common/error.c
+SEVERITIES = ('warning', 'fatal', 'system', 'internal', 'consistency')
+# severities that stop the command
+ERRORS = ('fatal', 'system', 'internal', 'consistency')
+
+# Radiance starts the messages with argv[0] which can be the full path to the program
+# (e.g. C:\Radiance\bin\rtrace.exe). The path can only have a colon after the drive
+# letter so it doesn't match the colons in the messages.
+_PATTERN = re.compile(
+    r'^(?:(?:[A-Za-z]:)?[^:]*[\\/])?(?P<tool>[^\s:\\/]+?)(?:\.[eE][xX][eE])?: '
+    r'(?:(?P<severity>%s) - )?(?P<message>.*)$' % '|'.join(SEVERITIES)
+)
+
+
+def parse_line(line):
+    """Parse a line of stderr from a Radiance command.
+
+    Args:
+        line: A line of stderr as a string.
+
+    Returns:
+        A tuple with the name of the tool, the severity and the message. Lines without
+        a severity (e.g. the progress reports from rcontrib -t) have the info severity.
+        The tool is None for lines that don't start with the name of a tool.
+    """
+    line = line.rstrip('\r\n')
+    match = _PATTERN.match(line)
+    if not match:
+        return None, 'info', line
+    return match.group('tool'), match.group('severity') or 'info', \
+        match.group('message')
+
+
+class Diagnostic(object):
+    """A message from the stderr of a Radiance command.
+
+    Args:
+        tool: Name of the Radiance tool (e.g. rtrace) or None.
+        severity: Severity of the message. It is one of info, warning, fatal, system,
+            internal or consistency.
+        message: The message without the tool name and the severity.
+        count: Number of times that the message is repeated (Default: 1).
+
+    Properties:
+        * tool
+        * severity
+        * message
+        * count
+        * is_error
+    """
+
+    __slots__ = ('tool', 'severity', 'message', 'count')
+
+    def __init__(self, tool, severity, message, count=1):
+        self.tool = tool
+        self.severity = severity
+        self.message = message
+        self.count = count
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create a Diagnostic from a dictionary."""
+        return cls(data['tool'], data['severity'], data['message'], data['count'])
+
+    @property
+    def is_error(self):
+        """True if the severity of the message is an error."""
+        return self.severity in ERRORS
+
+    def to_dict(self):
+        """Get the diagnostic as a dictionary."""
+        return {
+            'tool': self.tool,
+            'severity': self.severity,
+            'message': self.message,
+            'count': self.count
+        }
+
+    def to_radiance(self):
+        """Get the message in the format that Radiance writes it to stderr."""
+        message = self.message
+        if self.severity != 'info':
+            message = '%s - %s' % (self.severity, message)
+        if self.tool:
+            message = '%s: %s' % (self.tool, message)
+        return message
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        if self.count == 1:
+            return self.to_radiance()
+        return '%s (repeated %d times)' % (self.to_radiance(), self.count)
+
+
+class Diagnostics(object):
+    """Aggregated messages from the stderr of a command.
+
+    Args:
+        max_records: Maximum number of unique messages to keep. The messages after
+            this limit are only counted in the dropped property (Default: 1000).
+
+    Properties:
+        * records
+        * warnings
+        * errors
+        * dropped
+    """
+
+    __slots__ = ('_records', '_index', '_max_records', 'dropped')
+
+    def __init__(self, max_records=1000):
+        self._records = []
+        self._index = {}
+        self._max_records = max_records
+        self.dropped = 0
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create Diagnostics from a dictionary."""
+        diagnostics = cls()
+        for record in data.get('records', []):
+            record = Diagnostic.from_dict(record)
+            diagnostics._index[(record.tool, record.severity, record.message)] = record
+            diagnostics._records.append(record)
+        diagnostics.dropped = data.get('dropped', 0)
+        return diagnostics
+
+    @property
+    def records(self):
+        """List of Diagnostic records in the order that they are first seen."""
+        return list(self._records)
+
+    @property
+    def warnings(self):
+        """List of Diagnostic records for the warnings."""
+        return [r for r in self._records if r.severity == 'warning']
+
+    @property
+    def errors(self):
+        """List of Diagnostic records for the errors."""
+        return [r for r in self._records if r.is_error]
+
+    def add(self, line):
+        """Add a line of stderr.
+
+        Args:
+            line: A line of stderr as a string.
+
+        Returns:
+            The Diagnostic record for the line or None if the line is empty or the
+            record is dropped because of the max_records limit.
+        """
+        if not line.strip():
+            return None
+        key = parse_line(line)
+        record = self._index.get(key)
+        if record is not None:
+            record.count += 1
+            return record
+        if len(self._records) >= self._max_records:
+            self.dropped += 1
+            return None
+        record = Diagnostic(*key)
+        self._index[key] = record
+        self._records.append(record)
+        return record
+
+    def count(self, severity=None):
+        """Get the total number of messages including the repeated messages.
+
+        Args:
+            severity: An optional severity to only count the messages with this
+                severity (e.g. warning).
+        """
+        return sum(
+            r.count for r in self._records if severity is None or r.severity == severity
+        )
+
+    def to_dict(self):
+        """Get the diagnostics as a dictionary."""
+        return {
+            'records': [record.to_dict() for record in self._records],
+            'dropped': self.dropped
+        }
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def __len__(self):
+        return len(self._records)
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return 'Diagnostics: %d errors - %d warnings' % (
+            sum(r.count for r in self.errors), self.count('warning')
+        )
+
+
+class DiagnosticSink(Sink):
+    """A sink that parses stderr into Diagnostics and passes it to another sink.
+
+    Args:
+        sink: A Sink for the stderr lines.
+        diagnostics: A Diagnostics object to collect the messages. A new object is
+            created if it is not provided.
+        max_repeats: Maximum number of times that the same message is passed to the
+            sink. The messages that are repeated more are summarized with their count
+            when the sink is flushed. Set to None to pass all the messages
+            (Default: None).
+
+    Properties:
+        * sink
+        * diagnostics
+        * max_repeats
+    """
+
+    __slots__ = ('sink', 'diagnostics', 'max_repeats')
+    lines = True
+
+    def __init__(self, sink, diagnostics=None, max_repeats=None):
+        Sink.__init__(self)
+        self.sink = sink
+        self.diagnostics = diagnostics if diagnostics is not None else Diagnostics()
+        self.max_repeats = max_repeats
+
+    def _write(self, data):
+        record = self.diagnostics.add(_decode(data))
+        if self.max_repeats is None or record is None or \
+                record.count <= self.max_repeats:
+            self.sink.write(data)
+
+    def flush(self):
+        if self.max_repeats is not None:
+            for record in self.diagnostics:
+                if record.count > self.max_repeats:
+                    self.sink.write(('%r\n' % record).encode('utf-8'))
+        self.sink.flush()
+
+    def __repr__(self):
+        return 'DiagnosticSink: %r' % self.sink
@@ -0,0 +1,314 @@
+"""A reusable environment for running Radiance commands.
+
+By default every run copies the environment of the current process, adds the input
+environmental variables to it and searches the PATH for each command. A
+RadianceEnvironment does this work once. It keeps the merged environment and the
+absolute paths to the Radiance executables so the commands can be started directly.
+Missing executables and old Radiance versions are reported when the environment is
+created instead of in the middle of a long batch of commands.
+
+Example:
+
+```
+env = RadianceEnvironment(folder='/usr/local/radiance', min_version='5.4')
+for grid in grids:
+    rtrace = Rtrace(octree='scene.oct', sensors=grid, output=...)
+    rtrace.run(env=env, shell=False)
+```
+"""
+import os
+import re
+import subprocess
+import threading
+
+# Radiance executables that are wrapped by the commands in this library
+COMMANDS = (
+    'dcglare', 'dctimestep', 'evalglare', 'falsecolor', 'gendaylit', 'gendaymtx',
+    'gensky', 'getinfo', 'oconv', 'pcomb', 'pcompos', 'pcond', 'pfilt', 'pflip',
+    'pinterp', 'psign', 'ra_gif', 'ra_xyze', 'rcalc', 'rcollate', 'rcontrib',
+    'rfluxmtx', 'rmtxop', 'rpict', 'rtrace'
+)
+
+_VERSION_PATTERN = re.compile(r'RADIANCE\s+(\d+(?:\.\d+)*)([a-zA-Z]*)')
+
+
+def _which(name, path):
+    """Find the full path to an executable in a PATH string."""
+    try:
+        from shutil import which
+    except ImportError:  # python 2
+        for folder in path.split(os.pathsep):
+            for ext in ('', '.exe'):
+                full_path = os.path.join(folder, name + ext)
+                if os.path.isfile(full_path) and os.access(full_path, os.X_OK):
+                    return full_path
+        return None
+    return which(name, path=path)
+
+
+def parse_version(text):
+    """Get the version numbers from the output of a Radiance command -version.
+
+    Args:
+        text: Output of a Radiance command with -version
+            (e.g. RADIANCE 5.4a 2021-03-28 LBNL).
+
+    Returns:
+        A tuple of integers for the version (e.g. (5, 4)) or None if the version is
+        not found.
+    """
+    match = _VERSION_PATTERN.search(text)
+    if not match:
+        return None
+    return tuple(int(v) for v in match.group(1).split('.'))
+
+
+class RadianceEnvironment(object):
+    """Environmental variables and executables for running Radiance commands.
+
+    A RadianceEnvironment can be used as the env input for the run method of all the
+    commands, CommandBatch, Workflow and ShardedRun. The merged environment is created
+    once and the commands are started by the absolute path to their executables when
+    they run without a shell (shell=False). Nested '!command' inputs and commands that
+    run through a shell still search the PATH of the environment.
+
+    Args:
+        env: Environmental variables to add to the environment of the current
+            process. PATH is added to the start of the current PATH similar to the
+            env input of Command.run (Default: None).
+        folder: Optional path to a Radiance installation folder. The bin folder is
+            added to the start of PATH and the lib folder is added to RAYPATH.
+        commands: A list of executable names to find when the environment is
+            created. By default all the commands that are wrapped by this library are
+            searched. Executables for other names are searched when they are used
+            for the first time.
+        min_version: Optional minimum Radiance version as a string (e.g. 5.4). The
+            version is checked with rtrace -version and a ValueError is raised if the
+            version is older or rtrace is not found.
+
+    Properties:
+        * env
+        * variables
+        * executables
+        * missing
+        * version
+    """
+
+    __slots__ = ('_env', '_variables', '_executables', '_version', '_lock')
+
+    def __init__(self, env=None, folder=None, commands=None, min_version=None):
+        from ._command_util import _update_env
+        env = dict(env or {})
+        if folder is not None:
+            bin_folder = os.path.join(folder, 'bin')
+            lib_folder = os.path.join(folder, 'lib')
+            if not os.path.isdir(bin_folder):
+                raise ValueError('Radiance bin folder does not exist: %s' % bin_folder)
+            paths = [bin_folder] + ([env['PATH']] if env.get('PATH') else [])
+            env['PATH'] = os.pathsep.join(paths)
+            if os.path.isdir(lib_folder) and 'RAYPATH' not in env:
+                raypath = os.environ.get('RAYPATH')
+                env['RAYPATH'] = os.pathsep.join(
+                    [lib_folder, raypath] if raypath else ['.', lib_folder]
+                )
+        self._variables = env
+        self._env = _update_env(env)
+        self._executables = {}
+        self._version = None
+        self._lock = threading.Lock()
+        for name in COMMANDS if commands is None else commands:
+            self._find(name)
+        if min_version is not None:
+            self.check_version(min_version)
+
+    @property
+    def env(self):
+        """Dictionary of all the environmental variables.
+
+        The same dictionary is used for all the runs and it should not be edited.
+        Use the extend method to create an environment with different variables.
+        """
+        return self._env
+
+    @property
+    def variables(self):
+        """Dictionary of the environmental variables that are added to the environment
+        of the current process."""
+        return dict(self._variables)
+
+    @property
+    def executables(self):
+        """A dictionary of the executable names and their full paths."""
+        with self._lock:
+            return dict(
+                (name, path) for name, path in self._executables.items() if path
+            )
+
+    @property
+    def missing(self):
+        """A sorted list of executable names that are not found."""
+        with self._lock:
+            return sorted(
+                name for name, path in self._executables.items() if not path
+            )
+
+    @property
+    def version(self):
+        """Radiance version as a tuple of integers or None if it can't be found.
+
+        The version is found from the output of rtrace -version.
+        """
+        if self._version is None:
+            rtrace = self._find('rtrace')
+            if not rtrace:
+                return None
+            try:
+                output = subprocess.Popen(
+                    [rtrace, '-version'], stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT, env=self._env
+                ).communicate()[0]
+            except OSError:
+                return None
+            self._version = parse_version(output.decode('utf-8', 'replace'))
+        return self._version
+
+    def _find(self, name):
+        """Find and cache the full path to an executable."""
+        with self._lock:
+            try:
+                return self._executables[name]
+            except KeyError:
+                pass
+        path = _which(name, self._env.get('PATH', ''))
+        with self._lock:
+            self._executables[name] = path
+        return path
+
+    def executable(self, name):
+        """Get the full path to an executable.
+
+        Args:
+            name: Name of the executable (e.g. rtrace).
+
+        Returns:
+            Full path to the executable. A ValueError is raised if the executable is
+            not found.
+        """
+        if os.path.dirname(name):
+            return name
+        path = self._find(name)
+        if not path:
+            raise ValueError(
+                'Failed to find %s in the PATH of the Radiance environment.' % name
+            )
+        return path
+
+    def resolve(self, stages):
+        """Replace the executable names in a list of pipeline stages with full paths.
+
+        Args:
+            stages: A list of pipeline stages as returned by Command.to_argv.
+
+        Returns:
+            A new list of stages. The input stages are not changed.
+        """
+        resolved = []
+        for stage in stages:
+            stage = dict(stage)
+            stage['argv'] = [self.executable(stage['argv'][0])] + stage['argv'][1:]
+            resolved.append(stage)
+        return resolved
+
+    def validate(self, commands):
+        """Check that the executables for a list of commands are found.
+
+        Args:
+            commands: A list of Radiance commands or executable names. The
+                executables for all the commands in the pipelines and the nested
+                '!command' inputs are checked.
+        """
+        from ._command import Command
+        from ._command_util import _process_command
+        names = []
+
+        def _add_stages(stages):
+            for stage in stages:
+                names.append(stage['argv'][0])
+                for arg in stage['argv'][1:]:
+                    if arg.startswith('!'):
+                        try:
+                            _add_stages(_process_command(arg[1:]))
+                        except ValueError:
+                            pass
+
+        for command in commands:
+            if isinstance(command, Command):
+                _add_stages(command.to_argv())
+            else:
+                names.append(command)
+        missing = sorted(set(
+            name for name in names if not os.path.dirname(name) and not self._find(name)
+        ))
+        if missing:
+            raise ValueError(
+                'Failed to find these executables in the PATH of the Radiance '
+                'environment: %s' % ', '.join(missing)
+            )
+
+    def check_version(self, min_version):
+        """Check that the Radiance version is not older than a minimum version.
+
+        Args:
+            min_version: Minimum version as a string (e.g. 5.4).
+        """
+        required = tuple(int(v) for v in str(min_version).split('.'))
+        version = self.version
+        if version is None:
+            raise ValueError(
+                'Failed to find the Radiance version. Make sure rtrace is in the PATH.'
+            )
+        if version < required:
+            raise ValueError(
+                'Radiance version %s is older than the minimum version %s.' % (
+                    '.'.join(str(v) for v in version), min_version
+                )
+            )
+
+    def extend(self, env):
+        """Create a new RadianceEnvironment with additional environmental variables.
+
+        The executables are searched again only if PATH is changed.
+
+        Args:
+            env: A dictionary of environmental variables. PATH is added to the start of
+                the current PATH.
+        """
+        new_env = RadianceEnvironment.__new__(RadianceEnvironment)
+        variables = dict(self._variables)
+        full_env = dict(self._env)
+        for k, v in (env or {}).items():
+            if k.strip().upper() == 'PATH':
+                full_env['PATH'] = os.pathsep.join((v, full_env.get('PATH', '')))
+                variables['PATH'] = os.pathsep.join(
+                    [v, variables['PATH']] if variables.get('PATH') else [v]
+                )
+            else:
+                full_env[k] = variables[k] = v
+        new_env._variables = variables
+        new_env._env = full_env
+        new_env._lock = threading.Lock()
+        new_env._version = None
+        if full_env.get('PATH') == self._env.get('PATH'):
+            new_env._executables = self.executables
+            new_env._version = self._version
+        else:
+            new_env._executables = {}
+        return new_env
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return 'RadianceEnvironment: %d executables - %d missing' % (
+            len(self.executables), len(self.missing)
+        )
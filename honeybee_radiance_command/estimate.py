@@ -0,0 +1,404 @@
+"""Estimate the number of rays and the run time for rtrace, rcontrib and rfluxmtx.
+
+The estimate is based on the options that control the number of rays (-ab, -ad, -as,
+-aa, -lw, -lr, -dj, -dp and -c for rcontrib), the number of sensors, the size of the
+octree and the sampling type of the rfluxmtx sender or receiver (e.g. kf, r4 or sc6).
+
+The ray model is a simple heuristic. The time per ray, the time for loading the octree
+and the fixed overhead are calibrated from the results of earlier runs.
+
+Example:
+
+```
+estimator = CostEstimator()
+estimator.calibrate(recorded_runs)  # a list of (Estimate, CommandResult)
+
+estimate = estimator.estimate(rcontrib, cwd='./model')
+print(estimate.rays, estimate.wall_time)
+
+# raise a ValueError if the command is expected to run for more than 2 hours
+estimator.check(rcontrib, max_time=7200, cwd='./model')
+```
+"""
+import os
+
+from ._command_util import _file_path
+from .options.rcontrib import RcontribOptions
+from .options.rfluxmtx import RfluxmtxControlParameters
+
+# Radiance default values for the options that are not set
+RTRACE_DEFAULTS = {
+    'ab': 0, 'ad': 1024, 'as': 512, 'aa': 0.1, 'lw': 2e-3, 'lr': -10, 'dj': 0,
+    'dp': 512, 'c': 1, 'n': 1
+}
+# rcontrib turns off the ambient cache and uses one ambient bounce by default
+RCONTRIB_DEFAULTS = dict(RTRACE_DEFAULTS, ab=1, aa=0)
+# number of patches for the Klems sampling types
+_KLEMS_BINS = {'kf': 145, 'kh': 73, 'kq': 41}
+
+
+def sampling_bins(sampling_type):
+    """Get the number of bins for an rfluxmtx sampling type.
+
+    Args:
+        sampling_type: One of u, kf, kh, kq, rN for Reinhart-Tregenza with N
+            subdivisions or scN for Shirley-Chiu with NxN bins.
+
+    Returns:
+        Number of bins as an integer.
+    """
+    value = sampling_type.lstrip('+-')
+    if value == 'u':
+        return 1
+    if value in _KLEMS_BINS:
+        return _KLEMS_BINS[value]
+    if value.startswith('sc') and value[2:].isdigit():
+        return int(value[2:]) ** 2
+    if value.startswith('r'):
+        subdivisions = int(value[1:] or 1)
+        return 144 * subdivisions ** 2 + 1
+    raise ValueError('Invalid sampling type: {}'.format(sampling_type))
+
+
+def count_sensors(sensors):
+    """Get the number of sensors in a sensor file.
+
+    Empty lines are not counted.
+    """
+    count = 0
+    with open(sensors, 'rb') as f:
+        for line in f:
+            if line.strip():
+                count += 1
+    return count
+
+
+class Estimate(object):
+    """Estimated cost for running a command.
+
+    Args:
+        rays: Estimated number of traced rays.
+        primary_rays: Number of rays that are sent to the command.
+        octree_size: Size of the octree in megabytes.
+        processes: Number of processes for the command.
+        wall_time: Estimated wall time in seconds.
+        output_values: Number of values in the output of the command.
+
+    Properties:
+        * rays
+        * primary_rays
+        * rays_per_primary
+        * octree_size
+        * processes
+        * wall_time
+        * output_values
+    """
+
+    __slots__ = ('rays', 'primary_rays', 'octree_size', 'processes', 'wall_time',
+                 'output_values')
+
+    def __init__(self, rays, primary_rays, octree_size, processes, wall_time,
+                 output_values):
+        self.rays = rays
+        self.primary_rays = primary_rays
+        self.octree_size = octree_size
+        self.processes = processes
+        self.wall_time = wall_time
+        self.output_values = output_values
+
+    @property
+    def rays_per_primary(self):
+        """Estimated number of traced rays for each primary ray."""
+        if not self.primary_rays:
+            return 0
+        return float(self.rays) / self.primary_rays
+
+    def to_dict(self):
+        """Get the estimate as a dictionary."""
+        return {
+            'rays': self.rays,
+            'primary_rays': self.primary_rays,
+            'octree_size': self.octree_size,
+            'processes': self.processes,
+            'wall_time': self.wall_time,
+            'output_values': self.output_values
+        }
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return 'Estimate: %.3g rays - %.1fs' % (self.rays, self.wall_time)
+
+
+class CostEstimator(object):
+    """Estimate the number of rays and the run time for ray-tracing commands.
+
+    Args:
+        seconds_per_ray: CPU time in seconds for tracing one ray (Default: 2e-6).
+        seconds_per_mb: Time in seconds for loading one megabyte of octree
+            (Default: 0.05).
+        overhead: Fixed time in seconds for starting a command (Default: 0.05).
+        reflectance: Average reflectance of the scene. It is used to estimate how fast
+            the weight of the ambient rays drops below -lw (Default: 0.5).
+
+    Properties:
+        * seconds_per_ray
+        * seconds_per_mb
+        * overhead
+        * reflectance
+    """
+
+    __slots__ = ('seconds_per_ray', 'seconds_per_mb', 'overhead', 'reflectance')
+
+    def __init__(self, seconds_per_ray=2e-6, seconds_per_mb=0.05, overhead=0.05,
+                 reflectance=0.5):
+        self.seconds_per_ray = seconds_per_ray
+        self.seconds_per_mb = seconds_per_mb
+        self.overhead = overhead
+        self.reflectance = reflectance
+
+    @staticmethod
+    def _values(options):
+        """Get the values for the options that are used in the estimate."""
+        defaults = RCONTRIB_DEFAULTS if isinstance(options, RcontribOptions) \
+            else RTRACE_DEFAULTS
+        values = dict(defaults)
+        if options is None:
+            return values
+        for name in values:
+            option = getattr(options, 'as_' if name == 'as' else name, None)
+            if option is None or not hasattr(option, 'value'):
+                continue
+            if option.value is not None:
+                values[name] = option.value
+        return values
+
+    def rays_per_primary(self, options=None, sources=1):
+        """Estimate the number of rays that are traced for each primary ray.
+
+        Each ray that hits a surface sends shadow rays to the light sources. Ambient
+        bounces send -ad rays plus -as super-samples at the first bounce. Each ambient
+        ray carries the weight of its parent times the reflectance divided by the
+        number of divisions and the number of divisions drops with the weight of the
+        ray. The bounces stop at -ab. Rays with a weight below -lw are stopped if -lr
+        is positive. Otherwise only a fraction of them is traced (Russian roulette).
+        If the ambient cache is used (-aa > 0) only a fraction of the ambient values
+        is calculated and the rest are interpolated.
+
+        Args:
+            options: RtraceOptions or RcontribOptions. Radiance defaults are used for
+                the options that are not set.
+            sources: Number of light sources in the scene (Default: 1).
+
+        Returns:
+            Estimated number of rays as a float.
+        """
+        values = self._values(options)
+        # -dj adds extra samples for area sources
+        direct = sources * (1.0 + 4.0 * values['dj'])
+        computed = 1.0 / (1.0 + (values['aa'] / 0.01) ** 2) if values['aa'] > 0 else 1.0
+
+        # number of ambient rays for each ray at each bounce
+        levels = []
+        weight = 1.0
+        for depth in range(int(values['ab'])):
+            divisions = max(1.0, values['ad'] * weight)
+            child_weight = weight * self.reflectance / divisions
+            if depth == 0:
+                divisions += values['as']
+            if child_weight < values['lw']:
+                if values['lr'] >= 0:
+                    break
+                # Russian roulette keeps rays in proportion to their weight
+                divisions *= child_weight / values['lw']
+                child_weight = values['lw']
+            levels.append(divisions * computed)
+            weight = child_weight
+        rays = 1.0 + direct
+        for divisions in reversed(levels):
+            rays = 1.0 + direct + divisions * rays
+        return rays
+
+    def estimate(self, command=None, options=None, sensors=None, octree=None,
+                 sampling_type=None, sources=1, cwd=None):
+        """Estimate the number of rays and the wall time for a command.
+
+        Args:
+            command: An optional Rtrace, Rcontrib or Rfluxmtx command. The options, the
+                sensors and the octree will be taken from the command if they are not
+                provided.
+            options: RtraceOptions or RcontribOptions.
+            sensors: Number of sensors or path to a sensors file.
+            octree: Size of the octree in megabytes or path to the octree file.
+            sampling_type: Rfluxmtx sampling type (e.g. kf, r4 or sc6). For a sender
+                surface the number of primary rays is multiplied by the number of bins.
+                Otherwise the number of bins is used for the size of the output.
+            sources: Number of light sources in the scene (Default: 1).
+            cwd: Working directory for the relative file paths.
+
+        Returns:
+            An Estimate.
+        """
+        sender = False
+        if command is not None:
+            options = options or command.options
+            if sensors is None:
+                sensors = getattr(command, 'sensors', None)
+            if octree is None:
+                octree = getattr(command, 'octree', None)
+            if sampling_type is None:
+                sampling_type = self._sampling_type(command, cwd)
+            sender = bool(getattr(command, 'sender', None)) and \
+                getattr(command, 'sensors', None) is None
+
+        if sensors is None:
+            sensors = 1
+        elif not isinstance(sensors, (int, float)):
+            sensors = count_sensors(_file_path(sensors, cwd))
+        if octree is None:
+            octree = 0
+        elif not isinstance(octree, (int, float)):
+            octree = os.path.getsize(_file_path(octree, cwd)) / 1048576.0
+
+        values = self._values(options)
+        bins = sampling_bins(sampling_type) if sampling_type else 1
+        primary_rays = sensors * values['c']
+        if sender:
+            primary_rays *= bins
+        rays = primary_rays * self.rays_per_primary(options, sources)
+        processes = max(1, int(values['n']))
+        output_values = 3 * sensors * (1 if sender else bins)
+
+        # the direct pretest samples are traced once for each source at the start
+        pretest = values['dp'] * sources
+        wall_time = self.overhead + octree * self.seconds_per_mb + \
+            (rays + pretest) * self.seconds_per_ray / processes
+        return Estimate(rays, primary_rays, octree, processes, wall_time, output_values)
+
+    @staticmethod
+    def _sampling_type(command, cwd=None):
+        """Get the sampling type from the receivers or the sender of rfluxmtx."""
+        for attr in ('sender', 'receivers'):
+            path = getattr(command, attr, None)
+            if not path or not os.path.isfile(_file_path(path, cwd)):
+                continue
+            try:
+                params = RfluxmtxControlParameters.from_file(_file_path(path, cwd))
+            except ValueError:
+                continue
+            return params.sampling_type
+        return None
+
+    def check(self, command=None, max_time=None, max_rays=None, **kwargs):
+        """Raise a ValueError if the estimated cost of a command is too high.
+
+        Args:
+            command: A command for the estimate.
+            max_time: Maximum acceptable wall time in seconds.
+            max_rays: Maximum acceptable number of rays.
+            kwargs: Additional keyword arguments for the estimate method.
+
+        Returns:
+            The Estimate if it is within the limits.
+        """
+        estimate = self.estimate(command, **kwargs)
+        if max_time is not None and estimate.wall_time > max_time:
+            raise ValueError(
+                'Estimated run time is %.0f seconds which is more than %.0f seconds '
+                '(%.3g rays). Double check the options and the number of sensors.' % (
+                    estimate.wall_time, max_time, estimate.rays
+                )
+            )
+        if max_rays is not None and estimate.rays > max_rays:
+            raise ValueError(
+                'Estimated number of rays is %.3g which is more than %.3g. Double check '
+                'the options and the number of sensors.' % (estimate.rays, max_rays)
+            )
+        return estimate
+
+    def calibrate(self, samples):
+        """Calibrate the time coefficients from the results of earlier runs.
+
+        The time per ray, the time per megabyte of octree and the overhead are fitted
+        using least squares. With fewer than three samples, or if the samples don't
+        have different octree sizes, only the time per ray is fitted.
+
+        Args:
+            samples: A list of (Estimate, CommandResult) tuples. The estimate is for
+                the command that created the result. Any object with a wall_time
+                attribute can be used instead of a CommandResult.
+
+        Returns:
+            This CostEstimator.
+        """
+        rows = []
+        for estimate, result in samples:
+            rays = (estimate.rays + 0.0) / estimate.processes
+            rows.append((rays, estimate.octree_size, result.wall_time))
+        if not rows:
+            return self
+
+        if len(rows) >= 3:
+            solution = _least_squares(
+                [(rays, size, 1.0) for rays, size, _ in rows], [t for _, _, t in rows]
+            )
+            if solution is not None and all(v >= 0 for v in solution):
+                self.seconds_per_ray, self.seconds_per_mb, self.overhead = solution
+                return self
+
+        # fit the time per ray for the time that is not spent on the fixed costs
+        numerator = sum(
+            rays * (t - self.overhead - size * self.seconds_per_mb)
+            for rays, size, t in rows
+        )
+        denominator = sum(rays * rays for rays, _, _ in rows)
+        if denominator and numerator > 0:
+            self.seconds_per_ray = numerator / denominator
+        return self
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return 'CostEstimator: %.3g s/ray - %.3g s/MB - %.3gs overhead' % (
+            self.seconds_per_ray, self.seconds_per_mb, self.overhead
+        )
+
+
+def _least_squares(rows, values):
+    """Solve a linear least squares problem using the normal equations.
+
+    Returns:
+        A list of coefficients or None if the problem is singular.
+    """
+    size = len(rows[0])
+    # scale the columns to avoid precision issues between rays and seconds
+    scales = [max(abs(r[i]) for r in rows) or 1.0 for i in range(size)]
+    rows = [[r[i] / scales[i] for i in range(size)] for r in rows]
+
+    # build the normal equations as an augmented matrix
+    matrix = []
+    for i in range(size):
+        row = [sum(r[i] * r[j] for r in rows) for j in range(size)]
+        row.append(sum(r[i] * v for r, v in zip(rows, values)))
+        matrix.append(row)
+
+    # gaussian elimination with partial pivoting
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda r: abs(matrix[r][col]))
+        if abs(matrix[pivot][col]) < 1e-9:
+            return None
+        matrix[col], matrix[pivot] = matrix[pivot], matrix[col]
+        for row in range(col + 1, size):
+            factor = matrix[row][col] / matrix[col][col]
+            for k in range(col, size + 1):
+                matrix[row][k] -= factor * matrix[col][k]
+
+    solution = [0.0] * size
+    for row in range(size - 1, -1, -1):
+        total = matrix[row][size] - sum(
+            matrix[row][k] * solution[k] for k in range(row + 1, size)
+        )
+        solution[row] = total / matrix[row][row]
+    return [value / scale for value, scale in zip(solution, scales)]
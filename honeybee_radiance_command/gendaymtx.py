@@ -1,6 +1,7 @@
 """gendaymtx command."""
 from .options.gendaymtx import GendaymtxOptions
 from ._command import Command
+from ._command_util import _input_argv
 import honeybee_radiance_command._exception as exceptions
 import honeybee_radiance_command._typing as typing
 
@@ -64,8 +65,13 @@ class Gendaymtx(Command):
         else:
             self._wea = typing.normpath(value)
 
-    def to_radiance(self):
-        """Command in Radiance format."""
+    def to_radiance(self, stdin_input=False):
+        """Command in Radiance format.
+
+        Args:
+            stdin_input: This input is only here to match the signature of the other
+                commands. gendaymtx always reads the input from the wea file.
+        """
         self.validate()
 
         command_parts = [self.command, self.options.to_radiance(), self.wea]
@@ -77,6 +83,11 @@ class Gendaymtx(Command):
 
         return ' '.join(cmd.split())
 
+    def _argv(self, stdin_input=False):
+        self.validate()
+        argv = [self.command] + self.options.to_argv() + _input_argv(self.wea)
+        return argv, None
+
     def validate(self):
         Command.validate(self)
         if self.wea is None:
@@ -4,6 +4,7 @@
 
 from .options.gensky import GenskyOptions
 from ._command import Command
+from ._command_util import _input_argv
 from ._typing import tuple_with_length, int_in_range
 import honeybee_radiance_command._exception as exceptions
 
@@ -238,16 +239,7 @@ class Gensky(Command):
                 comes from stdin. This is for instance the case when you pipe the input
                 from another command (default: False).
         """
-        # If form_ang is not used, validate arguments
-        if not self.options.ang.is_set:
-            self.validate()
-
-        # Month, day, and time are set and then -ang option is set
-        elif self.options.ang.is_set and (self.month and self.day and self.time):
-            raise ValueError(
-                'Gensky command can be used with either month, day, time or with'
-                ' -ang option that uses sun altitude, azimuth. Setting both are'
-                ' not allowed.')
+        self._check_inputs()
 
         command_parts = [self.command]
 
@@ -268,6 +260,29 @@ class Gensky(Command):
 
         return ' '.join(cmd.split())
 
+    def _argv(self, stdin_input=False):
+        self._check_inputs()
+        argv = [self.command]
+        if self.options:
+            argv.extend(self.options.to_argv())
+        if not stdin_input and self.input:
+            argv.extend(_input_argv(self.input))
+        return argv, None
+
+    def _check_inputs(self):
+        """Check the date and time or the -ang option before translating the command.
+        """
+        # If form_ang is not used, validate arguments
+        if not self.options.ang.is_set:
+            self.validate()
+
+        # Month, day, and time are set and then -ang option is set
+        elif self.options.ang.is_set and (self.month and self.day and self.time):
+            raise ValueError(
+                'Gensky command can be used with either month, day, time or with'
+                ' -ang option that uses sun altitude, azimuth. Setting both are'
+                ' not allowed.')
+
     def validate(self):
         Command.validate(self)
         if not self.month:
@@ -2,6 +2,7 @@
 
 from .options.getinfo import GetinfoOptions
 from ._command import Command
+from ._command_util import _input_argv
 
 import honeybee_radiance_command._exception as exceptions
 import honeybee_radiance_command._typing as typing
@@ -113,6 +114,21 @@ class Getinfo(Command):
 
         return ' '.join(cmd.split())
 
+    def _argv(self, stdin_input=False):
+        self.validate(stdin_input)
+        argv = [self.command]
+        if not self._remove_header:
+            argv.extend(self.options.to_argv())
+        else:
+            argv.append('-')
+        stdin = None
+        if not stdin_input and self.input:
+            if self.options.a or self._remove_header:
+                stdin = _input_argv(self.input)[0]
+            else:
+                argv.extend(_input_argv(self.input))
+        return argv, stdin
+
     def validate(self, stdin_input=False):
         Command.validate(self)
         if not stdin_input and not self.input:
@@ -0,0 +1,237 @@
+"""Utilities to read Radiance matrix data from commands like rtrace, rcontrib and
+dctimestep.
+
+A Radiance matrix can start with an information header. The header starts with
+``#?RADIANCE`` and ends with an empty line. The header can include the number of rows
+(NROWS), the number of columns (NCOLS), the number of components (NCOMP), the data
+format (FORMAT) and the byte order for binary data (BigEndian).
+
+```
+#?RADIANCE
+rcontrib -I+ -ab 1 -ad 5000 -lw 2e-05 -faf -m sky_glow scene.oct
+NROWS=100
+NCOLS=146
+NCOMP=3
+FORMAT=float
+
+<data>
+```
+"""
+import os
+
+HEADER_START = b'#?RADIANCE'
+
+# number of bytes for each value in binary formats
+_FORMAT_SIZE = {'float': 4, 'double': 8}
+# data formats for the format characters in the command options (e.g. -ffd)
+_FORMAT_CHARS = {'a': 'ascii', 'f': 'float', 'd': 'double'}
+# number of values for each output type of rtrace -o
+_OUTPUT_SIZE = {
+    'o': 3, 'd': 3, 'v': 3, 'V': 3, 'w': 1, 'W': 3, 'l': 1, 'L': 1, 'c': 2, 'p': 3,
+    'n': 3, 'N': 3
+}
+
+
+def parse_header(data):
+    """Parse the information header of a Radiance matrix.
+
+    Args:
+        data: Matrix data as bytes.
+
+    Returns:
+        A tuple with two items. The first item is a dictionary for the variables in the
+        header (e.g. {'NROWS': '100', 'NCOLS': '146', 'NCOMP': '3', 'FORMAT': 'float'})
+        and the second item is the index for the start of the data. If the data has no
+        header the dictionary will be empty and the index will be 0.
+    """
+    if not data.startswith(HEADER_START):
+        return {}, 0
+    end = data.find(b'\n\n')
+    if end == -1:
+        raise ValueError('Failed to find the end of the Radiance header.')
+    header = {}
+    for line in data[:end].split(b'\n')[1:]:
+        line = line.decode('utf-8', 'replace').strip()
+        if '=' not in line or ' ' in line.split('=')[0]:
+            # command lines are also written to the header
+            continue
+        key, value = line.split('=', 1)
+        header[key.strip()] = value.strip()
+    return header, end + 2
+
+
+def header_format(header, default='ascii'):
+    """Get data format from a Radiance header.
+
+    Args:
+        header: Header dictionary from parse_header.
+        default: Default format if the header doesn't include the format.
+
+    Returns:
+        One of the ascii, float or double formats.
+    """
+    fmt = header.get('FORMAT', default).lower()
+    if fmt.startswith('ascii'):
+        return 'ascii'
+    if fmt not in _FORMAT_SIZE:
+        raise ValueError('Unsupported Radiance matrix format: %s' % fmt)
+    return fmt
+
+
+def _is_number(value):
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def output_format(argv):
+    """Get the output format of a command from its arguments.
+
+    The format is needed to read the output of the commands that don't write a header
+    (e.g. rcontrib -h -ffd). The format is found from the -f option of rtrace,
+    rcontrib, rfluxmtx and rmtxop and from the -of and -od options of dctimestep and
+    gendaymtx. The number of components is found from the -o option of rtrace and
+    the -c option of rmtxop.
+
+    Args:
+        argv: List of command arguments starting with the executable name.
+
+    Returns:
+        A tuple with two items for the fmt and ncomp inputs of to_numpy. The format is
+        None if it is not set in the arguments.
+    """
+    fmt, ncomp = None, 3
+    if not argv:
+        return fmt, ncomp
+    program = os.path.basename(argv[0]).lower()
+    if program.endswith('.exe'):
+        program = program[:-4]
+    for count, arg in enumerate(argv[1:], 1):
+        if program in ('rtrace', 'rcontrib', 'rfluxmtx'):
+            if len(arg) == 4 and arg.startswith('-f') and arg[2] in 'afdc' \
+                    and arg[3] in 'afdc':
+                fmt = _FORMAT_CHARS.get(arg[3])
+            elif program == 'rtrace' and arg.startswith('-o') and len(arg) > 2:
+                ncomp = sum(_OUTPUT_SIZE.get(char, 0) for char in arg[2:])
+        elif program == 'rmtxop':
+            if len(arg) == 3 and arg.startswith('-f') and arg[2] in 'afdc':
+                fmt = _FORMAT_CHARS.get(arg[2])
+            elif arg == '-c':
+                coefficients = 0
+                for value in argv[count + 1:]:
+                    if not _is_number(value):
+                        break
+                    coefficients += 1
+                # a single coefficient scales all the components
+                if coefficients > 1:
+                    ncomp = max(1, coefficients // 3)
+        elif program in ('dctimestep', 'gendaymtx'):
+            if arg in ('-of', '-od'):
+                fmt = _FORMAT_CHARS[arg[2]]
+    return fmt, ncomp
+
+
+def to_numpy(data, fmt=None, ncomp=3):
+    """Convert Radiance matrix data to a NumPy array.
+
+    Args:
+        data: Matrix data as bytes. The data can start with a Radiance header.
+        fmt: Data format for data without a FORMAT in the header. Valid inputs are
+            ascii, float and double. By default the format will be from the header and
+            if there is no FORMAT in the header the data is considered to be ascii.
+        ncomp: Number of components for data without NCOMP in the header (Default: 3).
+
+    Returns:
+        A NumPy array with (rows, columns, components) shape. If the header doesn't
+        include NCOLS the number of columns is considered to be 1 and if the header
+        doesn't include NROWS the number of rows is calculated from the data size.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError('NumPy must be installed to load Radiance matrices as arrays.')
+
+    header, index = parse_header(data)
+    fmt = header_format(header, fmt or 'ascii')
+    ncomp = int(header.get('NCOMP', ncomp))
+    ncols = int(header.get('NCOLS', 1))
+    body = data[index:]
+
+    if fmt == 'ascii':
+        values = np.array(body.split(), dtype=float)
+    else:
+        big_endian = header.get('BigEndian')
+        if big_endian is None:
+            byte_order = '='
+        else:
+            byte_order = '>' if big_endian.strip() == '1' else '<'
+        dtype = np.dtype('%sf%d' % (byte_order, _FORMAT_SIZE[fmt]))
+        values = np.frombuffer(body, dtype=dtype)
+
+    row_size = ncols * ncomp
+    if 'NROWS' in header:
+        nrows = int(header['NROWS'])
+    else:
+        nrows, remainder = divmod(values.size, row_size)
+        if remainder:
+            raise ValueError(
+                'Failed to load %d values as a matrix with %d columns and %d '
+                'components.' % (values.size, ncols, ncomp)
+            )
+    return values.reshape(nrows, ncols, ncomp)
+
+
+def read_header(stream):
+    """Read the information header from the start of a binary file.
+
+    Args:
+        stream: A file object in binary mode. If the file doesn't start with a header
+            the file position is moved back to the start of the file.
+
+    Returns:
+        A tuple with two items. The first item is the header dictionary similar to
+        parse_header and the second item is the header as bytes including the empty
+        line at the end of the header. If the file has no header the dictionary will be
+        empty and the header will be an empty bytes.
+    """
+    start = stream.read(len(HEADER_START))
+    if start != HEADER_START:
+        stream.seek(0)
+        return {}, b''
+    lines = [start + stream.readline()]
+    while True:
+        line = stream.readline()
+        if not line:
+            raise ValueError('Failed to find the end of the Radiance header.')
+        lines.append(line)
+        if line == b'\n':
+            break
+    header_bytes = b''.join(lines)
+    return parse_header(header_bytes)[0], header_bytes
+
+
+def set_header_value(header_bytes, key, value):
+    """Set the value for a variable in a Radiance header.
+
+    Args:
+        header_bytes: Radiance header as bytes including the empty line at the end.
+        key: Variable name (e.g. NROWS).
+        value: New value for the variable.
+
+    Returns:
+        The updated header as bytes. The variable is added to the end of the header if
+        it doesn't exist.
+    """
+    lines = header_bytes.split(b'\n')
+    new_line = ('%s=%s' % (key, value)).encode('utf-8')
+    prefix = ('%s=' % key).encode('utf-8')
+    for count, line in enumerate(lines):
+        if line.startswith(prefix):
+            lines[count] = new_line
+            break
+    else:
+        # the last two items are empty strings for the empty line
+        lines.insert(len(lines) - 2, new_line)
+    return b'\n'.join(lines)
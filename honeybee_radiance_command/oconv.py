@@ -1,6 +1,7 @@
 """oconv command."""
 from .options.oconv import OconvOptions
 from ._command import Command
+from ._command_util import _input_argv
 import warnings
 import honeybee_radiance_command._typing as typing
 
@@ -94,6 +95,18 @@ class Oconv(Command):
 
         return ' '.join(cmd.split())
 
+    def _argv(self, stdin_input=False):
+        self.validate()
+        argv = [self.command]
+        if self.options:
+            argv.extend(self.options.to_argv())
+        if stdin_input:
+            argv.append('-')
+        else:
+            for path in self.inputs:
+                argv.extend(_input_argv(path))
+        return argv, None
+
     def validate(self):
         Command.validate(self)
         if len(self.inputs) == 0:
@@ -3,13 +3,60 @@ import honeybee_radiance_command._typing as typing
 import honeybee_radiance_command.cutil as cutil
 import honeybee_radiance_command._exception as exceptions
 import honeybee_radiance_command.cutil as futil
+from honeybee_radiance_command._command_util import _tokenize_command
 import warnings
+import hashlib
+import json
 import re
 
 
+# a number in a Radiance options string (e.g. 0.1, 1e-1 or -5)
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?$')
+
+
+def _canonical_value(value):
+    """Get a canonical string or tuple for the value of an option.
+
+    Numbers are formatted the same way regardless of how they are written (0.1, 1e-1,
+    .1), boolean switches are + or - (-I is the same as -I+) and values with several
+    items are tuples.
+    """
+    if isinstance(value, bool):
+        return '+' if value else '-'
+    if isinstance(value, (int, float)):
+        return repr(float(value))
+    if isinstance(value, (list, tuple)):
+        return tuple(_canonical_value(v) for v in value)
+    value = str(value).strip()
+    if value in ('', '+'):
+        return '+'
+    if len(value.split()) > 1:
+        return tuple(_canonical_value(v) for v in value.split())
+    if _NUMBER.match(value):
+        return repr(float(value))
+    return value
+
+
+def _snapshot(value):
+    """Get an immutable copy of a value to find out if it is later changed in place.
+
+    Lists, sets and dictionaries are turned into tuples with their type so a cached
+    value is not changed when the original value is edited.
+    """
+    if isinstance(value, dict):
+        return dict, tuple((k, _snapshot(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return type(value), tuple(_snapshot(v) for v in value)
+    return value
+
+
+# slot descriptors that are copied for each Option class in Option._duplicate
+_OPTION_MEMBERS = {}
+
+
 class Option(object):
     """Radiance Option base class."""
-    __slots__ = ('_name', '_value', '_description')
+    __slots__ = ('_name', '_raw_value', '_description', '_owner')
 
     def __init__(self, name, description, value=None):
         """Create Radiance option.
@@ -19,10 +66,45 @@ class Option(object):
             description: Longer description for Radiance option (e.g. ambient bounces)
             value: Optional value for option (Defult: None).
         """
+        # the OptionCollection that this option belongs to
+        self._owner = None
         self.name = name
         self.description = description
         self.value = value
 
+    @property
+    def _value(self):
+        return self._raw_value
+
+    @_value.setter
+    def _value(self, value):
+        self._raw_value = value
+        owner = self._owner
+        if owner is not None:
+            # invalidate the cached Radiance string of the collection
+            object.__setattr__(owner, '_radiance', None)
+
+    def _duplicate(self):
+        """Get a copy of this option that is not assigned to any collection."""
+        cls = self.__class__
+        try:
+            members = _OPTION_MEMBERS[cls]
+        except KeyError:
+            members = _OPTION_MEMBERS[cls] = tuple(
+                c.__dict__[slot] for c in cls.__mro__
+                for slot in c.__dict__.get('__slots__', ())
+                if slot != '_owner'
+            )
+        option = cls.__new__(cls)
+        for member in members:
+            try:
+                value = member.__get__(self, cls)
+            except AttributeError:
+                continue
+            member.__set__(option, list(value) if type(value) is list else value)
+        option._owner = None
+        return option
+
     @property
     def name(self):
         return self._name.replace('_', '')
@@ -60,6 +142,13 @@ class Option(object):
         else:
             return ''
 
+    def to_argv(self):
+        """Translate option to a list of command arguments.
+
+        Quotes that are added to the values for the shell are removed.
+        """
+        return [token for token, _ in _tokenize_command(self.to_radiance())]
+
     def ToString(self):
         return self.__repr__()
 
@@ -193,6 +282,13 @@ class StringOptionJoined(StringOption):
         else:
             return ''
 
+    def to_argv(self):
+        """Translate option to a list of command arguments."""
+        if self.value is not None:
+            return ['-%s%s' % (self.name, self.value)]
+        else:
+            return []
+
 
 class NumericOption(Option):
     """Numerical Radiance option."""
@@ -228,6 +324,13 @@ class NumericOption(Option):
         else:
             self._value = None
 
+    def to_argv(self):
+        """Translate option to a list of command arguments."""
+        if self.value is not None:
+            return ['-%s' % self.name, str(self.value)]
+        else:
+            return []
+
     def __int__(self):
         return int(self._value)
 
@@ -332,6 +435,13 @@ class BoolOption(Option):
         else:
             return ''
 
+    def to_argv(self):
+        """Translate option to a list of command arguments."""
+        if self.value is not None:
+            return ['-%s%s' % (self.name, '' if self.value else '-')]
+        else:
+            return []
+
 
 class TupleOption(Option):
     """Tuple Radiance option."""
@@ -373,6 +483,13 @@ class TupleOption(Option):
         else:
             return ''
 
+    def to_argv(self):
+        """Translate option to a list of command arguments."""
+        if self.value is not None:
+            return ['-%s' % self.name] + [str(s) for s in self.value]
+        else:
+            return []
+
     def __getitem__(self, key):
         return self._value[key]
 
@@ -380,14 +497,102 @@ class TupleOption(Option):
         self._value[key] = val
 
 
-class OptionCollection(object):
+def _with_metaclass(meta, *bases):
+    """Create a base class with a metaclass for both Python 2 and Python 3."""
+    class metaclass(meta):
+
+        def __new__(cls, name, this_bases, d):
+            return meta(name, bases, d)
+    return type.__new__(metaclass, 'temporary_class', (), {})
+
+
+class _OptionCollectionMeta(type):
+    """Metaclass for OptionCollection that creates the slot tables for each class.
+
+    The slots of an option collection are fixed when the class is created. The tables
+    are calculated once here instead of walking the MRO every time the options are
+    translated to Radiance format.
+
+    The default options for each class are created once by running __init__ for a
+    template instance. New instances only get a copy of the attributes that are not
+    options. This is only done for the classes that use an __init__ method from this
+    library. The other subclasses are created by running their __init__ as usual. The slots for the options stay empty until the options are read or set.
+    OptionCollection.__getattr__ assigns a copy of the shared default option of the
+    template to the slot on the first read. Translating the options to Radiance format
+    reads the shared default options directly and doesn't fill the slots.
+    """
+
+    def __init__(cls, name, bases, attrs):
+        super(_OptionCollectionMeta, cls).__init__(name, bases, attrs)
+        # slots from the class and all the base classes except for OptionCollection
+        slots = set(getattr(cls, '__slots__', ()))
+        for base in cls.__mro__[1:-2]:
+            slots.update(getattr(base, '__slots__', ()))
+        cls._slot_table = tuple(sorted(slots))
+        cls._slot_set = frozenset(cls._slot_table)
+        # joined options that start with f (e.g. -faf) are assigned to fio
+        cls._has_fio = '_fio' in cls._slot_set
+        # the template is only used if __init__ is from this library. A subclass with
+        # its own __init__ can set other attributes or have side effects.
+        init_class = next(c for c in cls.__mro__ if '__init__' in c.__dict__)
+        cls._use_template = init_class.__module__.startswith(
+            'honeybee_radiance_command.'
+        )
+
+    def __call__(cls, *args, **kwargs):
+        if args or kwargs or not cls._use_template:
+            # classes with custom inputs or a custom __init__ are created as usual
+            return super(_OptionCollectionMeta, cls).__call__(*args, **kwargs)
+        template = cls.__dict__.get('_template')
+        if template is None:
+            template = cls._create_template()
+        instance = cls.__new__(cls)
+        for slot, value in template[1]:
+            if isinstance(value, (dict, list)):
+                value = type(value)(value)
+            object.__setattr__(instance, slot, value)
+        return instance
+
+    def _create_template(cls):
+        """Create the default options and attributes for new instances."""
+        instance = super(_OptionCollectionMeta, cls).__call__()
+        options = {}
+        attributes = []
+        for slot in OptionCollection.__slots__ + cls._slot_table:
+            if slot == '_radiance':
+                attributes.append((slot, None))
+                continue
+            try:
+                value = object.__getattribute__(instance, slot)
+            except AttributeError:
+                continue
+            if isinstance(value, Option):
+                value._owner = None
+                options[slot] = value
+            else:
+                attributes.append((slot, value))
+        template = (options, tuple(attributes))
+        type.__setattr__(cls, '_template', template)
+        return template
+
+
+class OptionCollection(_with_metaclass(_OptionCollectionMeta, object)):
     """Collection of Radiance Options.
 
     This is base class for difference Radiance command options.
     """
-    __slots__ = ('additional_options', '_on_setattr_check', '_protected')
+    __slots__ = (
+        'additional_options', '_on_setattr_check', '_protected', '_radiance',
+        '_shared_reads'
+    )
 
     def __init__(self):
+        # cached additional options and Radiance string for the options. It is set to
+        # None every time an option or an attribute of the collection changes.
+        object.__setattr__(self, '_radiance', None)
+        # return the shared default options instead of a copy while the options are
+        # checked in _on_setattr
+        object.__setattr__(self, '_shared_reads', False)
         # run on_setattr method on every attribute assignment
         # set to False if you are assigning several attributes all together when
         # initiating a new instance.
@@ -407,22 +612,39 @@ class OptionCollection(object):
     @property
     def slots(self):
         """Return slots including the ones from the baseclass if any."""
-        slots = set(self.__slots__)
-        for cls in self.__class__.__mro__[1:-2]:
-            for s in getattr(cls, '__slots__', tuple()):
-                if s in slots:
-                    continue
-                slots.add(s)
-        slots = [s for s in slots if s not in self._protected]
-        slots.sort()
-        return slots
+        return list(self._active_slots())
+
+    def _default_option(self, slot):
+        """Get the shared default option for a slot."""
+        try:
+            return self.__class__.__dict__['_template'][0][slot]
+        except KeyError:
+            raise AttributeError(
+                '"%s" object has no attribute "%s".' % (self.__class__.__name__, slot)
+            )
+
+    def _option(self, slot):
+        """Get the option for a slot without copying the shared default option.
+
+        The returned option should not be edited.
+        """
+        try:
+            return object.__getattribute__(self, slot)
+        except AttributeError:
+            return self._default_option(slot)
+
+    def _active_slots(self):
+        """Get the sorted slots from the class slot table without the protected ones."""
+        if self._protected:
+            return tuple(s for s in self._slot_table if s not in self._protected)
+        return self._slot_table
 
     @property
     def options(self):
         """Print out list of options."""
         options = []
-        for opt in self.slots:
-            option = getattr(self, opt)
+        for opt in self._active_slots():
+            option = self._option(opt)
             if not isinstance(option, Option):
                 continue
             options.append(str(option))
@@ -430,23 +652,33 @@ class OptionCollection(object):
             options.append('-%s %s\t\t# additional option with no description' % (k, v))
         return '\n'.join(options)
 
-    def update_from_string(self, string):
+    def update_from_string(self, string, folder=None):
         """Update options from a standard radiance string.
 
         If the option is not currently part of the collection, it will be added to
-        additional_options.
+        additional_options. The checks in _on_setattr run once after all the options
+        are set.
+
+        Args:
+            string: Radiance options string (e.g. '-ab 4 -ad 256').
+            folder: Optional folder for the relative paths of the @file includes in
+                the string.
         """
-        slots = self.slots
-        opt_dict = cutil.parse_radiance_options(string)
-        for p, v in opt_dict.items():
-            if '_%s' % p in slots:
-                setattr(self, p, v)
-            else:
-                if len(p) > 1:
+        slots = self._slot_set.difference(self._protected) if self._protected \
+            else self._slot_set
+        has_fio = self._has_fio and '_fio' in slots
+        check = self._on_setattr_check
+        object.__setattr__(self, '_on_setattr_check', False)
+        try:
+            for p, v in cutil.tokenize_radiance_options(string, folder, False):
+                if '_%s' % p in slots:
+                    setattr(self, p, v)
+                    continue
+                if len(p) > 1 and (has_fio and p[0] == 'f' or '_%s' % p[0] in slots):
                     # joined string
                     # catch special case -fio
                     try:
-                        if p.startswith('f') and '_fio' in slots:
+                        if p.startswith('f') and has_fio:
                             setattr(self, 'fio', p[1:])
                         else:
                             setattr(self, p[0], p[1:])
@@ -463,27 +695,134 @@ class OptionCollection(object):
                 )
                 # add to additional options
                 self.additional_options[p] = v
+        finally:
+            object.__setattr__(self, '_on_setattr_check', check)
+        if check:
+            self._check_options()
 
     def to_radiance(self):
-        """Translate options to Radiance format."""
-        options = \
-            ' '.join(getattr(self, opt).to_radiance() for opt in self.slots)
-        additional_options = \
-            ' '.join('-%s %s' % (k, v) for k, v in self.additional_options.items())
+        """Translate options to Radiance format.
+
+        The string is cached until one of the options changes. The additional options
+        are compared with a copy of the ones that are used for the cached string since
+        they can be edited directly.
+        """
+        additional = tuple(
+            (k, _snapshot(v)) for k, v in self.additional_options.items()
+        )
+        cached = self._radiance
+        if cached is not None and cached[0] == additional:
+            return cached[1]
+        options = self._options_to_radiance()
+        if self.additional_options:
+            additional_options = ' '.join(
+                '-%s %s' % (k, v) for k, v in self.additional_options.items()
+            )
+            options = ' '.join((options, additional_options))
 
         # handle replace %% with % to handle % in both Window and Unix
-        return ' '.join(
-            ' '.join((options, additional_options)).split()).replace('%%', '%')
+        options = ' '.join(options.split()).replace('%%', '%')
+        object.__setattr__(self, '_radiance', (additional, options))
+        return options
+
+    def _options_to_radiance(self):
+        """Translate the options without the additional options to Radiance format.
+
+        Overwrite this method to change the order of the options.
+        """
+        return ' '.join(self._option(opt).to_radiance() for opt in self._active_slots())
+
+    def _additional_options_argv(self):
+        """Translate additional options to a list of command arguments."""
+        argv = []
+        for k, v in self.additional_options.items():
+            argv.append('-%s' % k)
+            if isinstance(v, (list, tuple)):
+                argv.extend(str(i) for i in v)
+            elif v != '':
+                argv.extend(token for token, _ in _tokenize_command(str(v)))
+        return argv
+
+    def to_argv(self):
+        """Translate options to a list of command arguments.
+
+        The arguments are in the same order as the output of to_radiance method.
+        """
+        argv = []
+        for opt in self._active_slots():
+            argv.extend(self._option(opt).to_argv())
+        argv.extend(self._additional_options_argv())
+        return [arg.replace('%%', '%') for arg in argv]
 
     def to_file(self, folder, file_name, mkdir=False):
         """Write options to a file."""
         name = file_name or self.__class__.__name__ + '.opt'
         return futil.write_to_file_by_name(folder, name, self.to_radiance(), mkdir)
 
+    def _canonical(self):
+        """Get a sorted tuple of the options that are set and their canonical values.
+
+        The tuple is the same for collections with the same options regardless of the
+        order that the options are set and how the values are written.
+        """
+        options = {}
+        for opt in self._active_slots():
+            option = self._option(opt)
+            if isinstance(option, Option) and option.is_set:
+                options[opt[1:]] = _canonical_value(option.value)
+        for k, v in self.additional_options.items():
+            options[k] = _canonical_value(v)
+        return tuple(sorted(options.items()))
+
+    def fingerprint(self):
+        """Get a stable fingerprint for the options that can be used as a cache key.
+
+        The fingerprint is the same for the collections of the same command with the
+        same options regardless of the order that the options are set, the format of
+        the numbers (e.g. 0.1 and 1e-1) and the equivalent spellings of the boolean
+        options (e.g. -I and -I+).
+
+        Returns:
+            A sha256 hex digest as a string.
+        """
+        data = json.dumps([self.command, self._canonical()], separators=(',', ':'))
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def __eq__(self, other):
+        if not isinstance(other, OptionCollection):
+            return NotImplemented
+        return self.__class__ is other.__class__ and \
+            self._canonical() == other._canonical()
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        # the hash changes if the options are changed. Do not change the options of a
+        # collection that is used in a set or as a dictionary key.
+        return hash((self.__class__, self._canonical()))
+
     def __repr__(self):
         return self.options
 
+    def __getattr__(self, name):
+        # only called for the attributes that are not found which includes the empty
+        # slots for the options that are not set
+        default = self._default_option(name)
+        if self._shared_reads:
+            # the options are only read in _on_setattr
+            return default
+        # assign a copy of the shared default option on the first read so the same
+        # option is returned for the next reads and the assignments
+        option = default._duplicate()
+        option._owner = self
+        object.__setattr__(self, name, option)
+        return option
+
     def __setattr__(self, name, value):
+        if isinstance(value, Option):
+            value._owner = self
         try:
             object.__setattr__(self, name, value)
         except (AttributeError, SystemError):
@@ -498,15 +837,25 @@ class OptionCollection(object):
                         name, self.__class__.__name__)
                 )
         else:
+            object.__setattr__(self, '_radiance', None)
             if self._on_setattr_check:
-                self._on_setattr()
+                self._check_options()
+
+    def _check_options(self):
+        """Run _on_setattr with the shared default options for the unset options."""
+        object.__setattr__(self, '_shared_reads', True)
+        try:
+            self._on_setattr()
+        finally:
+            object.__setattr__(self, '_shared_reads', False)
 
     def _on_setattr(self):
         """This method executes after setting each new attribute.
 
         Use this method to add checks that are necessary for OptionCollection. For
         instance in rtrace option collection -ti and -te are exclusive. You can include a
-        check to ensure this is always correct.
+        check to ensure this is always correct. The options should not be changed in
+        this method.
         """
         pass
 
@@ -539,3 +888,10 @@ class ToggleOption(Option):
             return '%s%s' % (self.value, self.name)
         else:
             return ''
+
+    def to_argv(self):
+        """Translate option to a list of command arguments."""
+        if self.value is not None:
+            return ['%s%s' % (self.value, self.name)]
+        else:
+            return []
@@ -253,28 +253,38 @@ class RcontribOptions(RtraceOptions):
     def t(self, value):
         self._t.value = value
 
-    def to_radiance(self):
-        """Translate options to Radiance format."""
-
+    def _options_to_radiance(self):
+        """Translate the options to Radiance format with the positional options first.
+        """
         positional_options = ('_p', '_b', '_bn', '_o')
 
-        slots = list(self.slots)
+        slots = self._active_slots()
         options = []
         for option_flag in positional_options:
             if option_flag in slots:
-                positional_option_value = getattr(self,
-                                                  option_flag).to_radiance().strip()
+                positional_option_value = \
+                    self._option(option_flag).to_radiance().strip()
                 if positional_option_value:
                     options.append(positional_option_value)
 
-        options.extend([getattr(self, opt).to_radiance() for opt in slots if
+        options.extend([self._option(opt).to_radiance() for opt in slots if
                         opt not in positional_options])
 
-        options = ' '.join(options)
+        return ' '.join(options)
+
+    def to_argv(self):
+        """Translate options to a list of command arguments."""
+        positional_options = ('_p', '_b', '_bn', '_o')
+
+        slots = self._active_slots()
+        argv = []
+        for option_flag in positional_options:
+            if option_flag in slots:
+                argv.extend(self._option(option_flag).to_argv())
 
-        additional_options = \
-            ' '.join(
-                '-%s %s' % (k, v) for k, v in self.additional_options.items())
+        for opt in slots:
+            if opt not in positional_options:
+                argv.extend(self._option(opt).to_argv())
 
-        return ' '.join(
-            ' '.join((options, additional_options)).split()).replace('%%', '%')
+        argv.extend(self._additional_options_argv())
+        return [arg.replace('%%', '%') for arg in argv]
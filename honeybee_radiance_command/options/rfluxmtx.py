@@ -28,7 +28,7 @@ class RfluxmtxOptions(RcontribOptions):
         """
         RcontribOptions._on_setattr(self)
         for opt in self._protected:
-            if getattr(self, opt).is_set:
+            if self._option('_%s' % opt).is_set:
                 raise exceptions.ProtectedOptionError('rfluxmtx', opt)
 
     @property
@@ -2,6 +2,7 @@
 
 from .options.pinterp import PinterpOptions
 from ._command import Command
+from ._command_util import _input_argv
 import honeybee_radiance_command._exception as exceptions
 import honeybee_radiance_command._typing as typing
 
@@ -105,20 +106,7 @@ class Pinterp(Command):
                 comes from stdin. This is for instance the case when you pipe the input
                 from another command. (Default: False).
         """
-        self.validate(stdin_input)
-
-        # length of images and zpec must be the same
-        if len(self.image) != len(self.zspec):
-            raise ValueError(
-                'Pinterp command needs each input image to be accompanied by a'
-                ' z specification. Found {} image(s) and {} z specification(s).'
-                ' Make sure the number of images are equal to the number of'
-                ' z specifications'.format(len(self.image), len(self.zspec)))
-
-        if stdin_input: 
-            self.options.vf = '-'
-        else: 
-            self.options.vf = self.view
+        self._prepare(stdin_input)
 
         command_parts = [self.command, self.options.to_radiance()]
         cmd = ' '.join(command_parts)
@@ -134,6 +122,32 @@ class Pinterp(Command):
 
         return ' '.join(cmd.split())
 
+    def _argv(self, stdin_input=False):
+        self._prepare(stdin_input)
+        argv = [self.command] + self.options.to_argv()
+        for (img, z) in zip(self.image, self.zspec):
+            argv.extend(_input_argv(img))
+            argv.extend(_input_argv(z))
+        return argv, None
+
+    def _prepare(self, stdin_input=False):
+        """Validate the inputs and set the view option before translating the command.
+        """
+        self.validate(stdin_input)
+
+        # length of images and zpec must be the same
+        if len(self.image) != len(self.zspec):
+            raise ValueError(
+                'Pinterp command needs each input image to be accompanied by a'
+                ' z specification. Found {} image(s) and {} z specification(s).'
+                ' Make sure the number of images are equal to the number of'
+                ' z specifications'.format(len(self.image), len(self.zspec)))
+
+        if stdin_input:
+            self.options.vf = '-'
+        else:
+            self.options.vf = self.view
+
     def validate(self, stdin_input=False):
         Command.validate(self)
         if not stdin_input and not self.view:
@@ -4,6 +4,7 @@
 
 from .options.ra_gif import Ra_GIFOptions
 from ._command import Command
+from ._command_util import _input_argv
 import honeybee_radiance_command._typing as typing
 import honeybee_radiance_command._exception as exceptions
 
@@ -87,6 +88,13 @@ class Ra_GIF(Command):
 
         return ' '.join(cmd.split())
 
+    def _argv(self, stdin_input=False):
+        self.validate(stdin_input)
+        argv = [self.command] + self.options.to_argv()
+        if not stdin_input and self.input:
+            argv.extend(_input_argv(self.input))
+        return argv, None
+
     def validate(self, stdin_input=False):
         Command.validate(self)
         if not stdin_input and not self.input:
@@ -1,6 +1,7 @@
 """rcalc command."""
 from .options.rcalc import RcalcOptions
 from ._command import Command
+from ._command_util import _input_argv
 import warnings
 import honeybee_radiance_command._typing as typing
 try:
@@ -92,6 +93,16 @@ class Rcalc(Command):
 
         return ' '.join(cmd.split())
 
+    def _argv(self, stdin_input=False):
+        self.validate()
+        argv = [self.command]
+        if self.options:
+            argv.extend(self.options.to_argv())
+        if not stdin_input:
+            for path in self.inputs:
+                argv.extend(_input_argv(path))
+        return argv, None
+
     def validate(self):
         Command.validate(self)
         if len(self.inputs) == 0:
@@ -2,6 +2,7 @@
 
 from .options.rcollate import RcollateOptions
 from ._command import Command
+from ._command_util import _input_argv
 
 import honeybee_radiance_command._exception as exceptions
 from ._typing import path_checker
@@ -82,6 +83,13 @@ class Rcollate(Command):
 
         return ' '.join(cmd.split())
 
+    def _argv(self, stdin_input=False):
+        self.validate(stdin_input)
+        argv = [self.command] + self.options.to_argv()
+        if not stdin_input and self.input:
+            argv.extend(_input_argv(self.input))
+        return argv, None
+
     def validate(self, stdin_input=False):
         Command.validate(self)
         if not stdin_input and not self.input:
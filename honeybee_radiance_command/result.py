@@ -0,0 +1,223 @@
+"""Results of running Radiance commands."""
+from .diagnostics import Diagnostics
+
+
+class StageResult(object):
+    """Return code and resource usage for one command in a pipeline.
+
+    Args:
+        command: The command for this stage as a string.
+        return_code: Return code of the command.
+        wall_time: Elapsed time in seconds from the start of the pipeline until the
+            command is finished.
+        user_time: Time in seconds that the command spent in user mode (Default: None).
+        system_time: Time in seconds that the command spent in system mode
+            (Default: None).
+        max_rss: Peak resident memory of the command in kilobytes (Default: None).
+
+    Properties:
+        * command
+        * return_code
+        * wall_time
+        * user_time
+        * system_time
+        * cpu_time
+        * max_rss
+
+    Note:
+        CPU time and memory usage are only available on platforms that support
+        os.wait4 (e.g. Linux and Mac). They will be None on other platforms. If the
+        command is executed through a shell the values include all the commands that
+        are started by the shell.
+    """
+
+    __slots__ = ('command', 'return_code', 'wall_time', 'user_time', 'system_time',
+                 'max_rss')
+
+    def __init__(self, command, return_code, wall_time, user_time=None,
+                 system_time=None, max_rss=None):
+        self.command = command
+        self.return_code = return_code
+        self.wall_time = wall_time
+        self.user_time = user_time
+        self.system_time = system_time
+        self.max_rss = max_rss
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create a StageResult from a dictionary."""
+        return cls(
+            data['command'], data['return_code'], data['wall_time'],
+            data.get('user_time'), data.get('system_time'), data.get('max_rss')
+        )
+
+    @property
+    def cpu_time(self):
+        """Total CPU time in seconds or None if it is not available."""
+        if self.user_time is None or self.system_time is None:
+            return None
+        return self.user_time + self.system_time
+
+    def to_dict(self):
+        """Get the result as a dictionary."""
+        return {
+            'command': self.command,
+            'return_code': self.return_code,
+            'wall_time': self.wall_time,
+            'user_time': self.user_time,
+            'system_time': self.system_time,
+            'max_rss': self.max_rss
+        }
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return '%s: return code %d - wall: %.3fs - cpu: %s - max rss: %s' % (
+            self.command, self.return_code, self.wall_time,
+            'n/a' if self.cpu_time is None else '%.3fs' % self.cpu_time,
+            'n/a' if self.max_rss is None else '%d KB' % self.max_rss
+        )
+
+
+class CommandResult(object):
+    """Result of running a Radiance command.
+
+    A CommandResult compares like its return code so code that checks the return code
+    of Command.run continues to work. A result is equal to an integer with the same
+    value and to any other result with the same return code. The hash of a result is
+    the hash of its return code so a result can be used in place of its return code as
+    a dictionary key.
+
+    Args:
+        command: The command as a string.
+        stages: A list of StageResult objects - one for each command in the pipeline.
+        wall_time: Elapsed time in seconds for running the whole command.
+        stderr: Captured stderr from all the commands in the pipeline. Only the last
+            64 KB of stderr is kept. The diagnostics include all the messages
+            (Default: '').
+        output: Captured stdout of the command if the command is executed with
+            capture. It is either bytes or a NumPy array (Default: None).
+        cached: A boolean to indicate if the outputs are restored from a ResultCache
+            instead of running the command. In this case the stages and the timing are
+            from the original run (Default: False).
+        diagnostics: A Diagnostics object with the parsed warnings and errors from
+            the stderr. An empty Diagnostics object is created if it is not provided.
+
+    Properties:
+        * command
+        * stages
+        * return_code
+        * wall_time
+        * user_time
+        * system_time
+        * cpu_time
+        * max_rss
+        * stderr
+        * output
+        * cached
+        * diagnostics
+    """
+
+    __slots__ = ('command', 'stages', 'wall_time', 'stderr', 'output', 'cached',
+                 'diagnostics')
+
+    def __init__(self, command, stages, wall_time, stderr='', output=None,
+                 cached=False, diagnostics=None):
+        self.command = command
+        self.stages = stages
+        self.wall_time = wall_time
+        self.stderr = stderr
+        self.output = output
+        self.cached = cached
+        self.diagnostics = diagnostics if diagnostics is not None else Diagnostics()
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create a CommandResult from a dictionary."""
+        stages = [StageResult.from_dict(stage) for stage in data['stages']]
+        diagnostics = None
+        if 'diagnostics' in data:
+            diagnostics = Diagnostics.from_dict(data['diagnostics'])
+        return cls(
+            data['command'], stages, data['wall_time'], data.get('stderr', ''),
+            diagnostics=diagnostics
+        )
+
+    @property
+    def return_code(self):
+        """Return code of the command.
+
+        Similar to pipefail this is the return code of the last command in the
+        pipeline that failed or 0 if all the commands finished successfully.
+        """
+        rc = 0
+        for stage in self.stages:
+            if stage.return_code != 0:
+                rc = stage.return_code
+        return rc
+
+    @property
+    def user_time(self):
+        """Total user CPU time in seconds for all the stages or None."""
+        return self._sum('user_time')
+
+    @property
+    def system_time(self):
+        """Total system CPU time in seconds for all the stages or None."""
+        return self._sum('system_time')
+
+    @property
+    def cpu_time(self):
+        """Total CPU time in seconds for all the stages or None."""
+        return self._sum('cpu_time')
+
+    @property
+    def max_rss(self):
+        """Sum of the peak resident memory of all the stages in kilobytes or None.
+
+        The commands in a pipeline run at the same time and this value is the upper
+        bound for the memory that is needed to run the command.
+        """
+        return self._sum('max_rss')
+
+    def _sum(self, attr):
+        values = [getattr(stage, attr) for stage in self.stages]
+        if not values or any(v is None for v in values):
+            return None
+        return sum(values)
+
+    def to_dict(self):
+        """Get the result as a dictionary."""
+        return {
+            'command': self.command,
+            'return_code': self.return_code,
+            'wall_time': self.wall_time,
+            'stderr': self.stderr,
+            'diagnostics': self.diagnostics.to_dict(),
+            'stages': [stage.to_dict() for stage in self.stages]
+        }
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return 'CommandResult: return code %d - wall: %.3fs%s\n%s' % (
+            self.return_code, self.wall_time, ' - cached' if self.cached else '',
+            '\n'.join('  %r' % stage for stage in self.stages)
+        )
+
+    def __int__(self):
+        return self.return_code
+
+    def __eq__(self, other):
+        if isinstance(other, CommandResult):
+            other = other.return_code
+        return self.return_code == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        # equal objects must have the same hash and a result is equal to its return code
+        return hash(self.return_code)
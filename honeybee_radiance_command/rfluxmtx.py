@@ -1,6 +1,7 @@
 """rfluxmtx command"""
 
 from ._command import Command
+from ._command_util import _input_argv
 import honeybee_radiance_command._exception as exceptions
 import honeybee_radiance_command._typing as typing
 from .options.rfluxmtx import RfluxmtxOptions, RfluxmtxControlParameters
@@ -162,6 +163,20 @@ class Rfluxmtx(Command):
 
         return ' '.join(cmd.split())
 
+    def _argv(self, stdin_input=False):
+        self.validate(stdin_input)
+        argv = [self.command] + self.options.to_argv()
+        argv.extend(_input_argv(self.sender) or ['-'])
+        argv.extend(_input_argv(self.receivers))
+        if self.octree:
+            argv.append('-i')
+            argv.extend(_input_argv(self.octree))
+        argv.extend(_input_argv(self.system))
+        stdin = None
+        if not stdin_input and self.sensors:
+            stdin = _input_argv(self.sensors)[0]
+        return argv, stdin
+
     def validate(self, stdin_input=False):
         Command.validate(self)
         if self.receivers is None:
@@ -1,6 +1,7 @@
 """rmtxop command."""
 from .options.rmtxop import RmtxopOptions
 from ._command import Command
+from ._command_util import _input_argv
 import honeybee_radiance_command._exception as exceptions
 import honeybee_radiance_command._typing as typing
 import os
@@ -29,7 +30,9 @@ class Rmtxop(Command):
             if unspecified.
         output: File path to the output file (Default: None).
         matrices: A single file path or a list/tuple of multiple file paths of matrix
-            files.
+            files. A matrix can also be another Radiance command. Use the nested
+            input of the run method to run these commands at the same time instead of
+            one after the other.
         transforms: A nested list of tuples/lists containing floating point numbers that
             are meant to transform the matrix/matrices specified through the 'matrices'
             input. Defaults to None, implying no transformations. For a calculation
@@ -283,6 +286,28 @@ class Rmtxop(Command):
 
         return ' '.join(cmd.split())
 
+    def _argv(self, stdin_input=False):
+        if stdin_input:
+            self.matrices = '-'
+        self.validate(stdin_input)
+        argv = [self.command] + self.options.to_argv()
+        transposes = self.transposes
+        transforms = self.transforms
+        scalars = self.scalars
+        operators = self.operators
+        for idx, matrix in enumerate(self.matrices):
+            if transposes and transposes[idx]:
+                argv.append('-t')
+            if transforms and transforms[idx]:
+                argv.extend(['-c'] + ['%s' % val for val in transforms[idx]])
+            if scalars and scalars[idx]:
+                argv.extend(['-s'] + ['%s' % val for val in scalars[idx]])
+            argv.extend(_input_argv(matrix))
+            if operators and idx < (len(self.matrices) - 1):
+                # the operators are quoted for the shell
+                argv.extend(_input_argv(operators[idx]))
+        return argv, None
+
     def validate(self, stdin_input=False):
         Command.validate(self)
 
@@ -2,6 +2,7 @@
 
 from .options.rpict import RpictOptions
 from ._command import Command
+from ._command_util import _input_argv
 import honeybee_radiance_command._exception as exceptions
 import honeybee_radiance_command._typing as typing
 
@@ -98,6 +99,15 @@ class Rpict(Command):
 
         return ' '.join(cmd.split())
 
+    def _argv(self, stdin_input=False):
+        self.validate(stdin_input)
+        argv = [self.command] + self.options.to_argv()
+        if not stdin_input and self.view:
+            argv.append('-vf')
+            argv.extend(_input_argv(self.view))
+        argv.extend(_input_argv(self.octree))
+        return argv, None
+
     def validate(self, stdin_input=False):
         Command.validate(self)
         if self.octree is None:
@@ -1,6 +1,7 @@
 """rtrace command."""
 from .options.rtrace import RtraceOptions
 from ._command import Command
+from ._command_util import _input_argv
 import honeybee_radiance_command._exception as exceptions
 import honeybee_radiance_command._typing as typing
 
@@ -94,6 +95,14 @@ class Rtrace(Command):
 
         return ' '.join(cmd.split())
 
+    def _argv(self, stdin_input=False):
+        self.validate(stdin_input)
+        argv = [self.command] + self.options.to_argv() + _input_argv(self.octree)
+        stdin = None
+        if not stdin_input and self.sensors:
+            stdin = _input_argv(self.sensors)[0]
+        return argv, stdin
+
     def validate(self, stdin_input=False):
         Command.validate(self)
         if self.octree is None:
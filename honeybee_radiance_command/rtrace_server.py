@@ -0,0 +1,347 @@
+"""Persistent rtrace processes that keep the octree loaded between queries.
+
+Loading a large octree can take much longer than tracing a few hundred rays. An
+RtraceServer starts rtrace once and sends the rays for each query to the same process.
+An RtracePool runs several servers and splits each query between them.
+
+Example:
+
+```
+options = RtraceOptions()
+options.ab = 2
+options.I = True
+
+with RtracePool('scene.oct', options, size=4) as pool:
+    for sensors in sensor_grids:
+        # sensors is a list of (x, y, z, dx, dy, dz) values or a (n, 6) NumPy array
+        results = pool.trace(sensors)
+```
+"""
+import struct
+import threading
+import subprocess
+import multiprocessing
+
+from .options.rtrace import RtraceOptions
+from .rtrace import Rtrace
+from ._command_util import _process_command, _update_env, _find_executable, \
+    _group_kwargs, _kill_processes, _read_chunks
+from .sink import RingBufferSink
+from .matrix import _OUTPUT_SIZE
+from .environment import RadianceEnvironment
+
+# maximum number of bytes that are written to or read from rtrace before switching
+# between writing and reading. It is smaller than the pipe buffer on all platforms so
+# rtrace never blocks on a full output pipe while the rays are written.
+_BLOCK_SIZE = 8192
+
+
+def _output_size(spec):
+    """Get the number of values for each ray from an rtrace -o spec."""
+    size = 0
+    for char in spec:
+        try:
+            size += _OUTPUT_SIZE[char]
+        except KeyError:
+            raise ValueError(
+                'RtraceServer does not support -o%s output. Valid outputs are: %s' % (
+                    char, ''.join(sorted(_OUTPUT_SIZE))
+                )
+            )
+    return size
+
+
+class RtraceServer(object):
+    """A long-running rtrace process for tracing several batches of rays.
+
+    The rays and the results are sent as double-precision binary data (-fdd) and rtrace
+    flushes the output after every ray (-x 1) so each batch can be returned as soon as
+    it is traced. The output header is turned off (-h-).
+
+    Args:
+        octree: Path to an octree file.
+        options: RtraceOptions for the server. The options are copied and the input
+            and output format, the flush interval and the header options are overwritten.
+            Output specs for strings (-os, -om and -oM) are not supported.
+        env: Environmental variables for rtrace (Default: None).
+        cwd: Working directory for rtrace (Default: None).
+
+    Properties:
+        * octree
+        * options
+        * output_size
+        * is_running
+        * stderr
+    """
+
+    __slots__ = ('_octree', '_options', '_output_size', '_process', '_stderr',
+                 '_stderr_thread', '_lock')
+
+    def __init__(self, octree, options=None, env=None, cwd=None):
+        if options is not None and not isinstance(options, RtraceOptions):
+            raise ValueError('Expected RtraceOptions not {}'.format(type(options)))
+        self._octree = octree
+        server_options = RtraceOptions()
+        if options is not None:
+            server_options.update_from_string(options.to_radiance())
+        server_options.fio = 'dd'
+        server_options.x = 1
+        server_options.h = False
+        self._options = server_options
+        self._output_size = _output_size(server_options.o.value or 'v')
+        self._lock = threading.Lock()
+        self._stderr = RingBufferSink()
+        self._process = None
+        self._start(env, cwd)
+
+    @property
+    def octree(self):
+        """Path to the octree file."""
+        return self._octree
+
+    @property
+    def options(self):
+        """RtraceOptions for the running rtrace process."""
+        return self._options
+
+    @property
+    def output_size(self):
+        """Number of output values for each ray."""
+        return self._output_size
+
+    @property
+    def is_running(self):
+        """True if the rtrace process is running."""
+        return self._process is not None and self._process.poll() is None
+
+    @property
+    def stderr(self):
+        """The last part of the rtrace error messages as a string."""
+        return self._stderr.text
+
+    def _start(self, env, cwd):
+        """Start the rtrace process."""
+        rtrace = Rtrace(options=self._options, octree=self._octree)
+        argv = _process_command(rtrace.to_radiance(stdin_input=True))[0]['argv']
+        g_env = _update_env(env)
+        if isinstance(env, RadianceEnvironment):
+            argv[0] = env.executable(argv[0])
+        else:
+            argv[0] = _find_executable(argv[0], g_env)
+        self._process = subprocess.Popen(
+            argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, env=g_env, cwd=cwd, **_group_kwargs()
+        )
+        self._stderr_thread = threading.Thread(
+            target=_read_chunks, args=(self._process.stderr, self._stderr)
+        )
+        self._stderr_thread.daemon = True
+        self._stderr_thread.start()
+
+    def trace(self, rays):
+        """Trace a batch of rays.
+
+        Args:
+            rays: A list of rays where each ray is a list of six values for the origin
+                and the direction (x, y, z, dx, dy, dz). It can also be a NumPy array
+                with (n, 6) shape.
+
+        Returns:
+            The results in the same order as the input rays. For a NumPy array input
+            the output is a NumPy array with (n, output_size) shape. Otherwise the
+            output is a list of tuples.
+        """
+        is_array = hasattr(rays, 'tobytes')
+        if is_array:
+            import numpy as np
+            rays = np.ascontiguousarray(rays, dtype=np.float64).reshape(-1, 6)
+            count = rays.shape[0]
+        else:
+            rays = [tuple(float(v) for v in ray) for ray in rays]
+            for ray in rays:
+                if len(ray) != 6:
+                    raise ValueError(
+                        'Each ray must have 6 values for the origin and the direction. '
+                        'Got %d.' % len(ray)
+                    )
+            count = len(rays)
+
+        ray_size = 6 * 8
+        result_size = self._output_size * 8
+        block = max(1, min(_BLOCK_SIZE // ray_size, _BLOCK_SIZE // result_size))
+        data = []
+        with self._lock:
+            if not self.is_running:
+                raise RuntimeError(
+                    'rtrace is not running.\n%s' % self.stderr
+                )
+            stdin, stdout = self._process.stdin, self._process.stdout
+            for start in range(0, count, block):
+                end = min(start + block, count)
+                if is_array:
+                    stdin.write(rays[start:end].tobytes())
+                else:
+                    values = [v for ray in rays[start:end] for v in ray]
+                    stdin.write(struct.pack('=%dd' % len(values), *values))
+                stdin.flush()
+                size = (end - start) * result_size
+                chunk = stdout.read(size)
+                if len(chunk) != size:
+                    raise RuntimeError(
+                        'rtrace stopped before returning all the results.\n%s' %
+                        self.stderr
+                    )
+                data.append(chunk)
+
+        data = b''.join(data)
+        if is_array:
+            return np.frombuffer(data, dtype=np.float64).reshape(
+                count, self._output_size
+            )
+        values = struct.unpack('=%dd' % (count * self._output_size), data)
+        size = self._output_size
+        return [values[i:i + size] for i in range(0, len(values), size)]
+
+    def close(self):
+        """Stop the rtrace process."""
+        process = self._process
+        if process is None:
+            return
+        with self._lock:
+            try:
+                process.stdin.close()
+            except (IOError, OSError):
+                pass
+            try:
+                process.wait()
+            except KeyboardInterrupt:
+                _kill_processes([process])
+                raise
+            process.stdout.close()
+            self._stderr_thread.join()
+            self._process = None
+
+    def kill(self):
+        """Kill the rtrace process and all of its child processes."""
+        if self._process is not None:
+            _kill_processes([self._process])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return 'RtraceServer: %s (%s)' % (
+            self._octree, 'running' if self.is_running else 'stopped'
+        )
+
+
+class RtracePool(object):
+    """A pool of RtraceServer objects that share the work for each batch of rays.
+
+    Args:
+        octree: Path to an octree file.
+        options: RtraceOptions for the servers.
+        size: Number of servers. By default it is set to the number of CPUs.
+        env: Environmental variables for rtrace (Default: None).
+        cwd: Working directory for rtrace (Default: None).
+
+    Properties:
+        * servers
+        * size
+    """
+
+    __slots__ = ('_servers',)
+
+    def __init__(self, octree, options=None, size=None, env=None, cwd=None):
+        size = int(size or multiprocessing.cpu_count())
+        assert size > 0, 'Size of the pool must be larger than 0. Got %d.' % size
+        self._servers = []
+        try:
+            for _ in range(size):
+                self._servers.append(RtraceServer(octree, options, env, cwd))
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def servers(self):
+        """List of RtraceServer objects in the pool."""
+        return tuple(self._servers)
+
+    @property
+    def size(self):
+        """Number of servers in the pool."""
+        return len(self._servers)
+
+    def trace(self, rays):
+        """Trace a batch of rays with all the servers in the pool.
+
+        The rays are split into equal parts for each server and the results are
+        returned in the same order as the input rays.
+
+        Args:
+            rays: A list of rays or a NumPy array with (n, 6) shape.
+
+        Returns:
+            The results in the same order as the input rays. See RtraceServer.trace.
+        """
+        count = len(rays)
+        size = min(self.size, count) or 1
+        step, extra = divmod(count, size)
+        bounds = []
+        start = 0
+        for index in range(size):
+            end = start + step + (1 if index < extra else 0)
+            bounds.append((start, end))
+            start = end
+
+        results = [None] * size
+        errors = []
+
+        def _trace(index):
+            server = self._servers[index]
+            start, end = bounds[index]
+            try:
+                results[index] = server.trace(rays[start:end])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=_trace, args=(i,)) for i in range(size)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+        if hasattr(rays, 'tobytes'):
+            import numpy as np
+            return np.concatenate(results)
+        return [value for result in results for value in result]
+
+    def close(self):
+        """Stop all the servers in the pool."""
+        for server in self._servers:
+            server.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.size
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return 'RtracePool: %d servers' % self.size
@@ -0,0 +1,418 @@
+"""Split the sensor grid of a command into shards and run them in parallel.
+
+Each shard is a separate process with its own part of the sensor grid. The outputs of
+the shards are merged back in the same order as the sensors. For outputs with a
+Radiance header (e.g. rcontrib binary matrices) the header from the first shard is
+used and the number of rows (NROWS) is updated for the merged output.
+
+Example:
+
+```
+rcontrib = Rcontrib(
+    options=options, octree='scene.oct', sensors='grid.pts', output='dc.mtx'
+)
+sharded = ShardedRun(rcontrib, shards=64)
+results = sharded.run(cwd='./model', workers=64)
+```
+
+If a sharded run is interrupted the shards that are finished are recorded in a
+manifest file in the shard folder. Running the same command again only executes the
+shards that are missing or failed.
+"""
+import os
+import json
+import shutil
+import hashlib
+import threading
+import multiprocessing
+
+from .options.rcontrib import RcontribOptions
+from ._command_util import _file_path
+from .batch import CommandBatch, BatchResult
+from .cache import _file_hash
+from .matrix import read_header, set_header_value
+from .compression import open_file
+
+# chunk size for copying the outputs of the shards to the merged output
+_CHUNK_SIZE = 1048576
+
+
+def split_sensors(sensors, count, folder, prefix='shard'):
+    """Split a sensor file into several files with a similar number of sensors.
+
+    Empty lines are ignored and the order of the sensors is preserved.
+
+    Args:
+        sensors: Path to a sensor file with one sensor in each line.
+        count: Number of shards.
+        folder: Path to a folder to write the shard files.
+        prefix: Prefix for the name of the shard files (Default: shard).
+
+    Returns:
+        A list of tuples with the path to each shard file and the number of sensors in
+        the shard. The number of shards will be smaller than count if there are fewer
+        sensors than count.
+    """
+    assert count > 0, 'Number of shards must be larger than 0. Got %d.' % count
+    with open(sensors, 'rb') as f:
+        lines = [line if line.endswith(b'\n') else line + b'\n'
+                 for line in f if line.strip()]
+    if not lines:
+        raise ValueError('Sensor file is empty: %s' % sensors)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+
+    count = min(count, len(lines))
+    step, extra = divmod(len(lines), count)
+    shards = []
+    start = 0
+    for index in range(count):
+        end = start + step + (1 if index < extra else 0)
+        path = os.path.join(folder, '%s_%04d.pts' % (prefix, index))
+        with open(path, 'wb') as f:
+            f.writelines(lines[start:end])
+        shards.append((path, end - start))
+        start = end
+    return shards
+
+
+def merge_outputs(inputs, output):
+    """Merge the outputs of several shards into a single file.
+
+    If the outputs start with a Radiance header the header of the first input is
+    written to the merged output with the updated number of rows (NROWS) and the
+    headers of the other inputs are removed.
+
+    Compressed inputs are decompressed and the merged output is compressed if its
+    path ends with one of the extensions in the compression module (e.g. .gz).
+
+    Args:
+        inputs: A list of paths to the output files in the order of the shards.
+        output: Path to the merged output file.
+
+    Returns:
+        Path to the merged output file.
+    """
+    folder = os.path.dirname(output)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+
+    streams = [open_file(path, 'rb') for path in inputs]
+    try:
+        headers = [read_header(stream) for stream in streams]
+        with open_file(output, 'wb') as out_file:
+            header, header_bytes = headers[0]
+            if header_bytes:
+                if 'NROWS' in header:
+                    rows = sum(int(h[0].get('NROWS', 0)) for h in headers)
+                    header_bytes = set_header_value(header_bytes, 'NROWS', rows)
+                out_file.write(header_bytes)
+            for stream in streams:
+                shutil.copyfileobj(stream, out_file, _CHUNK_SIZE)
+    finally:
+        for stream in streams:
+            stream.close()
+    return output
+
+
+def _copy_command(command):
+    """Get a shallow copy of a command and the commands that it pipes to."""
+    new_command = command.__class__.__new__(command.__class__)
+    for cls in command.__class__.__mro__:
+        for slot in getattr(cls, '__slots__', ()):
+            try:
+                value = getattr(command, slot)
+            except AttributeError:
+                continue
+            object.__setattr__(new_command, slot, value)
+    if command.pipe_to is not None:
+        pipe_to = _copy_command(command.pipe_to)
+        object.__setattr__(new_command, '_pipe_to_command', pipe_to)
+    return new_command
+
+
+def _last_command(command):
+    """Get the last command in a pipeline."""
+    while command.pipe_to:
+        command = command.pipe_to
+    return command
+
+
+class ShardManifest(object):
+    """A record of the shards that are finished for a sharded run.
+
+    The manifest is tied to a key for the command. Loading a manifest with a different
+    key (e.g. after the options of the command are changed) returns an empty manifest.
+    Each finished shard is recorded with the checksum of its sensors and its output so
+    a shard is only considered finished if neither of them has changed.
+
+    Args:
+        path: Path to the manifest JSON file.
+        key: Key for the command.
+
+    Properties:
+        * path
+        * key
+        * shards
+    """
+
+    __slots__ = ('_path', '_key', '_shards', '_lock')
+
+    def __init__(self, path, key):
+        self._path = path
+        self._key = key
+        self._shards = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, key):
+        """Load a manifest from a file.
+
+        An empty manifest is returned if the file doesn't exist, it can't be read or it
+        is created for a different key.
+        """
+        manifest = cls(path, key)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return manifest
+        if data.get('key') == key:
+            manifest._shards = data.get('shards', {})
+        return manifest
+
+    @property
+    def path(self):
+        """Path to the manifest file."""
+        return self._path
+
+    @property
+    def key(self):
+        """Key for the command."""
+        return self._key
+
+    @property
+    def shards(self):
+        """A dictionary for the finished shards."""
+        return dict(self._shards)
+
+    def is_done(self, index, sensors, output):
+        """Check if a shard is finished and its output has not changed.
+
+        Args:
+            index: Index of the shard.
+            sensors: Path to the sensors file for the shard.
+            output: Path to the output file for the shard.
+        """
+        shard = self._shards.get(str(index))
+        if not shard or not os.path.isfile(output):
+            return False
+        return shard['sensors'] == _file_hash(sensors) and \
+            shard['output'] == _file_hash(output)
+
+    def mark_done(self, index, sensors, output):
+        """Record a finished shard and save the manifest.
+
+        Args:
+            index: Index of the shard.
+            sensors: Path to the sensors file for the shard.
+            output: Path to the output file for the shard.
+        """
+        shard = {'sensors': _file_hash(sensors), 'output': _file_hash(output)}
+        with self._lock:
+            self._shards[str(index)] = shard
+            self._save()
+
+    def _save(self):
+        """Write the manifest to a temporary file and move it to the path."""
+        temp_path = self._path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'key': self._key, 'shards': self._shards}, f, indent=2)
+        try:
+            os.replace(temp_path, self._path)
+        except AttributeError:  # python 2
+            if os.path.exists(self._path):
+                os.remove(self._path)
+            os.rename(temp_path, self._path)
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return 'ShardManifest: %d finished shards' % len(self._shards)
+
+
+class ShardedRun(object):
+    """Run a command with a sensor grid as several shards.
+
+    The command should have sensors and output (e.g. Rtrace or Rcontrib). If the
+    command pipes its output to other commands (e.g. rtrace | rcalc) the output of the
+    last command is used.
+
+    Args:
+        command: A command with sensors. The command is not changed.
+        shards: Number of shards. By default it is set to the number of CPUs.
+        folder: A folder for the shard files relative to the working directory. By
+            default it is a folder next to the output file.
+
+    Properties:
+        * command
+        * shards
+        * folder
+        * output
+    """
+
+    __slots__ = ('_command', '_shards', '_folder')
+
+    def __init__(self, command, shards=None, folder=None):
+        if not hasattr(command, 'sensors'):
+            raise ValueError(
+                '%s does not have sensors and cannot be sharded.' % command.command
+            )
+        if not command.sensors:
+            raise ValueError(
+                'Sensors must be set for %s to be sharded.' % command.command
+            )
+        if not _last_command(command).output:
+            raise ValueError(
+                'Output must be set for %s to be sharded.' % command.command
+            )
+        if isinstance(command.options, RcontribOptions) and command.options.o.is_set:
+            raise ValueError(
+                'rcontrib with -o output files cannot be sharded. Use the output '
+                'property instead.'
+            )
+        self._command = command
+        self._shards = int(shards or multiprocessing.cpu_count())
+        assert self._shards > 0, \
+            'Number of shards must be larger than 0. Got %d.' % self._shards
+        if folder is None:
+            output = self.output
+            folder = os.path.join(
+                os.path.dirname(output), '.%s.shards' % os.path.basename(output)
+            )
+        self._folder = folder
+
+    @property
+    def command(self):
+        """The command for this run."""
+        return self._command
+
+    @property
+    def shards(self):
+        """Number of shards."""
+        return self._shards
+
+    @property
+    def folder(self):
+        """Folder for the shard files."""
+        return self._folder
+
+    @property
+    def output(self):
+        """Path to the merged output file."""
+        return _last_command(self._command).output
+
+    def shard_commands(self, cwd=None):
+        """Split the sensors and create a command for each shard.
+
+        Args:
+            cwd: Working directory for the command (Default: None).
+
+        Returns:
+            A list of commands - one for each shard.
+        """
+        shards = split_sensors(
+            _file_path(self._command.sensors, cwd), self._shards,
+            _file_path(self._folder, cwd)
+        )
+        commands = []
+        for index in range(len(shards)):
+            command = _copy_command(self._command)
+            command.sensors = os.path.join(self._folder, 'shard_%04d.pts' % index)
+            _last_command(command).output = \
+                os.path.join(self._folder, 'shard_%04d.out' % index)
+            commands.append(command)
+        return commands
+
+    def key(self):
+        """Get the key for the manifest of this run.
+
+        The key is created from the canonical command string which includes the
+        command options. Changing the options invalidates the finished shards.
+        """
+        return hashlib.sha256(
+            self._command.to_radiance().encode('utf-8')
+        ).hexdigest()
+
+    def run(self, env=None, cwd=None, workers=None, shell=True, timeout=None,
+            cancel=None, clean=True, resume=True):
+        """Run all the shards and merge the outputs.
+
+        Args:
+            env: Environmental variables for the commands (default: None).
+            cwd: Working directory for the commands (Default: '.').
+            workers: Maximum number of shards that can run at the same time. By
+                default it is set to the number of CPUs.
+            shell: Set to False to run the commands without a shell (Default: True).
+            timeout: Maximum time in seconds for each shard to run (Default: None).
+            cancel: An optional CancelToken to kill the running shards.
+            clean: Set to False to keep the shard files after the outputs are merged
+                (Default: True).
+            resume: Set to False to run all the shards even if they are recorded as
+                finished in the manifest from an earlier run (Default: True).
+
+        Returns:
+            A list of BatchResult objects - one for each shard. The status for the
+            shards that are finished in an earlier run is up-to-date. The outputs are
+            merged only if all the shards finish successfully.
+        """
+        commands = self.shard_commands(cwd)
+        manifest_file = os.path.join(_file_path(self._folder, cwd), 'manifest.json')
+        if resume:
+            manifest = ShardManifest.load(manifest_file, self.key())
+        else:
+            manifest = ShardManifest(manifest_file, self.key())
+        files = [
+            (_file_path(command.sensors, cwd),
+             _file_path(_last_command(command).output, cwd))
+            for command in commands
+        ]
+
+        results = []
+        pending = []
+        for index, command in enumerate(commands):
+            if manifest.is_done(index, *files[index]):
+                result = BatchResult(command)
+                result.status = 'up-to-date'
+                results.append(result)
+            else:
+                results.append(None)
+                pending.append(index)
+
+        def _record(count, result):
+            if result.success:
+                index = pending[count]
+                manifest.mark_done(index, *files[index])
+
+        batch = CommandBatch([commands[i] for i in pending], workers=workers)
+        batch_results = batch.run(
+            env, cwd, shell=shell, timeout=timeout, cancel=cancel, callback=_record
+        )
+        for index, result in zip(pending, batch_results):
+            results[index] = result
+
+        if all(result.status in ('success', 'up-to-date') for result in results):
+            merge_outputs(
+                [_file_path(_last_command(command).output, cwd) for command in commands],
+                _file_path(self.output, cwd)
+            )
+            if clean:
+                shutil.rmtree(_file_path(self._folder, cwd))
+        return results
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return 'ShardedRun: %s - %d shards' % (self._command.command, self._shards)
@@ -0,0 +1,294 @@
+"""Sinks for the outputs of Radiance commands.
+
+A sink receives the STDOUT and STDERR of a running command. The outputs are read from
+the command in large binary chunks and each chunk is passed to the write method of the
+sink. The chunks always end at a line break (except for the last chunk of a stream
+or a very long line) so the outputs from STDOUT and STDERR are not mixed in the middle
+of a line.
+
+Example:
+
+```
+# keep the last 64 KB of the output for error reporting
+tail = RingBufferSink(64 * 1024)
+rcontrib.run(sink=tail)
+print(tail.text)
+
+# send the output to a logger
+rtrace.run(sink=LoggerSink(logging.getLogger('radiance')))
+```
+"""
+import sys
+import logging
+import threading
+
+
+class Sink(object):
+    """Base class for command output sinks.
+
+    Subclasses should implement the _write method. Calls to _write are serialized with
+    a lock so the subclasses don't need to worry about STDOUT and STDERR being read
+    from different threads.
+
+    Properties:
+        * lines
+    """
+
+    __slots__ = ('_lock',)
+    # set to True for sinks that need to receive one line at a time
+    lines = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def write(self, data):
+        """Write a chunk of the command output to the sink.
+
+        Args:
+            data: Command output as bytes.
+        """
+        with self._lock:
+            self._write(data)
+
+    def _write(self, data):
+        raise NotImplementedError(
+            '_write method must be implemented by %s.' % self.__class__.__name__
+        )
+
+    def flush(self):
+        """Flush the sink. It is called when the command is finished."""
+        pass
+
+    def close(self):
+        """Close the sink."""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return self.__class__.__name__
+
+
+class DiscardSink(Sink):
+    """A sink that ignores the outputs."""
+
+    __slots__ = ()
+
+    def write(self, data):
+        pass
+
+    def _write(self, data):
+        pass
+
+
+class PrintSink(Sink):
+    """A sink that prints the outputs to the standard output of this process.
+
+    This is the default sink for running commands.
+
+    Args:
+        stream: An optional text stream. By default the outputs are written to
+            sys.stdout.
+    """
+
+    __slots__ = ('stream',)
+
+    def __init__(self, stream=None):
+        Sink.__init__(self)
+        self.stream = stream
+
+    def _write(self, data):
+        stream = self.stream or sys.stdout
+        stream.write(_decode(data))
+
+    def flush(self):
+        stream = self.stream or sys.stdout
+        try:
+            stream.flush()
+        except (AttributeError, ValueError):
+            pass
+
+
+class CallbackSink(Sink):
+    """A sink that calls a function for the outputs.
+
+    Args:
+        callback: A function that receives the outputs as strings.
+        lines: Set to False to call the function for each chunk of the output instead
+            of each line (Default: True).
+    """
+
+    __slots__ = ('callback', 'lines')
+
+    def __init__(self, callback, lines=True):
+        Sink.__init__(self)
+        self.callback = callback
+        self.lines = lines
+
+    def _write(self, data):
+        self.callback(_decode(data))
+
+    def __repr__(self):
+        return 'CallbackSink: %s' % getattr(self.callback, '__name__', self.callback)
+
+
+class LoggerSink(Sink):
+    """A sink that writes each line of the outputs to a logger.
+
+    Args:
+        logger: A logging.Logger. By default the logger for this module is used.
+        level: Logging level for the messages (Default: logging.INFO).
+    """
+
+    __slots__ = ('logger', 'level')
+    lines = True
+
+    def __init__(self, logger=None, level=logging.INFO):
+        Sink.__init__(self)
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = level
+
+    def _write(self, data):
+        self.logger.log(self.level, _decode(data).rstrip('\r\n'))
+
+    def __repr__(self):
+        return 'LoggerSink: %s' % self.logger.name
+
+
+class FileSink(Sink):
+    """A sink that writes the outputs to a file.
+
+    The outputs are written as bytes without decoding. Close the sink or use it as a
+    context manager to close the file.
+
+    Args:
+        path: Path to a file or an open file object in binary mode.
+        mode: File mode for opening the file. Use 'ab' to append the outputs to an
+            existing file (Default: 'wb').
+    """
+
+    __slots__ = ('_file', '_owner', 'path')
+
+    def __init__(self, path, mode='wb'):
+        Sink.__init__(self)
+        if hasattr(path, 'write'):
+            self._file = path
+            self._owner = False
+            self.path = getattr(path, 'name', None)
+        else:
+            self._file = open(path, mode)
+            self._owner = True
+            self.path = path
+
+    def _write(self, data):
+        self._file.write(data)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        if self._owner:
+            self._file.close()
+
+    def __repr__(self):
+        return 'FileSink: %s' % self.path
+
+
+class RingBufferSink(Sink):
+    """A sink that keeps the last part of the outputs in memory.
+
+    Args:
+        size: Maximum number of bytes to keep (Default: 65536).
+
+    Properties:
+        * size
+        * data
+        * text
+    """
+
+    __slots__ = ('_size', '_chunks', '_length')
+
+    def __init__(self, size=65536):
+        Sink.__init__(self)
+        assert size > 0, 'Size of the RingBufferSink must be larger than 0.'
+        self._size = int(size)
+        self._chunks = []
+        self._length = 0
+
+    @property
+    def size(self):
+        """Maximum number of bytes to keep."""
+        return self._size
+
+    @property
+    def data(self):
+        """The last part of the outputs as bytes."""
+        with self._lock:
+            data = b''.join(self._chunks)
+        return data[-self._size:]
+
+    @property
+    def text(self):
+        """The last part of the outputs as a string."""
+        return _decode(self.data)
+
+    def _write(self, data):
+        self._chunks.append(data)
+        self._length += len(data)
+        # drop the chunks that are fully out of the buffer
+        while self._length - len(self._chunks[0]) >= self._size:
+            self._length -= len(self._chunks.pop(0))
+
+    def clear(self):
+        """Remove all the data from the buffer."""
+        with self._lock:
+            self._chunks = []
+            self._length = 0
+
+    def __len__(self):
+        return min(self._length, self._size)
+
+    def __repr__(self):
+        return 'RingBufferSink: %d/%d bytes' % (len(self), self._size)
+
+
+def to_sink(value):
+    """Get a Sink from an input value.
+
+    Args:
+        value: A Sink, a function that receives the outputs one line at a time, a
+            logging.Logger or None. None returns a PrintSink.
+
+    Returns:
+        A Sink.
+    """
+    if value is None:
+        return PrintSink()
+    if isinstance(value, Sink):
+        return value
+    if isinstance(value, logging.Logger):
+        return LoggerSink(value)
+    if callable(value):
+        return CallbackSink(value)
+    raise ValueError(
+        'Expected a Sink, a function or a logging.Logger for sink not {}'.format(
+            type(value)
+        )
+    )
+
+
+def _decode(data):
+    """Decode command output to a string."""
+    try:
+        return data.decode('utf-8', 'replace')
+    except AttributeError:
+        # already a string
+        return data
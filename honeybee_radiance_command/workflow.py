@@ -0,0 +1,358 @@
+"""Run multi-stage Radiance recipes as a dependency graph.
+
+Each node of a workflow is a command with its input and output files. A node depends on
+the nodes that write its input files. The workflow runs the nodes in topological order
+and the nodes that don't depend on each other run in parallel.
+
+Example:
+
+```
+workflow = Workflow()
+workflow.add(view_mtx, inputs=['scene.oct', 'view.pts'], outputs=['view.vmx'])
+workflow.add(daylight_mtx, inputs=['scene.oct', 'sky.rad'], outputs=['daylight.dmx'])
+workflow.add(
+    dctimestep, inputs=['view.vmx', 'window.xml', 'daylight.dmx', 'sky.smx'],
+    outputs=['results.ill']
+)
+# view and daylight matrices are calculated at the same time
+results = workflow.run(cwd='./model', workers=8)
+```
+"""
+import os
+import threading
+import multiprocessing
+
+from ._command import Command
+from ._command_util import _file_path
+from ._exception import ReturnCodeError
+from .batch import BatchResult
+from .environment import RadianceEnvironment
+
+
+class WorkflowNode(object):
+    """A command in a Workflow.
+
+    Args:
+        name: A unique name for the node.
+        command: A Radiance command.
+        inputs: A list of input files for the command.
+        outputs: A list of output files for the command.
+        depends_on: A list of names for the nodes that should finish before this node
+            starts in addition to the nodes that write the input files.
+        cores: Number of CPU cores that the command uses (e.g. 4 for rcontrib -n 4).
+        env: Environmental variables for this command.
+
+    Properties:
+        * name
+        * command
+        * inputs
+        * outputs
+        * depends_on
+        * cores
+        * env
+    """
+
+    __slots__ = ('name', 'command', 'inputs', 'outputs', 'depends_on', 'cores', 'env')
+
+    def __init__(self, name, command, inputs=None, outputs=None, depends_on=None,
+                 cores=1, env=None):
+        self.name = name
+        self.command = command
+        self.inputs = list(inputs or [])
+        self.outputs = list(outputs or [])
+        self.depends_on = list(depends_on or [])
+        assert cores > 0, 'Number of cores must be larger than 0. Got %d.' % cores
+        self.cores = int(cores)
+        self.env = env
+
+    def is_fresh(self, cwd=None):
+        """Check if all the outputs of this node are newer than its inputs.
+
+        A node without outputs is never fresh.
+        """
+        if not self.outputs:
+            return False
+        output_times = []
+        for output in self.outputs:
+            path = _file_path(output, cwd)
+            if not os.path.isfile(path):
+                return False
+            output_times.append(os.path.getmtime(path))
+        input_times = []
+        for inp in self.inputs:
+            path = _file_path(inp, cwd)
+            if not os.path.exists(path):
+                # it will be created by another node
+                return False
+            input_times.append(os.path.getmtime(path))
+        return not input_times or min(output_times) >= max(input_times)
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return 'WorkflowNode: %s' % self.name
+
+
+class Workflow(object):
+    """A dependency graph of Radiance commands.
+
+    Args:
+        nodes: An optional list of WorkflowNode objects.
+
+    Properties:
+        * nodes
+    """
+
+    __slots__ = ('_nodes',)
+
+    def __init__(self, nodes=None):
+        self._nodes = []
+        for node in nodes or []:
+            self.add_node(node)
+
+    @property
+    def nodes(self):
+        """List of nodes in the order that they are added."""
+        return list(self._nodes)
+
+    def add(self, command, inputs=None, outputs=None, name=None, depends_on=None,
+            cores=1, env=None):
+        """Add a command to the workflow.
+
+        Args:
+            command: A Radiance command.
+            inputs: A list of input files for the command. The paths are relative to
+                the working directory of the workflow.
+            outputs: A list of output files for the command. By default it is the
+                output of the command if it is redirected to a file.
+            name: A unique name for the node. By default the name is created from the
+                command name and the number of nodes.
+            depends_on: A list of names for the nodes that should finish before this
+                command starts in addition to the nodes that write the input files.
+            cores: Number of CPU cores that the command uses (Default: 1).
+            env: Environmental variables for this command. These values are added to
+                the environmental variables that are passed to the run method.
+
+        Returns:
+            The WorkflowNode for the command.
+        """
+        if not isinstance(command, Command):
+            raise ValueError(
+                'Expected a Radiance Command not {}'.format(type(command))
+            )
+        if outputs is None:
+            last_command = command
+            while last_command.pipe_to:
+                last_command = last_command.pipe_to
+            outputs = [last_command.output] if last_command.output else []
+        name = name or '%s_%d' % (command.command, len(self._nodes))
+        node = WorkflowNode(name, command, inputs, outputs, depends_on, cores, env)
+        self.add_node(node)
+        return node
+
+    def add_node(self, node):
+        """Add a WorkflowNode to the workflow."""
+        assert isinstance(node, WorkflowNode), \
+            'Expected a WorkflowNode not {}'.format(type(node))
+        if node.name in set(n.name for n in self._nodes):
+            raise ValueError('A node with the name %s already exists.' % node.name)
+        self._nodes.append(node)
+
+    def dependencies(self):
+        """Get the dependencies for each node.
+
+        Returns:
+            A dictionary with the name of each node as key and the list of the names
+            of the nodes that it depends on as value.
+        """
+        writers = {}
+        for node in self._nodes:
+            for output in node.outputs:
+                output = os.path.normpath(output)
+                if output in writers:
+                    raise ValueError(
+                        '%s is an output for both %s and %s.' % (
+                            output, writers[output], node.name
+                        )
+                    )
+                writers[output] = node.name
+
+        names = set(node.name for node in self._nodes)
+        dependencies = {}
+        for node in self._nodes:
+            deps = []
+            for dep in node.depends_on:
+                if dep not in names:
+                    raise ValueError(
+                        'Unknown node in depends_on for %s: %s' % (node.name, dep)
+                    )
+                deps.append(dep)
+            for inp in node.inputs:
+                writer = writers.get(os.path.normpath(inp))
+                if writer is not None and writer != node.name:
+                    deps.append(writer)
+            dependencies[node.name] = sorted(set(deps), key=deps.index)
+        return dependencies
+
+    def sort(self):
+        """Get the nodes in topological order.
+
+        A ValueError is raised if there is a cycle in the graph.
+        """
+        dependencies = self.dependencies()
+        nodes = dict((node.name, node) for node in self._nodes)
+        remaining = dict((name, set(deps)) for name, deps in dependencies.items())
+        ordered = []
+        while remaining:
+            ready = [node.name for node in self._nodes
+                     if node.name in remaining and not remaining[node.name]]
+            if not ready:
+                raise ValueError(
+                    'Workflow has a cycle between these nodes: %s' %
+                    ', '.join(sorted(remaining))
+                )
+            for name in ready:
+                ordered.append(nodes[name])
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return ordered
+
+    def run(self, env=None, cwd=None, workers=None, shell=True, force=False,
+            fail_fast=False, timeout=None, cancel=None):
+        """Run the workflow.
+
+        The nodes whose outputs are newer than their inputs are not executed and are
+        marked as up-to-date. If a node fails all the nodes that depend on it are
+        skipped. The other branches of the graph continue to run unless fail_fast is
+        set to True.
+
+        Args:
+            env: Environmental variables for all the commands. It can also be a
+                RadianceEnvironment (default: None).
+            cwd: Working directory for all the commands (Default: '.').
+            workers: Number of CPU cores that can be used at the same time. Each node
+                uses as many cores as its cores value. By default it is set to the
+                number of CPUs.
+            shell: Set to False to run the commands without a shell (Default: True).
+            force: Set to True to run all the nodes even if they are up-to-date
+                (Default: False).
+            fail_fast: Set to True to stop starting new commands as soon as one
+                command fails (Default: False).
+            timeout: Maximum time in seconds for each command to run (Default: None).
+            cancel: An optional CancelToken to kill the running commands.
+
+        Returns:
+            A dictionary of BatchResult objects for each node name. The status for
+            each result is one of success, failed, up-to-date or skipped. If env is a
+            RadianceEnvironment a ValueError is raised before any command starts if
+            the executable for a command is not found.
+        """
+        ordered = self.sort()
+        if isinstance(env, RadianceEnvironment):
+            env.validate([node.command for node in ordered])
+        dependencies = self.dependencies()
+        dependents = dict((node.name, []) for node in ordered)
+        for name, deps in dependencies.items():
+            for dep in deps:
+                dependents[dep].append(name)
+        budget = int(workers or multiprocessing.cpu_count())
+        assert budget > 0, 'Number of workers must be larger than 0. Got %d.' % budget
+
+        results = dict((node.name, BatchResult(node.command)) for node in ordered)
+        waiting = dict((name, len(deps)) for name, deps in dependencies.items())
+        ready = [node for node in ordered if waiting[node.name] == 0]
+        condition = threading.Condition()
+        state = {'cores': 0, 'running': 0, 'stop': False}
+
+        def _skip(name):
+            # skip all the nodes that depend on a failed node
+            for child in dependents[name]:
+                if results[child].status == 'skipped' and waiting[child] >= 0:
+                    waiting[child] = -1
+                    _skip(child)
+
+        def _finish(node, status):
+            with condition:
+                results[node.name].status = status
+                state['cores'] -= node.cores
+                state['running'] -= 1
+                if status == 'failed':
+                    _skip(node.name)
+                    if fail_fast:
+                        state['stop'] = True
+                else:
+                    for child in dependents[node.name]:
+                        if waiting[child] > 0:
+                            waiting[child] -= 1
+                            if waiting[child] == 0:
+                                ready.append(nodes[child])
+                condition.notify_all()
+
+        def _run(node):
+            result = results[node.name]
+            output = []
+            try:
+                # any error must mark the node as failed or the loop below waits for it
+                # forever
+                if not force and node.is_fresh(cwd):
+                    _finish(node, 'up-to-date')
+                    return
+                if isinstance(env, RadianceEnvironment) and node.env:
+                    run_env = env.extend(node.env)
+                elif env and node.env:
+                    run_env = dict(env)
+                    run_env.update(node.env)
+                else:
+                    run_env = node.env or env
+                result.result = node.command.run(
+                    run_env, cwd, shell=shell, sink=output.append, timeout=timeout,
+                    cancel=cancel
+                )
+            except Exception as e:
+                result.error = e
+                if isinstance(e, ReturnCodeError):
+                    result.return_code = e.return_code
+                    result.result = e.result
+                result.output = ''.join(output)
+                _finish(node, 'failed')
+            else:
+                result.return_code = result.result.return_code
+                result.output = ''.join(output)
+                _finish(node, 'success')
+
+        nodes = dict((node.name, node) for node in ordered)
+        threads = []
+        with condition:
+            while True:
+                cancelled = cancel is not None and cancel.cancelled
+                if state['stop'] or cancelled or not ready:
+                    if state['running'] == 0:
+                        break
+                    condition.wait()
+                    continue
+                node = ready[0]
+                # a node that needs more cores than the budget runs on its own
+                if state['running'] and state['cores'] + node.cores > budget:
+                    condition.wait()
+                    continue
+                ready.pop(0)
+                state['cores'] += node.cores
+                state['running'] += 1
+                thread = threading.Thread(target=_run, args=(node,))
+                thread.daemon = True
+                thread.start()
+                threads.append(thread)
+        for thread in threads:
+            thread.join()
+        return results
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def ToString(self):
+        return self.__repr__()
+
+    def __repr__(self):
+        return 'Workflow: %d nodes' % len(self)
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from honeybee_radiance_command._command import Command
+from honeybee_radiance_command.batch import CommandBatch
+from honeybee_radiance_command.sink import RingBufferSink
+
+
+posix_only = pytest.mark.skipif(os.name != 'posix', reason='requires posix tools')
+
+
+class Echo(Command):
+    pass
+
+
+class Ls(Command):
+    pass
+
+
+def test_defaults():
+    batch = CommandBatch(workers=2)
+    assert len(batch) == 0
+    assert batch.workers == 2
+    assert not batch.fail_fast
+    assert batch.run() == []
+
+    with pytest.raises(ValueError):
+        batch.add('echo')
+
+
+@posix_only
+def test_run(tmpdir):
+    folders = [str(tmpdir.mkdir('folder_%d' % count)) for count in range(6)]
+    batch = CommandBatch(workers=3)
+    for folder in folders:
+        batch.add(Echo(output='echo.txt'), cwd=folder)
+    batch.add(Echo())
+    results = batch.run()
+    assert len(results) == 7
+    assert all(result.success for result in results)
+    assert [result.return_code for result in results] == [0] * 7
+    assert results[-1].output == '\n'
+    for folder in folders:
+        assert os.path.isfile(os.path.join(folder, 'echo.txt'))
+
+
+@posix_only
+def test_run_continue_on_error(tmpdir):
+    folder = str(tmpdir)
+    failing = Ls()
+    failing.output = 'not-a-folder/ls.txt'
+    batch = CommandBatch([Echo(), failing, Echo()], workers=1)
+    results = batch.run(cwd=folder)
+    assert [result.status for result in results] == ['success', 'failed', 'success']
+    assert results[1].return_code != 0
+    assert results[1].error is not None
+
+
+@posix_only
+def test_run_fail_fast(tmpdir):
+    folder = str(tmpdir)
+    failing = Ls()
+    failing.output = 'not-a-folder/ls.txt'
+    batch = CommandBatch([Echo(), failing, Echo()], workers=1, fail_fast=True)
+    results = batch.run(cwd=folder)
+    assert [result.status for result in results] == ['success', 'failed', 'skipped']
+
+
+@posix_only
+def test_run_callback_error():
+    def callback(index, result):
+        raise RuntimeError('callback failed for %d' % index)
+
+    batch = CommandBatch([Echo(), Echo(), Echo()], workers=1)
+    results = batch.run(callback=callback)
+    # the worker continues with the next commands
+    assert [result.status for result in results] == ['success'] * 3
+    assert all(isinstance(result.callback_error, RuntimeError) for result in results)
+    assert str(results[2].callback_error) == 'callback failed for 2'
+
+
+@posix_only
+def test_run_sink(tmpdir):
+    sink = RingBufferSink(1024)
+    batch = CommandBatch([Echo(), Echo(output='echo.txt')], workers=2)
+    results = batch.run(cwd=str(tmpdir), sink=sink)
+    assert all(result.success for result in results)
+    assert [result.output for result in results] == ['', '']
+    assert sink.text == '\n'
@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+from honeybee_radiance_command._command import Command
+from honeybee_radiance_command.cache import ResultCache, _input_files
+from honeybee_radiance_command._command_util import _process_command
+
+
+posix_only = pytest.mark.skipif(os.name != 'posix', reason='requires posix tools')
+
+
+class Cat(Command):
+    """Cat command to copy the input file to the output."""
+
+    __slots__ = ('input',)
+
+    def __init__(self, input=None, output=None):
+        Command.__init__(self, output=output)
+        self.input = input
+
+    def to_radiance(self, stdin_input=False):
+        return 'cat %s > %s' % (self.input, self.output)
+
+
+def test_input_files(tmpdir):
+    folder = str(tmpdir)
+    for name in ('scene.oct', 'grid.pts', 'sky.vec'):
+        with open(os.path.join(folder, name), 'w') as f:
+            f.write(name)
+    stages = _process_command(
+        'rtrace -h scene.oct missing.oct @opts.rad < grid.pts | '
+        'rmtxop "!dctimestep dc.mtx sky.vec" > results.ill'
+    )
+    assert _input_files(stages, folder) == ['grid.pts', 'scene.oct', 'sky.vec']
+
+
+@posix_only
+def test_cache_run(tmpdir):
+    folder = str(tmpdir)
+    cache = ResultCache(os.path.join(folder, 'cache'))
+    with open(os.path.join(folder, 'input.txt'), 'w') as f:
+        f.write('0 0 0\n')
+
+    cat = Cat('input.txt', 'output.txt')
+    key = cache.key(cat, cwd=folder)
+    result = cat.run(cwd=folder, cache=cache)
+    assert result == 0
+    assert not result.cached
+
+    # output is restored from the cache
+    os.remove(os.path.join(folder, 'output.txt'))
+    result = cat.run(cwd=folder, cache=cache)
+    assert result.cached
+    assert result.stages[0].return_code == 0
+    with open(os.path.join(folder, 'output.txt')) as f:
+        assert f.read() == '0 0 0\n'
+
+    # change the input file
+    with open(os.path.join(folder, 'input.txt'), 'w') as f:
+        f.write('1 1 1\n')
+    assert cache.key(cat, cwd=folder) != key
+    result = cat.run(cwd=folder, cache=cache)
+    assert not result.cached
+    with open(os.path.join(folder, 'output.txt')) as f:
+        assert f.read() == '1 1 1\n'
+
+    # change the output
+    cat.output = 'output_2.txt'
+    assert not cat.run(cwd=folder, cache=cache).cached
+
+    cache.clear()
+    assert not cat.run(cwd=folder, cache=cache).cached
+
+    with pytest.raises(ValueError):
+        cat.run(cwd=folder, cache=cache, capture='bytes')
+
+
+class Echo(Command):
+    """Echo command that only writes to stdout."""
+
+    __slots__ = ()
+
+    def to_radiance(self, stdin_input=False):
+        return 'echo 0 0 0'
+
+
+@posix_only
+def test_cache_run_stdout(tmpdir):
+    # commands without output files always run
+    folder = str(tmpdir)
+    cache = ResultCache(os.path.join(folder, 'cache'))
+    echo = Echo()
+    for _ in range(2):
+        output = []
+        result = echo.run(cwd=folder, cache=cache, sink=output.append)
+        assert not result.cached
+        assert output == ['0 0 0\n']
+    assert not os.listdir(os.path.join(folder, 'cache'))
+
+
+def test_cache_check(tmpdir):
+    with pytest.raises(AssertionError):
+        ResultCache(str(tmpdir), check='size')
+    assert ResultCache(str(tmpdir), check='mtime').check == 'mtime'
@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+
+import pytest
+
+from honeybee_radiance_command._command_util import run_command, run_pipeline
+from honeybee_radiance_command._exception import CommandTimeoutError, \
+    CommandCancelledError, ReturnCodeError
+from honeybee_radiance_command.batch import CommandBatch
+from honeybee_radiance_command.cancel import CancelToken
+from honeybee_radiance_command._command import Command
+
+
+posix_only = pytest.mark.skipif(os.name != 'posix', reason='requires posix tools')
+
+
+class Sleep(Command):
+
+    def to_radiance(self, stdin_input=False):
+        return 'sleep 10'
+
+
+def test_cancel_token():
+    token = CancelToken()
+    assert not token.cancelled
+    token.cancel()
+    assert token.cancelled
+    assert repr(token) == 'CancelToken: cancelled'
+
+
+@posix_only
+def test_run_command_timeout():
+    start = time.time()
+    # the child process of the shell keeps the stdout open and must be killed too
+    with pytest.raises(CommandTimeoutError) as error:
+        run_command('sleep 10 | cat', timeout=0.2)
+    assert time.time() - start < 5
+    assert error.value.timeout == 0.2
+    assert error.value.return_code != 0
+    assert isinstance(error.value, ReturnCodeError)
+
+
+@posix_only
+def test_run_pipeline_timeout():
+    start = time.time()
+    with pytest.raises(CommandTimeoutError):
+        run_pipeline('sleep 10 | cat', timeout=0.2)
+    assert time.time() - start < 5
+    # a command that finishes in time
+    assert run_pipeline('echo', timeout=10, sink=lambda line: None) == 0
+
+
+@posix_only
+def test_cancel():
+    token = CancelToken()
+    timer = threading.Timer(0.2, token.cancel)
+    timer.start()
+    start = time.time()
+    with pytest.raises(CommandCancelledError):
+        run_command('sleep 10', cancel=token)
+    assert time.time() - start < 5
+
+    # commands that start after cancel are killed right away
+    with pytest.raises(CommandCancelledError):
+        run_pipeline('sleep 10', cancel=token)
+
+
+@posix_only
+def test_batch_cancel():
+    token = CancelToken()
+    batch = CommandBatch([Sleep(), Sleep()], workers=1)
+    timer = threading.Timer(0.2, token.cancel)
+    timer.start()
+    results = batch.run(cancel=token)
+    assert [result.status for result in results] == ['failed', 'skipped']
@@ -0,0 +1,80 @@
+import asyncio
+import os
+
+import pytest
+
+from honeybee_radiance_command._command import Command
+
+
+posix_only = pytest.mark.skipif(os.name != 'posix', reason='requires posix tools')
+
+
+class Printf(Command):
+    __slots__ = ('_text',)
+
+    def __init__(self, text, output=None):
+        Command.__init__(self, output=output)
+        self._text = text
+
+    def to_radiance(self, stdin_input=False):
+        cmd = 'printf "%s"' % self._text
+        if self.pipe_to:
+            cmd = ' | '.join((cmd, self.pipe_to.to_radiance(stdin_input=True)))
+        elif self.output:
+            cmd = ' > '.join((cmd, self.output))
+        return cmd
+
+
+class Tr(Command):
+
+    def to_radiance(self, stdin_input=False):
+        cmd = 'tr a-z A-Z'
+        if self.output:
+            cmd = ' > '.join((cmd, self.output))
+        return cmd
+
+
+@posix_only
+def test_run_async_stream():
+    cmd = Printf('first line\\nsecond line\\n')
+    cmd.pipe_to = Tr()
+
+    async def _run():
+        run = await cmd.run_async()
+        lines = [line async for line in run.stdout]
+        rc = await run.wait()
+        return lines, rc
+
+    lines, rc = asyncio.run(_run())
+    assert rc == 0
+    assert lines == [b'FIRST LINE\n', b'SECOND LINE\n']
+
+
+@posix_only
+def test_run_async_many(tmpdir):
+    folder = str(tmpdir)
+    commands = [Printf('%d\\n' % count, output='output_%d.txt' % count)
+                for count in range(20)]
+
+    async def _run():
+        runs = [await cmd.run_async(cwd=folder) for cmd in commands]
+        return await asyncio.gather(*(run.wait() for run in runs))
+
+    assert asyncio.run(_run()) == [0] * 20
+    for count in range(20):
+        with open(os.path.join(folder, 'output_%d.txt' % count)) as outf:
+            assert outf.read() == '%d\n' % count
+
+
+@posix_only
+def test_run_async_failure():
+    from honeybee_radiance_command._command_async import run_async
+
+    async def _run():
+        run = await run_async('ls not-a-real-file')
+        stderr = [line async for line in run.stderr]
+        with pytest.raises(RuntimeError):
+            await run.wait()
+        return stderr
+
+    assert asyncio.run(_run())
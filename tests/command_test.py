@@ -30,3 +30,15 @@ def test_subclass():
 
     rtrace = Rtrace()
     assert rtrace.command == 'rtrace'
+
+
+def test_to_argv():
+    cmd_1 = Command()
+    cmd_2 = Command(output='folder with space/command_2.res')
+    cmd_1.pipe_to = cmd_2
+    stages = cmd_1.to_argv()
+    assert len(stages) == 2
+    assert stages[0]['argv'] == ['command']
+    assert stages[0]['stdout'] is None
+    assert stages[1]['argv'] == ['command']
+    assert stages[1]['stdout'] == 'folder with space/command_2.res'
@@ -0,0 +1,231 @@
+import os
+import sys
+import stat
+import time
+
+import pytest
+
+from honeybee_radiance_command._command_util import _process_command, run_pipeline, \
+    run_command, _remove_redirect
+from honeybee_radiance_command._command import Command
+
+
+posix_only = pytest.mark.skipif(os.name != 'posix', reason='requires posix tools')
+
+
+def test_process_command():
+    stages = _process_command(
+        "rtrace -h -ab 2 'scene folder/scene.oct' < grid.pts | "
+        "rcalc -e '$1=($1*0.265+$2*0.67+$3*0.065)*179' >> results.ill"
+    )
+    assert len(stages) == 2
+    assert stages[0]['argv'] == ['rtrace', '-h', '-ab', '2', 'scene folder/scene.oct']
+    assert stages[0]['stdin'] == 'grid.pts'
+    assert stages[0]['stdout'] is None
+    assert stages[1]['argv'] == ['rcalc', '-e', '$1=($1*0.265+$2*0.67+$3*0.065)*179']
+    assert stages[1]['stdin'] is None
+    assert stages[1]['stdout'] == 'results.ill'
+    assert stages[1]['mode'] == 'a'
+
+
+def test_remove_redirect():
+    assert _remove_redirect('rtrace -h scene.oct < grid.pts > results.ill.gz') == \
+        'rtrace -h scene.oct < grid.pts'
+    assert _remove_redirect('rcalc -e "$1=$1>0" >> results.ill') == \
+        'rcalc -e "$1=$1>0"'
+    assert _remove_redirect("rtrace scene.oct > out.dat | rcalc -e '$1=$1>0'") == \
+        "rtrace scene.oct > out.dat | rcalc -e '$1=$1>0'"
+    assert _remove_redirect('rtrace scene.oct') == 'rtrace scene.oct'
+
+
+def test_process_command_quoted_operators():
+    stages = _process_command('rmtxop \'!rmtxop a.mtx b.mtx\' \'*\' c.mtx>out.mtx')
+    assert len(stages) == 1
+    assert stages[0]['argv'] == ['rmtxop', '!rmtxop a.mtx b.mtx', '*', 'c.mtx']
+    assert stages[0]['stdout'] == 'out.mtx'
+    assert stages[0]['mode'] == 'w'
+
+
+def test_process_command_invalid():
+    with pytest.raises(ValueError):
+        _process_command('rtrace scene.oct > out.dat | rcalc')
+    with pytest.raises(ValueError):
+        _process_command('rtrace scene.oct | rcalc < input.dat')
+    with pytest.raises(ValueError):
+        _process_command('rtrace scene.oct >')
+    with pytest.raises(ValueError):
+        _process_command('rcalc -e "$1=$1')
+
+
+@posix_only
+def test_run_pipeline(tmpdir):
+    folder = str(tmpdir)
+    with open(os.path.join(folder, 'input file.txt'), 'w') as inf:
+        inf.write('radiance\n')
+    assert run_pipeline(
+        "cat 'input file.txt' | tr a-z A-Z > output.txt", cwd=folder) == 0
+    with open(os.path.join(folder, 'output.txt')) as outf:
+        assert outf.read() == 'RADIANCE\n'
+
+
+@posix_only
+def test_run_pipeline_failure():
+    with pytest.raises(RuntimeError):
+        run_pipeline('false | cat')
+
+
+@posix_only
+def test_run_without_shell(tmpdir):
+
+    class Echo(Command):
+        pass
+
+    output = os.path.join(str(tmpdir), 'echo.txt')
+    cmd = Echo(output=output)
+    assert cmd.run(shell=False) == 0
+    assert os.path.isfile(output)
+
+
+@posix_only
+def test_run_command_cwd_in_threads(tmpdir):
+    import threading
+
+    cur_dir = os.getcwd()
+    folders = []
+    for count in range(8):
+        folder = tmpdir.mkdir('folder_%d' % count)
+        folders.append(str(folder))
+
+    errors = []
+
+    def _run(count, folder):
+        try:
+            run_command('echo %d > output.txt' % count, cwd=folder)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [
+        threading.Thread(target=_run, args=(count, folder))
+        for count, folder in enumerate(folders)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert os.getcwd() == cur_dir
+    for count, folder in enumerate(folders):
+        with open(os.path.join(folder, 'output.txt')) as outf:
+            assert outf.read().strip() == str(count)
+
+
+@posix_only
+def test_run_pipeline_result():
+    from honeybee_radiance_command._exception import ReturnCodeError
+
+    output = []
+    result = run_pipeline('echo radiance | tr a-z A-Z', sink=output.append)
+    assert result == 0
+    assert output == ['RADIANCE\n']
+    assert len(result.stages) == 2
+    assert result.stages[0].command == 'echo radiance'
+    assert result.wall_time >= 0
+    if hasattr(os, 'wait4'):
+        assert result.cpu_time is not None
+        assert result.max_rss > 0
+
+    with pytest.raises(ReturnCodeError) as error:
+        run_pipeline('ls not-a-real-file', sink=output.append)
+    assert error.value.return_code != 0
+    assert 'not-a-real-file' in error.value.result.stderr
+
+
+@posix_only
+def test_run_command_result():
+
+    result = run_command('echo radiance 1>&2', sink=lambda line: None)
+    assert result == 0
+    assert result.stderr == 'radiance\n'
+    assert len(result.stages) == 1
+
+
+@posix_only
+def test_run_capture_bytes():
+    result = run_pipeline('printf "#?RADIANCE\\nNCOMP=1\\n\\n1 2\\n"', capture='bytes')
+    assert result.output == b'#?RADIANCE\nNCOMP=1\n\n1 2\n'
+    result = run_command('printf "1 2"', capture='bytes')
+    assert result.output == b'1 2'
+
+
+def test_run_capture_invalid():
+    with pytest.raises(ValueError):
+        run_pipeline('echo > out.txt', capture='bytes')
+    with pytest.raises(ValueError):
+        run_pipeline('echo', capture='text')
+
+
+@posix_only
+def test_run_capture_numpy():
+    pytest.importorskip('numpy')
+    result = run_pipeline('printf "#?RADIANCE\\nNCOMP=1\\n\\n1 2\\n"', capture='numpy')
+    assert result.output.shape == (2, 1, 1)
+
+
+# a stub rmtxop that writes four doubles without a header
+STUB_RMTXOP = '''#!%s
+import struct
+import sys
+
+getattr(sys.stdout, 'buffer', sys.stdout).write(struct.pack('=4d', 0, 1, 2, 3))
+'''
+
+
+@posix_only
+@pytest.mark.parametrize('shell', [True, False])
+def test_run_capture_numpy_headerless(tmpdir, shell):
+    pytest.importorskip('numpy')
+    path = str(tmpdir.join('rmtxop'))
+    with open(path, 'w') as f:
+        f.write(STUB_RMTXOP % sys.executable)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    command = 'rmtxop -fd -c 0.265 0.67 0.065 input.mtx'
+    run = run_command if shell else run_pipeline
+    result = run(command, env={'PATH': str(tmpdir)}, capture='numpy')
+    # the binary doubles are not loaded as text
+    assert result.output.shape == (4, 1, 1)
+    assert result.output.flatten().tolist() == [0, 1, 2, 3]
+
+
+nested_only = pytest.mark.skipif(
+    os.name != 'posix' or sys.version_info[0] < 3,
+    reason='requires posix tools and Python 3'
+)
+
+
+@nested_only
+@pytest.mark.parametrize('mode', ['pipe', 'buffer'])
+def test_run_pipeline_nested(mode):
+    command = 'cat \'!echo first\' \'!sh -c "sleep 0.5; echo second"\' ' \
+        '\'!sh -c "sleep 0.5; echo third"\''
+    start = time.time()
+    result = run_pipeline(command, capture='bytes', nested=mode)
+    assert result.output == b'first\nsecond\nthird\n'
+    # the nested commands run at the same time
+    assert time.time() - start < 0.9
+    assert len(result.stages) == 4
+    assert result.stages[0].command == 'echo first'
+    assert result.stages[-1].command.startswith('cat !echo first')
+
+
+@nested_only
+def test_run_pipeline_nested_failure():
+    from honeybee_radiance_command._exception import ReturnCodeError
+
+    with pytest.raises(ReturnCodeError):
+        run_pipeline('cat \'!ls not-a-real-file\'', sink=lambda line: None,
+                     nested='pipe')
+    with pytest.raises(ValueError):
+        run_pipeline('cat \'!echo a > a.txt\'', nested='pipe')
+    with pytest.raises(AssertionError):
+        run_pipeline('cat \'!echo a\'', nested='fifo')
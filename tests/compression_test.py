@@ -0,0 +1,130 @@
+import os
+import sys
+import gzip
+
+import pytest
+
+from honeybee_radiance_command.compression import compression, detect_compression, \
+    open_file
+from honeybee_radiance_command._command_util import run_pipeline, run_command
+from honeybee_radiance_command._command import Command
+from honeybee_radiance_command.shard import merge_outputs
+
+posix_only = pytest.mark.skipif(os.name != 'posix', reason='requires posix tools')
+
+
+class Echo(Command):
+    __slots__ = ('text',)
+
+    def __init__(self, text, output=None):
+        Command.__init__(self, output=output)
+        self.text = text
+
+    def to_radiance(self, stdin_input=False):
+        cmd = 'echo %s' % self.text
+        if self.output:
+            cmd = '%s > %s' % (cmd, self.output)
+        return cmd
+
+
+def test_compression():
+    assert compression('results.mtx.gz') == 'gzip'
+    assert compression('results.MTX.GZ') == 'gzip'
+    assert compression('results.mtx.bz2') == 'bz2'
+    assert compression('results.mtx.xz') == 'xz'
+    assert compression('results.mtx.zst') == 'zstd'
+    assert compression('results.mtx') is None
+    assert compression(None) is None
+
+
+@pytest.mark.parametrize('ext', ['.gz', '.bz2', '.xz'])
+def test_open_file(tmpdir, ext):
+    if ext == '.xz' and sys.version_info[0] < 3:
+        pytest.skip('xz requires Python 3')
+    path = str(tmpdir.join('results.dat' + ext))
+    with open_file(path, 'wb') as f:
+        f.write(b'1 2 3\n')
+    with open_file(path, 'ab') as f:
+        f.write(b'4 5 6\n')
+    assert detect_compression(path) == compression(path)
+    with open_file(path, 'rb') as f:
+        assert f.read() == b'1 2 3\n4 5 6\n'
+    with open_file(path, 'rt') as f:
+        assert f.readlines() == ['1 2 3\n', '4 5 6\n']
+
+
+def test_open_file_detect(tmpdir):
+    # compressed files are read even without the extension
+    path = str(tmpdir.join('results.dat'))
+    with gzip.open(path, 'wb') as f:
+        f.write(b'1 2 3\n')
+    assert detect_compression(path) == 'gzip'
+    with open_file(path) as f:
+        assert f.read() == b'1 2 3\n'
+    with pytest.raises(AssertionError):
+        open_file(path, 'x')
+
+
+@posix_only
+def test_run_compressed_output(tmpdir):
+    path = str(tmpdir.join('results.dat.gz'))
+    result = run_pipeline('printf "1 2 3\\n" > %s' % path)
+    assert result == 0
+    assert detect_compression(path) == 'gzip'
+    run_pipeline('printf "4 5 6\\n" >> %s' % path)
+    with open_file(path) as f:
+        assert f.read() == b'1 2 3\n4 5 6\n'
+
+    path = str(tmpdir.join('results.dat.bz2'))
+    run_command('echo 1 2 3', output=path)
+    with open_file(path) as f:
+        assert f.read() == b'1 2 3\n'
+    with pytest.raises(ValueError):
+        run_command('echo 1 2 3', output=path, capture='bytes')
+
+
+@posix_only
+@pytest.mark.parametrize('shell', [True, False])
+def test_command_compressed_output(tmpdir, shell):
+    command = Echo('1 2 3', output='results.dat.gz')
+    command.run(cwd=str(tmpdir), shell=shell)
+    path = str(tmpdir.join('results.dat.gz'))
+    assert detect_compression(path) == 'gzip'
+    with open_file(path) as f:
+        assert f.read() == b'1 2 3\n'
+    assert command.output == 'results.dat.gz'
+
+
+class RecordEcho(Echo):
+    __slots__ = ('outputs',)
+
+    def __init__(self, text, output=None):
+        Echo.__init__(self, text, output)
+        self.outputs = []
+
+    def to_radiance(self, stdin_input=False):
+        self.outputs.append(self.output)
+        return Echo.to_radiance(self, stdin_input)
+
+
+@posix_only
+def test_command_compressed_output_not_changed(tmpdir):
+    # other threads can render the same command while it is running
+    command = RecordEcho('1 2 3', output='results.dat.gz')
+    command.run(cwd=str(tmpdir))
+    assert command.outputs == ['results.dat.gz']
+    with open_file(str(tmpdir.join('results.dat.gz'))) as f:
+        assert f.read() == b'1 2 3\n'
+
+
+def test_merge_compressed_outputs(tmpdir):
+    inputs = []
+    for count in range(2):
+        path = str(tmpdir.join('shard_%d.dat' % count))
+        with open(path, 'wb') as f:
+            f.write(b'#?RADIANCE\nNROWS=1\n\n%d\n' % count)
+        inputs.append(path)
+    output = str(tmpdir.join('results.dat.gz'))
+    merge_outputs(inputs, output)
+    with open_file(output) as f:
+        assert f.read() == b'#?RADIANCE\nNROWS=2\n\n0\n1\n'
@@ -0,0 +1,6 @@
+import sys
+
+# tests that use async/await syntax can't be collected in Python 2
+collect_ignore = []
+if sys.version_info < (3,):
+    collect_ignore.append('command_async_test.py')
@@ -1,3 +1,7 @@
+import os
+
+import pytest
+
 import honeybee_radiance_command.cutil as cutil
 
 
@@ -31,4 +35,62 @@ def test_import_view_from_string():
     assert options['y'] == '300'
     assert options['vs'] == '-0.500'
     assert options['vl'] == '-0.500'
-    assert options['vo'] == '100.000'
\ No newline at end of file
+    assert options['vo'] == '100.000'
+
+
+def test_tokenize_options():
+    """Test splitting options into (option, value) pairs."""
+    options = cutil.tokenize_radiance_options(
+        '-ab 4 -I+ -ld- +u -h -faf -vs -0.5 -e "-1 2" -x 300 -ab 5'
+    )
+    assert options == [
+        ('ab', 4), ('I', True), ('ld', False), ('u', True), ('h', ''), ('faf', ''),
+        ('vs', -0.5), ('e', '-1 2'), ('x', 300), ('ab', 5)
+    ]
+    assert isinstance(options[0][1], int) and isinstance(options[6][1], float)
+    # quoted values and values that are not numbers are strings
+    assert cutil.tokenize_radiance_options("-e '4' -vp 0 0.5 1e1 -af a.amb") == \
+        [('e', '4'), ('vp', [0, 0.5, 10.0]), ('af', 'a.amb')]
+    # the string values are still available
+    options = cutil.tokenize_radiance_options('-ab 4 -I+ -ld- +u', typed=False)
+    assert options == [('ab', '4'), ('I', '+'), ('ld', '-'), ('u', '+')]
+    # the last value is used in parse_radiance_options
+    assert cutil.parse_radiance_options('-ab 4 -ab 5')['ab'] == '5'
+    # hyphens inside the values are not options
+    options = cutil.parse_radiance_options("-af 'my scene-1.amb' -ai a-b")
+    assert options['af'] == 'my scene-1.amb'
+    assert options['ai'] == 'a-b'
+
+
+def _write(folder, name, content):
+    with open(os.path.join(folder, name), 'w') as f:
+        f.write(content)
+
+
+def test_tokenize_options_include(tmpdir):
+    """Test @file includes in options."""
+    folder = str(tmpdir)
+    _write(folder, 'ambient.opt', '-ab 2 -ad 1024\n-I')
+    _write(folder, 'scene.opt', '-lw 0.001 @ambient.opt')
+    options = cutil.parse_radiance_options('-aa 0.1 @scene.opt -ab 4', folder)
+    assert list(options.items()) == \
+        [('aa', '0.1'), ('lw', '0.001'), ('ab', '4'), ('ad', '1024'), ('I', '')]
+
+    _write(folder, 'loop.opt', '-ab 2 @loop.opt')
+    with pytest.raises(ValueError):
+        cutil.parse_radiance_options('@loop.opt', folder)
+    with pytest.raises(ValueError):
+        cutil.parse_radiance_options('@missing.opt', folder)
+
+
+def test_parse_options_batch():
+    """Test parsing several options strings."""
+    strings = ['-ab 2 -vp 0 0 1', '-ab 3', '-ab 2 -vp 0 0 1']
+    options = cutil.parse_radiance_options_batch(strings, typed=False)
+    assert [dict(o) for o in options] == \
+        [cutil.parse_radiance_options(string) for string in strings]
+    options = cutil.parse_radiance_options_batch(strings)
+    assert dict(options[0]) == {'ab': 2, 'vp': [0, 0, 1]}
+    # the repeated strings get their own values
+    options[0]['vp'].append(2)
+    assert options[2]['vp'] == [0, 0, 1]
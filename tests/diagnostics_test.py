@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from honeybee_radiance_command.diagnostics import parse_line, Diagnostic, \
+    Diagnostics, DiagnosticSink
+from honeybee_radiance_command.sink import RingBufferSink
+from honeybee_radiance_command.result import CommandResult
+from honeybee_radiance_command._command_util import run_pipeline, MAX_STDERR
+from honeybee_radiance_command._exception import ReturnCodeError
+
+posix_only = pytest.mark.skipif(os.name != 'posix', reason='requires posix tools')
+
+
+def test_parse_line():
+    assert parse_line('rtrace: warning - no light sources found\n') == \
+        ('rtrace', 'warning', 'no light sources found')
+    assert parse_line('/usr/local/bin/rcontrib: fatal - cannot open "scene.oct"') == \
+        ('rcontrib', 'fatal', 'cannot open "scene.oct"')
+    assert parse_line('rcontrib: 50% after 0.1 CPU hours') == \
+        ('rcontrib', 'info', '50% after 0.1 CPU hours')
+    assert parse_line('Segmentation fault') == (None, 'info', 'Segmentation fault')
+    # the program path on Windows
+    assert parse_line(r'C:\Radiance\bin\rtrace.exe: warning - no light sources found') \
+        == ('rtrace', 'warning', 'no light sources found')
+    assert parse_line(
+        r'C:\Program Files\Radiance\bin\rcontrib.EXE: fatal - cannot open "a\b.oct"'
+    ) == ('rcontrib', 'fatal', 'cannot open "a\\b.oct"')
+    # the paths in the messages are not part of the tool name
+    assert parse_line('rtrace: warning - bad file dir/x: y') == \
+        ('rtrace', 'warning', 'bad file dir/x: y')
+
+
+def test_diagnostics():
+    diagnostics = Diagnostics(max_records=2)
+    for _ in range(3):
+        diagnostics.add('rtrace: warning - ray tracing stack overflow')
+    assert diagnostics.add('\n') is None
+    diagnostics.add('rtrace: fatal - out of octree space')
+    assert diagnostics.add('rtrace: warning - missing modifier') is None
+    assert len(diagnostics) == 2
+    assert diagnostics.dropped == 1
+    assert diagnostics.count() == 4
+    assert diagnostics.count('warning') == 3
+    warning = diagnostics.warnings[0]
+    assert warning.count == 3
+    assert repr(warning) == \
+        'rtrace: warning - ray tracing stack overflow (repeated 3 times)'
+    assert diagnostics.errors[0].is_error
+
+    data = diagnostics.to_dict()
+    new_diagnostics = Diagnostics.from_dict(data)
+    assert new_diagnostics.to_dict() == data
+    assert Diagnostic('rtrace', 'info', 'done').to_radiance() == 'rtrace: done'
+
+
+def test_diagnostic_sink():
+    output = RingBufferSink()
+    sink = DiagnosticSink(output, max_repeats=2)
+    for _ in range(5):
+        sink.write(b'rtrace: warning - ray tracing stack overflow\n')
+    sink.write(b'rtrace: warning - no light sources found\n')
+    sink.flush()
+    assert output.text.splitlines() == [
+        'rtrace: warning - ray tracing stack overflow',
+        'rtrace: warning - ray tracing stack overflow',
+        'rtrace: warning - no light sources found',
+        'rtrace: warning - ray tracing stack overflow (repeated 5 times)'
+    ]
+    assert sink.diagnostics.count() == 6
+
+
+def test_result_diagnostics():
+    result = CommandResult('rtrace', [], 0)
+    assert len(result.diagnostics) == 0
+    result.diagnostics.add('rtrace: warning - no light sources found')
+    new_result = CommandResult.from_dict(result.to_dict())
+    assert new_result.diagnostics.warnings[0].message == 'no light sources found'
+
+
+@posix_only
+def test_run_diagnostics():
+    script = 'for i in 1 2 3 4; do echo "rtrace: warning - stack overflow" 1>&2; ' \
+        'done; echo "rtrace: fatal - out of memory" 1>&2; exit 1'
+    output = []
+    with pytest.raises(ReturnCodeError) as error:
+        stages = [{'argv': ['sh', '-c', script], 'stdin': None, 'stdout': None,
+                   'mode': 'w'}]
+        run_pipeline(stages, sink=output.append, max_repeats=1)
+    result = error.value.result
+    assert result.diagnostics.count('warning') == 4
+    assert result.diagnostics.errors[0].message == 'out of memory'
+    assert 'rtrace: fatal - out of memory' in str(error.value)
+    assert output == [
+        'rtrace: warning - stack overflow\n', 'rtrace: fatal - out of memory\n',
+        'rtrace: warning - stack overflow (repeated 4 times)\n'
+    ]
+    # the full stderr is still available
+    assert result.stderr.count('stack overflow') == 4
+
+
+@posix_only
+def test_run_diagnostics_flood():
+    # stderr in the result is limited and the diagnostics keep the full record
+    script = 'yes "rtrace: warning - ray weight too small" | head -n 20000 1>&2'
+    stages = [{'argv': ['sh', '-c', script], 'stdin': None, 'stdout': None,
+               'mode': 'w'}]
+    result = run_pipeline(stages, sink=RingBufferSink(), max_repeats=1)
+    assert len(result.stderr) <= MAX_STDERR
+    assert result.stderr.endswith('ray weight too small\n')
+    assert result.diagnostics.count('warning') == 20000
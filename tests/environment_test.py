@@ -0,0 +1,92 @@
+import os
+import stat
+
+import pytest
+
+from honeybee_radiance_command.environment import RadianceEnvironment, parse_version
+from honeybee_radiance_command.batch import CommandBatch
+from honeybee_radiance_command.cache import ResultCache
+from honeybee_radiance_command._command import Command
+
+posix_only = pytest.mark.skipif(os.name != 'posix', reason='requires posix tools')
+
+
+class Rtrace(Command):
+    __slots__ = ()
+
+    def to_radiance(self, stdin_input=False):
+        return 'rtrace -version'
+
+
+@pytest.fixture()
+def radiance_folder(tmpdir):
+    bin_folder = tmpdir.mkdir('bin')
+    tmpdir.mkdir('lib')
+    path = str(bin_folder.join('rtrace'))
+    with open(path, 'w') as f:
+        f.write('#!/bin/sh\necho "RADIANCE 5.4a 2021-03-28 LBNL"\n')
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return str(tmpdir)
+
+
+def test_parse_version():
+    assert parse_version('rtrace: RADIANCE 5.4a 2021-03-28 LBNL (5.4a)') == (5, 4)
+    assert parse_version('RADIANCE 6.0 2024-01-01') == (6, 0)
+    assert parse_version('command not found') is None
+
+
+@posix_only
+def test_environment(radiance_folder):
+    env = RadianceEnvironment(folder=radiance_folder, min_version='5.3')
+    rtrace = os.path.join(radiance_folder, 'bin', 'rtrace')
+    assert env.executable('rtrace') == rtrace
+    assert env.executables['rtrace'] == rtrace
+    assert 'rcontrib' in env.missing
+    assert env.version == (5, 4)
+    assert env.env['PATH'].startswith(os.path.join(radiance_folder, 'bin'))
+    assert env.env['RAYPATH'].endswith(os.path.join(radiance_folder, 'lib'))
+    assert env.variables['PATH'] == os.path.join(radiance_folder, 'bin')
+    stages = env.resolve([{'argv': ['rtrace', '-h'], 'stdin': None, 'stdout': None,
+                           'mode': 'w'}])
+    assert stages[0]['argv'] == [rtrace, '-h']
+
+    with pytest.raises(ValueError):
+        env.executable('rcontrib')
+    with pytest.raises(ValueError):
+        env.validate(['rtrace', 'rcontrib'])
+    env.validate([Rtrace()])
+    with pytest.raises(ValueError):
+        env.check_version('6.0')
+    with pytest.raises(ValueError):
+        RadianceEnvironment(folder=os.path.join(radiance_folder, 'bin'))
+
+    extended = env.extend({'OPTION': '1'})
+    assert extended.env['OPTION'] == '1'
+    assert 'OPTION' not in env.env
+    assert extended.executables == env.executables
+
+
+@posix_only
+def test_run_with_environment(radiance_folder, tmpdir):
+    env = RadianceEnvironment(folder=radiance_folder, commands=['rtrace'])
+    for shell in (True, False):
+        result = Rtrace().run(env=env, shell=shell, capture='bytes')
+        assert result.output.startswith(b'RADIANCE 5.4a')
+    assert result.stages[0].command == 'rtrace -version'
+
+    results = CommandBatch([Rtrace()]).run(env=env, shell=False)
+    assert results[0].success
+
+    class Rcontrib(Rtrace):
+        __slots__ = ()
+
+        def to_radiance(self, stdin_input=False):
+            return 'rcontrib -version'
+
+    batch = CommandBatch([Rtrace(), Rcontrib()])
+    with pytest.raises(ValueError):
+        # nothing runs if one of the executables is missing
+        batch.run(env=env)
+
+    cache = ResultCache(str(tmpdir.join('cache')))
+    assert cache.key(Rtrace(), env) == cache.key(Rtrace(), env.variables)
@@ -0,0 +1,132 @@
+import os
+
+import pytest
+
+from honeybee_radiance_command.estimate import CostEstimator, Estimate, \
+    sampling_bins, count_sensors
+from honeybee_radiance_command.options.rtrace import RtraceOptions
+from honeybee_radiance_command.options.rcontrib import RcontribOptions
+from honeybee_radiance_command.rtrace import Rtrace
+from honeybee_radiance_command.result import CommandResult
+
+
+def test_sampling_bins():
+    assert sampling_bins('u') == 1
+    assert sampling_bins('kf') == 145
+    assert sampling_bins('-kf') == 145
+    assert sampling_bins('r1') == 145
+    assert sampling_bins('r4') == 2305
+    assert sampling_bins('sc6') == 36
+    with pytest.raises(ValueError):
+        sampling_bins('x')
+
+
+def test_rays_per_primary():
+    estimator = CostEstimator()
+    options = RtraceOptions()
+    # only direct rays
+    assert estimator.rays_per_primary(options) == 2
+
+    options.ab = 1
+    options.ad = 1000
+    options.as_ = 0
+    options.aa = 0
+    options.lw = 1e-4
+    assert estimator.rays_per_primary(options) == 2 + 1000 * 2
+
+    # more bounces and divisions mean more rays
+    options.ab = 2
+    two_bounces = estimator.rays_per_primary(options)
+    assert two_bounces > 2002
+    options.ad = 10000
+    assert estimator.rays_per_primary(options) > two_bounces
+
+    # the ambient cache reduces the number of rays
+    options.aa = 0.1
+    assert estimator.rays_per_primary(options) < two_bounces
+
+    # rays with a weight below lw are terminated if lr is positive
+    options.aa = 0
+    options.ab = 1
+    options.lr = 8
+    options.lw = 1e-5
+    assert estimator.rays_per_primary(options) == 2 + 10000 * 2
+    options.lw = 1e-4
+    assert estimator.rays_per_primary(options) == 2
+    # otherwise a fraction of them is traced
+    options.lr = -10
+    assert estimator.rays_per_primary(options) == 2 + 5000 * 2
+
+
+def test_rays_per_primary_realistic():
+    """The weight of the ambient rays is divided by the number of divisions."""
+    estimator = CostEstimator()
+    options = RtraceOptions()
+    options.update_from_string('-ab 3 -ad 5000 -lw 2e-5 -aa 0')
+    assert 1e4 < estimator.rays_per_primary(options) < 1e5
+
+    options = RcontribOptions()
+    options.update_from_string('-ab 5 -ad 65536 -as 4096 -lw 1e-5')
+    assert 1e5 < estimator.rays_per_primary(options) < 1e6
+    estimate = estimator.estimate(options=options, sensors=200000)
+    # about a day for a single process
+    assert 3600 * 6 < estimate.wall_time < 3600 * 24 * 4
+
+
+def test_estimate(tmpdir):
+    folder = str(tmpdir)
+    with open(os.path.join(folder, 'grid.pts'), 'w') as f:
+        f.write('0 0 0 0 0 1\n' * 100 + '\n')
+    with open(os.path.join(folder, 'scene.oct'), 'wb') as f:
+        f.write(b'0' * 1048576)
+    assert count_sensors(os.path.join(folder, 'grid.pts')) == 100
+
+    estimator = CostEstimator(seconds_per_ray=1e-6, seconds_per_mb=1, overhead=0)
+    rtrace = Rtrace(octree='scene.oct', sensors='grid.pts')
+    estimate = estimator.estimate(rtrace, cwd=folder)
+    assert estimate.primary_rays == 100
+    assert estimate.rays == 200
+    assert estimate.octree_size == 1
+    assert estimate.output_values == 300
+    assert estimate.wall_time == pytest.approx(1 + (200 + 512) * 1e-6)
+
+    options = RcontribOptions()
+    options.c = 10
+    options.n = 4
+    estimate = estimator.estimate(options=options, sensors=1000, sampling_type='r4')
+    assert estimate.primary_rays == 10000
+    assert estimate.processes == 4
+    assert estimate.output_values == 3 * 1000 * 2305
+
+
+def test_check():
+    options = RcontribOptions()
+    options.ab = 3
+    options.ad = 65536
+    options.lw = 1e-6
+    estimator = CostEstimator()
+    with pytest.raises(ValueError):
+        estimator.check(options=options, sensors=200000, max_time=3600 * 24)
+    with pytest.raises(ValueError):
+        estimator.check(options=options, sensors=200000, max_rays=1e9)
+    options.ab = 0
+    assert isinstance(
+        estimator.check(options=options, sensors=100, max_time=60), Estimate
+    )
+
+
+def test_calibrate():
+    samples = []
+    for rays, size in ((1e6, 10), (2e6, 10), (1e6, 100), (4e6, 50)):
+        wall_time = 0.5 + size * 0.02 + rays * 3e-6
+        estimate = Estimate(rays, rays, size, 1, 0, 0)
+        samples.append((estimate, CommandResult('rtrace', [], wall_time)))
+    estimator = CostEstimator().calibrate(samples)
+    assert estimator.seconds_per_ray == pytest.approx(3e-6)
+    assert estimator.seconds_per_mb == pytest.approx(0.02)
+    assert estimator.overhead == pytest.approx(0.5)
+
+    # one sample only fits the time per ray
+    estimator = CostEstimator(seconds_per_mb=0, overhead=0)
+    estimator.calibrate([(Estimate(1e6, 1e6, 10, 2, 0, 0), samples[0][1])])
+    assert estimator.seconds_per_ray == pytest.approx(samples[0][1].wall_time / 5e5)
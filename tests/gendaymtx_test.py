@@ -30,3 +30,11 @@ def test_validation():
 
     gendaymtx.wea = 'input.wea'
     assert gendaymtx.to_radiance() == 'gendaymtx input.wea'
+
+
+def test_to_argv():
+    gendaymtx = Gendaymtx(output='sky.mtx', wea='input.wea')
+    assert gendaymtx.to_argv() == [
+        {'argv': ['gendaymtx', 'input.wea'], 'stdin': None, 'stdout': 'sky.mtx',
+         'mode': 'w'}
+    ]
@@ -0,0 +1,76 @@
+import struct
+
+import pytest
+
+from honeybee_radiance_command.matrix import parse_header, header_format, to_numpy, \
+    output_format
+
+
+HEADER = b'#?RADIANCE\n' \
+    b'rcontrib -I+ -ab 1 -faf -m sky_glow scene.oct\n' \
+    b'NROWS=2\nNCOLS=2\nNCOMP=3\nFORMAT=float\n\n'
+
+
+def test_parse_header():
+    header, index = parse_header(HEADER + b'data')
+    assert header == {'NROWS': '2', 'NCOLS': '2', 'NCOMP': '3', 'FORMAT': 'float'}
+    assert (HEADER + b'data')[index:] == b'data'
+    assert parse_header(b'0 0 0\n') == ({}, 0)
+
+    with pytest.raises(ValueError):
+        parse_header(b'#?RADIANCE\nNROWS=2\n')
+
+
+def test_header_format():
+    assert header_format({}) == 'ascii'
+    assert header_format({'FORMAT': 'ascii'}) == 'ascii'
+    assert header_format({'FORMAT': 'double'}) == 'double'
+    assert header_format({}, 'float') == 'float'
+    with pytest.raises(ValueError):
+        header_format({'FORMAT': '32-bit_rle_rgbe'})
+
+
+def test_to_numpy_ascii():
+    pytest.importorskip('numpy')
+    array = to_numpy(b'1 2 3\n4 5 6\n')
+    assert array.shape == (2, 1, 3)
+    assert array[1, 0, 2] == 6
+
+    with pytest.raises(ValueError):
+        to_numpy(b'1 2 3 4\n')
+
+
+def test_to_numpy_binary():
+    pytest.importorskip('numpy')
+    values = list(range(12))
+    data = HEADER.replace(b'FORMAT', b'BigEndian=1\nFORMAT') + \
+        struct.pack('>12f', *values)
+    array = to_numpy(data)
+    assert array.shape == (2, 2, 3)
+    assert array.flatten().tolist() == values
+
+
+def test_output_format():
+    assert output_format(['rcontrib', '-h', '-ffd', '-m', 'sky', 'scene.oct']) == \
+        ('double', 3)
+    assert output_format(['rtrace', '-h', '-fdf', '-ovw', 'scene.oct']) == ('float', 4)
+    assert output_format(['rtrace', '-ab', '2', 'scene.oct']) == (None, 3)
+    assert output_format(['rcontrib', '-fo', '-o', 'out.mtx', 'scene.oct']) == \
+        (None, 3)
+    assert output_format(
+        ['rmtxop', '-ff', 'a.mtx', '-c', '0.265', '0.67', '0.065', 'b.mtx']
+    ) == ('float', 1)
+    assert output_format(['rmtxop', '-fa', '-c', '179', 'a.mtx']) == ('ascii', 3)
+    assert output_format(['/usr/local/radiance/bin/dctimestep', '-od', 'a.mtx']) == \
+        ('double', 3)
+    assert output_format(['gendaymtx', '-of', 'sky.wea']) == ('float', 3)
+    assert output_format([]) == (None, 3)
+
+
+def test_to_numpy_headerless():
+    pytest.importorskip('numpy')
+    values = [0.5, 1.5, 2.5, 3.5]
+    fmt, ncomp = output_format(['rmtxop', '-fd', '-c', '1', '1', '1', 'a.mtx'])
+    array = to_numpy(struct.pack('=4d', *values), fmt, ncomp)
+    assert array.shape == (4, 1, 1)
+    assert array.flatten().tolist() == values
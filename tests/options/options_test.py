@@ -141,3 +141,170 @@ def test_collection():
     assert '-o %s.vmtx' in options_test.to_radiance()
     with pytest.raises(AttributeError):
         options_test.ad = 2400
+
+
+def test_collection_to_argv():
+    options_test = OptionsTestClass()
+    options_test.update_from_string('-ab 5 -ld- -ad 2500 -as 128 -aa 0.1')
+    options_test.o = '%%s.vmtx'
+    assert options_test.to_argv() == \
+        ['-aa', '0.1', '-ab', '5', '-as', '128', '-ld-', '-o', '%s.vmtx', '-ad', '2500']
+    assert options_test.to_argv() == options_test.to_radiance().split()
+
+
+def test_slot_tables():
+    from honeybee_radiance_command.options.rtrace import RtraceOptions
+    from honeybee_radiance_command.options.rcontrib import RcontribOptions
+    from honeybee_radiance_command.options.rfluxmtx import RfluxmtxOptions
+
+    # slot tables are calculated once for each class
+    assert RtraceOptions._slot_table == tuple(sorted(RtraceOptions.__slots__))
+    assert RtraceOptions._has_fio
+    assert set(RcontribOptions._slot_table) == \
+        set(RtraceOptions.__slots__ + RcontribOptions.__slots__)
+    assert '_v' in RfluxmtxOptions._slot_set
+    assert '_v' not in RcontribOptions._slot_set
+    assert 'additional_options' not in RtraceOptions._slot_set
+
+    options = RfluxmtxOptions()
+    assert options.slots == list(RfluxmtxOptions._slot_table)
+    options.update_from_string('-ab 2 -faf')
+    assert options.to_radiance() == '-ab 2 -faf'
+
+
+def test_to_radiance_cache():
+    options_test = OptionsTestClass()
+    options_test.update_from_string('-ab 5 -ad 2500')
+    value = options_test.to_radiance()
+    assert options_test.to_radiance() is value
+
+    # changing an option invalidates the cached string
+    options_test.ab = 2
+    assert options_test.to_radiance() == '-ab 2 -ad 2500'
+    options_test._ab.value = 3
+    assert options_test.to_radiance() == '-ab 3 -ad 2500'
+    options_test.update_from_string('-aa 0.1')
+    assert options_test.to_radiance() == '-aa 0.1 -ab 3 -ad 2500'
+
+    # additional options can be edited directly
+    options_test.additional_options['dr'] = 2
+    assert options_test.to_radiance() == '-aa 0.1 -ab 3 -ad 2500 -dr 2'
+    options_test.additional_options['dr'] = 3
+    assert options_test.to_radiance() == '-aa 0.1 -ab 3 -ad 2500 -dr 3'
+    # values that are edited in place are not cached
+    options_test.additional_options['dr'] = [3]
+    value = options_test.to_radiance()
+    options_test.additional_options['dr'].append(4)
+    assert options_test.to_radiance() == value.replace('[3]', '[3, 4]')
+    options_test.additional_options = {}
+    assert options_test.to_radiance() == '-aa 0.1 -ab 3'
+
+
+def test_shared_default_options():
+    from honeybee_radiance_command.options.rtrace import RtraceOptions
+
+    options_1 = RtraceOptions()
+    options_2 = RtraceOptions()
+    defaults = RtraceOptions._template[0]
+    assert options_1._option('_ab') is defaults['_ab']
+
+    # translating the options does not assign the default options to the instance
+    assert options_1.to_radiance() == ''
+    with pytest.raises(AttributeError):
+        object.__getattribute__(options_1, '_ab')
+
+    # reading an option assigns a copy of the default option to the instance
+    option = options_1._ab
+    assert not option.is_set
+    assert object.__getattribute__(options_1, '_ab') is option
+    assert option is not defaults['_ab']
+
+    # setting an option only changes the instance
+    options_1.ab = 2
+    option = options_2._ad
+    option.value = 1000
+    assert options_1.to_radiance() == '-ab 2'
+    assert options_2.to_radiance() == '-ad 1000'
+    assert options_2._ad is option
+    assert not defaults['_ab'].is_set and not defaults['_ad'].is_set
+    assert RtraceOptions().to_radiance() == ''
+    assert options_1.additional_options is not options_2.additional_options
+
+    with pytest.raises(AttributeError):
+        options_1.not_an_option
+
+
+def test_custom_init_subclass():
+    from honeybee_radiance_command.options.rtrace import RtraceOptions
+
+    class LabeledOptions(RtraceOptions):
+        def __init__(self):
+            RtraceOptions.__init__(self)
+            self.label = 'x'
+            self.ab = 2
+
+    options = LabeledOptions()
+    assert options.label == 'x'
+    assert options.to_radiance() == '-ab 2'
+    assert LabeledOptions().label == 'x'
+    assert not LabeledOptions._use_template
+    assert RtraceOptions._use_template
+
+
+def test_option_handle():
+    from honeybee_radiance_command.options.rtrace import RtraceOptions
+
+    options = RtraceOptions()
+    option = options._ab
+    assert options._ab is option
+    # the option that is read before the assignment has the new value
+    options.ab = 5
+    assert option.value == 5
+    assert options._ab is option
+    option.value = 3
+    assert options.to_radiance() == '-ab 3'
+
+
+def test_update_from_string_checks():
+    from honeybee_radiance_command.options.rtrace import RtraceOptions
+    from honeybee_radiance_command.options.rcalc import RcalcOptions
+
+    options = RtraceOptions()
+    options.update_from_string('-ab 2 -I+ -ld- -faf')
+    assert options.to_radiance() == '-I -ab 2 -faf -ld-'
+    # the checks run after all the options are set
+    with pytest.raises(AssertionError):
+        RtraceOptions().update_from_string('-ti mod_1 -te mod_2')
+
+    options = RcalcOptions()
+    options.update_from_string('-e "$1=$1*179"')
+    assert options.to_argv() == ['-e', '$1=$1*179']
+
+
+def test_fingerprint():
+    from honeybee_radiance_command.options.rtrace import RtraceOptions
+    from honeybee_radiance_command.options.rcontrib import RcontribOptions
+
+    options_1 = RtraceOptions()
+    options_1.update_from_string('-ab 2 -aa 0.1 -I -lw 1e-3')
+    options_2 = RtraceOptions()
+    options_2.update_from_string('-lw 0.001 -I+ -aa 1e-1')
+    assert options_1 != options_2
+    options_2.ab = 2
+    assert options_1 == options_2
+    assert hash(options_1) == hash(options_2)
+    assert options_1.fingerprint() == options_2.fingerprint()
+    assert len(set([options_1, options_2])) == 1
+
+    # additional options are compared with the same rules
+    options_1.additional_options['xx'] = '.5'
+    assert options_1 != options_2
+    options_2.additional_options['xx'] = 5e-1
+    assert options_1.fingerprint() == options_2.fingerprint()
+
+    options_1.I = False
+    assert options_1 != options_2
+    assert RtraceOptions() == RtraceOptions()
+    assert RtraceOptions() != RcontribOptions()
+    assert RtraceOptions().fingerprint() != RcontribOptions().fingerprint()
+    assert RtraceOptions() != '-ab 2'
@@ -92,3 +92,12 @@ def test_from_string():
     assert opt.ab == 2
     assert opt.ad == 50000
     assert opt.lw == 2e-5
+
+
+def test_to_argv():
+    options = RcontribOptions()
+    options.ab = 2
+    options.M = 'folder with space/modifiers.txt'
+    options.o = '%%s.ill'
+    assert options.to_argv() == \
+        ['-o', '%s.ill', '-M', 'folder with space/modifiers.txt', '-ab', '2']
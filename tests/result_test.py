@@ -0,0 +1,41 @@
+from honeybee_radiance_command.result import CommandResult, StageResult
+
+
+def test_command_result():
+    stages = [
+        StageResult('rtrace scene.oct', 0, 2.0, 1.5, 0.25, 2048),
+        StageResult('rcalc', 0, 2.1, 0.5, 0.25, 1024)
+    ]
+    result = CommandResult('rtrace scene.oct | rcalc', stages, 2.1, 'rtrace: warning')
+    assert result.return_code == 0
+    assert result == 0
+    assert int(result) == 0
+    assert hash(result) == hash(0)
+    assert {0: 'success'}[result] == 'success'
+    assert result in {0}
+    # results compare by their return code
+    other = CommandResult('rcalc', [StageResult('rcalc', 0, 0.1)], 0.1)
+    assert result == other and not result != other
+    assert hash(result) == hash(other)
+    assert len({result, other, 0}) == 1
+    assert result.cpu_time == 2.5
+    assert result.user_time == 2.0
+    assert result.system_time == 0.5
+    assert result.max_rss == 3072
+    assert result.stderr == 'rtrace: warning'
+    assert result.to_dict()['stages'][0]['max_rss'] == 2048
+
+
+def test_command_result_pipefail():
+    stages = [
+        StageResult('rtrace scene.oct', 1, 0.1),
+        StageResult('rcalc', 0, 0.1)
+    ]
+    result = CommandResult('rtrace scene.oct | rcalc', stages, 0.1)
+    assert result.return_code == 1
+    assert result != 0
+    assert result == 1
+    success = CommandResult('rcalc', [StageResult('rcalc', 0, 0.1)], 0.1)
+    assert result != success
+    assert result.cpu_time is None
+    assert result.max_rss is None
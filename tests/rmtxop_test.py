@@ -1,7 +1,9 @@
+from honeybee_radiance_command._command import Command
 from honeybee_radiance_command.rmtxop import Rmtxop
 import pytest
 import honeybee_radiance_command._exception as exceptions
 import os
+import sys
 
 
 def test_defaults():
@@ -144,3 +146,31 @@ def test_from_command_multiple():
         assert rmtxop.to_radiance() == 'rmtxop "!rmtxop total.mtx sky.smx" ' \
             '+ -s -1.0 "!rmtxop direct.mtx direct.smx" ' \
             '+ sun.ill'
+
+
+@pytest.mark.skipif(
+    os.name != 'posix' or sys.version_info[0] < 3,
+    reason='requires posix tools and Python 3'
+)
+def test_nested_commands():
+    class Echo(Command):
+        __slots__ = ('text',)
+
+        def __init__(self, text):
+            Command.__init__(self)
+            self.text = text
+
+        def to_radiance(self, stdin_input=False):
+            return 'echo %s' % self.text
+
+    class Cat(Rmtxop):
+        @property
+        def command(self):
+            return 'cat'
+
+    cat = Cat(matrices=[Echo('first'), Echo('second')])
+    assert cat.to_argv()[0]['argv'] == ['cat', '!echo first', '!echo second']
+    result = cat.run(shell=False, capture='bytes', nested='buffer')
+    assert result.output == b'first\nsecond\n'
+    with pytest.raises(ValueError):
+        cat.run(nested='pipe')
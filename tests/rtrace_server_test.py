@@ -0,0 +1,90 @@
+import os
+import sys
+import stat
+
+import pytest
+
+from honeybee_radiance_command.options.rtrace import RtraceOptions
+from honeybee_radiance_command.rtrace_server import RtraceServer, RtracePool, \
+    _output_size
+
+
+posix_only = pytest.mark.skipif(os.name != 'posix', reason='requires posix tools')
+
+# a stub rtrace that returns (x + y + z, dz, number of traced rays) for each ray
+STUB_RTRACE = '''#!%s
+import struct
+import sys
+
+count = 0
+while True:
+    data = sys.stdin.buffer.read(48)
+    if len(data) < 48:
+        break
+    x, y, z, dx, dy, dz = struct.unpack('=6d', data)
+    count += 1
+    sys.stdout.buffer.write(struct.pack('=3d', x + y + z, dz, count))
+    sys.stdout.buffer.flush()
+'''
+
+
+@pytest.fixture
+def stub_env(tmpdir):
+    path = str(tmpdir.join('rtrace'))
+    with open(path, 'w') as f:
+        f.write(STUB_RTRACE % sys.executable)
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return {'PATH': str(tmpdir)}
+
+
+def test_output_size():
+    assert _output_size('v') == 3
+    assert _output_size('ovw') == 7
+    with pytest.raises(ValueError):
+        _output_size('vm')
+
+
+@posix_only
+def test_server_options(stub_env):
+    options = RtraceOptions()
+    options.ab = 2
+    with RtraceServer('scene.oct', options, env=stub_env) as server:
+        assert server.is_running
+        assert server.output_size == 3
+        assert server.options.to_radiance() == '-ab 2 -fdd -h- -x 1'
+        # the input options are not changed
+        assert options.to_radiance() == '-ab 2'
+    assert not server.is_running
+
+
+@posix_only
+def test_server_trace(stub_env):
+    with RtraceServer('scene.oct', env=stub_env) as server:
+        results = server.trace([(1, 2, 3, 0, 0, 1), (0, 0, 1, 0, 0, -1)])
+        assert results == [(6, 1, 1), (1, -1, 2)]
+        # the same process is used for the next batch
+        results = server.trace([(0, 0, 0, 0, 0, 1)] * 1000)
+        assert len(results) == 1000
+        assert results[-1] == (0, 1, 1002)
+        with pytest.raises(ValueError):
+            server.trace([(0, 0, 0)])
+
+
+@posix_only
+def test_pool_trace(stub_env):
+    rays = [(i, 0, 0, 0, 0, 1) for i in range(10)]
+    with RtracePool('scene.oct', size=3, env=stub_env) as pool:
+        assert len(pool) == 3
+        results = pool.trace(rays)
+    assert [result[0] for result in results] == list(range(10))
+
+
+@posix_only
+def test_pool_trace_numpy(stub_env):
+    np = pytest.importorskip('numpy')
+    rays = np.zeros((10, 6))
+    rays[:, 0] = np.arange(10)
+    with RtracePool('scene.oct', size=3, env=stub_env) as pool:
+        results = pool.trace(rays)
+    assert results.shape == (10, 3)
+    assert results[:, 0].tolist() == list(range(10))
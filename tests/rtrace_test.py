@@ -1,4 +1,5 @@
 from honeybee_radiance_command.rtrace import Rtrace
+from honeybee_radiance_command.rcalc import Rcalc
 import pytest
 import honeybee_radiance_command._exception as exceptions
 
@@ -45,3 +46,37 @@ def test_validation():
 
     rtrace.sensors = 'sensors.pts'
     assert rtrace.to_radiance() == 'rtrace input.oct < sensors.pts'
+
+
+def test_to_argv():
+    rtrace = Rtrace(octree='scene folder/input.oct', sensors='sensors.pts')
+    rtrace.options.ab = 2
+    rtrace.output = 'results.dat'
+    stages = rtrace.to_argv()
+    assert len(stages) == 1
+    assert stages[0]['argv'] == ['rtrace', '-ab', '2', 'scene folder/input.oct']
+    assert stages[0]['stdin'] == 'sensors.pts'
+    assert stages[0]['stdout'] == 'results.dat'
+
+
+def test_to_argv_from_inputs(monkeypatch):
+    def to_radiance(self, stdin_input=False):
+        raise AssertionError('The command string should not be used.')
+
+    # the arguments are not parsed from the command string
+    monkeypatch.setattr(Rtrace, 'to_radiance', to_radiance)
+    monkeypatch.setattr(Rcalc, 'to_radiance', to_radiance)
+    rtrace = Rtrace(octree='scene.oct', sensors='grid folder/grid.pts')
+    rtrace.options.ab = 2
+    # additional options are still parsed from their string
+    rtrace.options.additional_options['xx'] = '"a b"'
+    rcalc = Rcalc(output='results folder/results.ill')
+    rcalc.options.e = '$1=$1*179'
+    rtrace.pipe_to = rcalc
+    stages = rtrace.to_argv()
+    assert stages[0]['argv'] == ['rtrace', '-ab', '2', '-xx', 'a b', 'scene.oct']
+    assert stages[0]['stdin'] == 'grid folder/grid.pts'
+    assert stages[0]['stdout'] is None
+    assert stages[1]['argv'] == ['rcalc', '-e', '$1=$1*179']
+    assert stages[1]['stdin'] is None
+    assert stages[1]['stdout'] == 'results folder/results.ill'
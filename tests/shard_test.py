@@ -0,0 +1,182 @@
+import os
+import sys
+import stat
+import struct
+
+import pytest
+
+from honeybee_radiance_command.rtrace import Rtrace
+from honeybee_radiance_command.rcontrib import Rcontrib
+from honeybee_radiance_command.shard import ShardedRun, ShardManifest, \
+    split_sensors, merge_outputs
+from honeybee_radiance_command.matrix import parse_header
+
+
+posix_only = pytest.mark.skipif(os.name != 'posix', reason='requires posix tools')
+
+# a stub rtrace that writes a header and the x coordinate of each sensor as float
+STUB_RTRACE = '''#!%s
+import os
+import struct
+import sys
+
+values = [float(line.split()[0]) for line in sys.stdin if line.strip()]
+with open('calls.log', 'a') as f:
+    f.write('%%d\\n' %% values[0])
+if os.path.isfile('fail_%%d' %% values[0]):
+    sys.exit(1)
+sys.stdout.buffer.write(
+    b'#?RADIANCE\\nrtrace stub\\nNROWS=%%d\\nNCOLS=1\\nNCOMP=1\\nFORMAT=float\\n\\n'
+    %% len(values)
+)
+sys.stdout.buffer.write(struct.pack('=%%df' %% len(values), *values))
+'''
+
+
+def _write_sensors(folder, count):
+    path = os.path.join(folder, 'grid.pts')
+    with open(path, 'w') as f:
+        for i in range(count):
+            f.write('%d 0 0 0 0 1\n' % i)
+        f.write('\n')
+    return path
+
+
+def test_split_sensors(tmpdir):
+    folder = str(tmpdir)
+    sensors = _write_sensors(folder, 10)
+    shards = split_sensors(sensors, 3, os.path.join(folder, 'shards'))
+    assert [count for _, count in shards] == [4, 3, 3]
+    with open(shards[1][0]) as f:
+        assert f.readline() == '4 0 0 0 0 1\n'
+    assert len(split_sensors(sensors, 20, os.path.join(folder, 'shards'))) == 10
+
+
+def test_merge_outputs(tmpdir):
+    folder = str(tmpdir)
+    inputs = []
+    for count, rows in enumerate((2, 3)):
+        path = os.path.join(folder, 'shard_%d.mtx' % count)
+        with open(path, 'wb') as f:
+            f.write(b'#?RADIANCE\nNROWS=%d\nFORMAT=ascii\n\n' % rows)
+            f.write(b'%d\n' % count * rows)
+        inputs.append(path)
+    output = merge_outputs(inputs, os.path.join(folder, 'merged', 'merged.mtx'))
+    with open(output, 'rb') as f:
+        data = f.read()
+    header, index = parse_header(data)
+    assert header == {'NROWS': '5', 'FORMAT': 'ascii'}
+    assert data[index:] == b'0\n0\n1\n1\n1\n'
+
+    # outputs without header
+    for count, path in enumerate(inputs):
+        with open(path, 'wb') as f:
+            f.write(b'%d\n' % count)
+    merge_outputs(inputs, output)
+    with open(output, 'rb') as f:
+        assert f.read() == b'0\n1\n'
+
+
+def test_sharded_run_inputs():
+    with pytest.raises(ValueError):
+        ShardedRun(Rtrace(octree='scene.oct', output='results.res'))
+    with pytest.raises(ValueError):
+        ShardedRun(Rtrace(octree='scene.oct', sensors='grid.pts'))
+    rcontrib = Rcontrib(octree='scene.oct', sensors='grid.pts')
+    rcontrib.options.o = 'results/%s.mtx'
+    with pytest.raises(ValueError):
+        ShardedRun(rcontrib)
+
+    sharded = ShardedRun(
+        Rtrace(octree='scene.oct', sensors='grid.pts', output='results/grid.res'),
+        shards=4
+    )
+    assert sharded.shards == 4
+    assert sharded.folder == os.path.join('results', '.grid.res.shards')
+
+
+def _write_stub(folder):
+    stub = os.path.join(folder, 'rtrace')
+    with open(stub, 'w') as f:
+        f.write(STUB_RTRACE % sys.executable)
+    os.chmod(stub, os.stat(stub).st_mode | stat.S_IEXEC)
+
+
+def _calls(folder):
+    path = os.path.join(folder, 'calls.log')
+    if not os.path.isfile(path):
+        return []
+    with open(path) as f:
+        calls = sorted(int(line) for line in f)
+    os.remove(path)
+    return calls
+
+
+@posix_only
+def test_sharded_run(tmpdir):
+    folder = str(tmpdir)
+    _write_stub(folder)
+    _write_sensors(folder, 10)
+
+    rtrace = Rtrace(octree='scene.oct', sensors='grid.pts', output='grid.res')
+    sharded = ShardedRun(rtrace, shards=3)
+    results = sharded.run(env={'PATH': folder}, cwd=folder, workers=3)
+    assert [result.success for result in results] == [True] * 3
+    assert rtrace.sensors == 'grid.pts'
+    assert not os.path.isdir(os.path.join(folder, sharded.folder))
+
+    with open(os.path.join(folder, 'grid.res'), 'rb') as f:
+        data = f.read()
+    header, index = parse_header(data)
+    assert header['NROWS'] == '10'
+    assert list(struct.unpack('=10f', data[index:])) == list(range(10))
+
+
+def test_manifest(tmpdir):
+    folder = str(tmpdir)
+    sensors = _write_sensors(folder, 2)
+    output = os.path.join(folder, 'output.res')
+    with open(output, 'w') as f:
+        f.write('0\n')
+    manifest_file = os.path.join(folder, 'manifest.json')
+    manifest = ShardManifest(manifest_file, 'key')
+    assert not manifest.is_done(0, sensors, output)
+    manifest.mark_done(0, sensors, output)
+    assert manifest.is_done(0, sensors, output)
+
+    assert ShardManifest.load(manifest_file, 'key').is_done(0, sensors, output)
+    assert not ShardManifest.load(manifest_file, 'new-key').is_done(0, sensors, output)
+
+    with open(output, 'w') as f:
+        f.write('1\n')
+    assert not manifest.is_done(0, sensors, output)
+
+
+@posix_only
+def test_sharded_run_resume(tmpdir):
+    folder = str(tmpdir)
+    _write_stub(folder)
+    _write_sensors(folder, 10)
+    env = {'PATH': folder}
+    open(os.path.join(folder, 'fail_4'), 'w').close()
+
+    rtrace = Rtrace(octree='scene.oct', sensors='grid.pts', output='grid.res')
+    sharded = ShardedRun(rtrace, shards=3)
+    results = sharded.run(env=env, cwd=folder)
+    assert [result.status for result in results] == ['success', 'failed', 'success']
+    assert _calls(folder) == [0, 4, 7]
+    assert not os.path.isfile(os.path.join(folder, 'grid.res'))
+
+    # only the failed shard runs again
+    os.remove(os.path.join(folder, 'fail_4'))
+    results = sharded.run(env=env, cwd=folder, clean=False)
+    assert [result.status for result in results] == \
+        ['up-to-date', 'success', 'up-to-date']
+    assert _calls(folder) == [4]
+    assert os.path.isfile(os.path.join(folder, 'grid.res'))
+
+    # changing the options invalidates the manifest
+    rtrace.options.ab = 2
+    results = sharded.run(env=env, cwd=folder)
+    assert [result.status for result in results] == ['success'] * 3
+    assert _calls(folder) == [0, 4, 7]
@@ -0,0 +1,87 @@
+from __future__ import print_function
+
+import io
+import os
+import logging
+
+import pytest
+
+from honeybee_radiance_command._command import Command
+from honeybee_radiance_command.sink import DiscardSink, PrintSink, CallbackSink, \
+    LoggerSink, FileSink, RingBufferSink, to_sink
+
+
+posix_only = pytest.mark.skipif(os.name != 'posix', reason='requires posix tools')
+
+
+class Echo(Command):
+    pass
+
+
+def test_to_sink():
+    assert isinstance(to_sink(None), PrintSink)
+    sink = RingBufferSink()
+    assert to_sink(sink) is sink
+    assert isinstance(to_sink(logging.getLogger('radiance')), LoggerSink)
+    callback = to_sink(print)
+    assert isinstance(callback, CallbackSink)
+    assert callback.lines
+    with pytest.raises(ValueError):
+        to_sink('output.txt')
+
+
+def test_ring_buffer_sink():
+    sink = RingBufferSink(10)
+    assert sink.size == 10
+    sink.write(b'line 1\n')
+    sink.write(b'line 2\n')
+    sink.write(b'line 3\n')
+    assert sink.data == b' 2\nline 3\n'
+    assert sink.text == u' 2\nline 3\n'
+    assert len(sink) == 10
+    sink.clear()
+    assert sink.data == b''
+
+
+def test_print_sink():
+    stream = io.StringIO()
+    sink = PrintSink(stream)
+    sink.write(b'line 1\n')
+    assert stream.getvalue() == u'line 1\n'
+
+
+def test_file_sink(tmpdir):
+    path = str(tmpdir.join('output.txt'))
+    with FileSink(path) as sink:
+        sink.write(b'line 1\n')
+    with open(path, 'rb') as f:
+        assert f.read() == b'line 1\n'
+
+
+def test_logger_sink():
+    records = []
+
+    class Handler(logging.Handler):
+        def emit(self, record):
+            records.append(record.getMessage())
+
+    logger = logging.getLogger('honeybee_radiance_command.sink_test')
+    logger.addHandler(Handler())
+    logger.setLevel(logging.INFO)
+    sink = LoggerSink(logger)
+    assert sink.lines
+    sink.write(b'line 1\n')
+    assert records == ['line 1']
+
+
+@posix_only
+def test_run_with_sinks():
+    sink = RingBufferSink()
+    Echo().run(sink=sink)
+    assert sink.data == b'\n'
+
+    lines = []
+    Echo().run(sink=lines.append, shell=False)
+    assert lines == ['\n']
+
+    assert Echo().run(sink=DiscardSink()) == 0
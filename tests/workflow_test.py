@@ -0,0 +1,109 @@
+import os
+import threading
+
+import pytest
+
+from honeybee_radiance_command._command import Command
+from honeybee_radiance_command.workflow import Workflow
+
+
+posix_only = pytest.mark.skipif(os.name != 'posix', reason='requires posix tools')
+
+
+class Cat(Command):
+    """Cat command to merge the input files to the output."""
+
+    __slots__ = ('inputs',)
+
+    def __init__(self, inputs, output):
+        Command.__init__(self, output=output)
+        self.inputs = inputs
+
+    def to_radiance(self, stdin_input=False):
+        return 'cat %s > %s' % (' '.join(self.inputs), self.output)
+
+
+def _workflow():
+    workflow = Workflow()
+    workflow.add(Cat(['c.txt'], 'd.txt'), inputs=['c.txt'], name='d')
+    workflow.add(Cat(['a.txt'], 'b.txt'), inputs=['a.txt'], name='b')
+    workflow.add(Cat(['a.txt'], 'c.txt'), inputs=['a.txt'], name='c')
+    workflow.add(
+        Cat(['b.txt', 'd.txt'], 'e.txt'), inputs=['b.txt', 'd.txt'], name='e'
+    )
+    return workflow
+
+
+def test_sort():
+    workflow = _workflow()
+    assert len(workflow) == 4
+    assert workflow.nodes[0].outputs == ['d.txt']
+    assert workflow.dependencies() == {'d': ['c'], 'b': [], 'c': [], 'e': ['b', 'd']}
+    assert [node.name for node in workflow.sort()] == ['b', 'c', 'd', 'e']
+
+    with pytest.raises(ValueError):
+        workflow.add(Cat(['a.txt'], 'a.txt'), name='b')
+
+
+def test_cycle():
+    workflow = Workflow()
+    workflow.add(Cat(['a.txt'], 'b.txt'), inputs=['a.txt'])
+    workflow.add(Cat(['b.txt'], 'a.txt'), inputs=['b.txt'])
+    with pytest.raises(ValueError):
+        workflow.sort()
+
+
+@posix_only
+def test_run(tmpdir):
+    folder = str(tmpdir)
+    with open(os.path.join(folder, 'a.txt'), 'w') as f:
+        f.write('a\n')
+    workflow = _workflow()
+    results = workflow.run(cwd=folder, workers=2)
+    assert [results[name].status for name in 'bcde'] == ['success'] * 4
+    with open(os.path.join(folder, 'e.txt')) as f:
+        assert f.read() == 'a\na\n'
+
+    # all the outputs are up-to-date
+    results = workflow.run(cwd=folder, workers=2)
+    assert [results[name].status for name in 'bcde'] == ['up-to-date'] * 4
+
+    # only the nodes after c.txt are executed
+    os.remove(os.path.join(folder, 'c.txt'))
+    results = workflow.run(cwd=folder)
+    assert [results[name].status for name in 'bcde'] == \
+        ['up-to-date', 'success', 'success', 'success']
+
+
+@posix_only
+def test_run_failure(tmpdir):
+    folder = str(tmpdir)
+    with open(os.path.join(folder, 'a.txt'), 'w') as f:
+        f.write('a\n')
+    workflow = _workflow()
+    workflow.nodes[2].command.inputs = ['missing.txt']
+    results = workflow.run(cwd=folder, workers=1)
+    assert [results[name].status for name in 'bcde'] == \
+        ['success', 'failed', 'skipped', 'skipped']
+
+
+def test_run_error_before_command(tmpdir):
+    # errors before the command runs mark the node as failed instead of stopping the
+    # worker thread and leaving the workflow waiting for it
+    folder = str(tmpdir)
+    workflow = Workflow()
+    workflow.add(
+        Cat(['a.txt'], 'b.txt'), inputs=['a.txt'], name='b', env={'NAME': 'b'}
+    )
+    workflow.add(Cat(['b.txt'], 'c.txt'), inputs=['b.txt'], name='c')
+    results = {}
+    thread = threading.Thread(
+        target=lambda: results.update(workflow.run(env=['invalid'], cwd=folder))
+    )
+    thread.daemon = True
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive()
+    assert results['b'].status == 'failed'
+    assert isinstance(results['b'].error, ValueError)
+    assert results['c'].status == 'skipped'